@@ -1,7 +1,9 @@
 from dotenv import load_dotenv
+import asyncio
 import os
 import logging
-import sounddevice as sd
+import time
+from typing import Optional
 
 from livekit import agents
 from livekit.agents import AgentSession, Agent, RoomInputOptions
@@ -9,7 +11,25 @@ from livekit.plugins import (
     noise_cancellation,
 )
 from livekit.plugins import google
-from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
+import audio_devices
+import http_client
+import intent_router
+import load
+import loop_watchdog
+import mailer
+import memory
+import system_monitor
+import processes
+import registry
+import schedule
+import screenshots
+import tool_metrics
+import vision
+import voice_gate
+import wake
+import weather
+from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION, WAKE_INSTRUCTION
+import tools
 from tools import (
     get_weather, 
     search_web, 
@@ -22,6 +42,8 @@ from tools import (
     search_google,
     get_system_status,
     get_schedule,
+    get_next_event,
+    check_availability,
     get_time_and_date,
     take_screenshot,
     # Music & media control
@@ -40,15 +62,21 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+def build_realtime_model() -> google.beta.realtime.RealtimeModel:
+    return google.beta.realtime.RealtimeModel(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        voice="Aoede",
+        temperature=0.8,
+    )
+
+
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(self, llm: Optional[google.beta.realtime.RealtimeModel] = None, memories: Optional[list] = None) -> None:
         super().__init__(
-            instructions=AGENT_INSTRUCTION,
-            llm=google.beta.realtime.RealtimeModel(
-                api_key=os.getenv("GOOGLE_API_KEY"),
-                voice="Aoede",
-                temperature=0.8,
-            ),
+            instructions=AGENT_INSTRUCTION + memory.format_memories(memories or []),
+            # The realtime model only holds configuration, so one built at
+            # prewarm time is shared by every job in the process
+            llm=llm or build_realtime_model(),
             tools=[
                 # Web & Communication tools
                 get_weather,
@@ -62,6 +90,8 @@ class Assistant(Agent):
                 search_google,
                 get_system_status,
                 get_schedule,
+                get_next_event,
+                check_availability,
                 get_time_and_date,
                 take_screenshot,
                 # Music & media control
@@ -76,7 +106,6 @@ class Assistant(Agent):
                 close_youtube
             ],
         )
-        self.close_requested = False
 
 
     async def on_agent_started(self, session: AgentSession):
@@ -86,82 +115,278 @@ class Assistant(Agent):
     async def on_agent_stopped(self, session: AgentSession):
         await super().on_agent_stopped(session)
         logger.info("Nevira assistant stopped")
-        # Exit the program when assistant stops
-        if self.close_requested:
-            logger.info("Close requested, terminating session...")
-            import sys
-            import os
-            # Force complete shutdown
-            try:
-                # Disconnect from room cleanly
-                await session.room.disconnect()
-            except:
-                pass
-            # Force exit the process
-            os._exit(0)  # More forceful than sys.exit()
 
 
-async def entrypoint(ctx: agents.JobContext):
-    # Configure audio devices before starting the session
-    input_device_index = os.getenv("AUDIO_INPUT_DEVICE_INDEX")
-    input_device_name = os.getenv("AUDIO_INPUT_DEVICE_NAME")
-    output_device_index = os.getenv("AUDIO_OUTPUT_DEVICE_INDEX")
-    
-    chosen_index = None
-    out_idx = None
-    
-    # Set input device
-    if input_device_index:
-        try:
-            chosen_index = int(input_device_index)
-            logger.info(f"Using audio input device index: {chosen_index}")
-        except ValueError:
-            logger.warning(f"Invalid AUDIO_INPUT_DEVICE_INDEX: {input_device_index}")
-    elif input_device_name:
-        devices = sd.query_devices()
-        for i, dev in enumerate(devices):
-            if input_device_name.lower() in dev['name'].lower() and dev['max_input_channels'] > 0:
-                chosen_index = i
-                logger.info(f"Found input device matching '{input_device_name}': {dev['name']} (index {i})")
-                break
-    
-    # Set output device
-    if output_device_index:
+def configure_audio_devices() -> tuple:
+    """
+    Apply the AUDIO_* device settings to sounddevice's defaults.
+
+    Returns:
+        (input device index, output device index), either may be None
+    """
+    try:
+        chosen_index, out_idx = audio_devices.get_resolver().resolve_from_env()
+        audio_devices.apply(chosen_index, out_idx)
+    except OSError as e:
+        # No PortAudio or no audio subsystem: keep LiveKit's defaults
+        logger.warning(f"Could not configure audio devices: {e}")
+        return None, None
+    return chosen_index, out_idx
+
+
+def audio_devices_missing(resolved: tuple) -> bool:
+    """True if an input or output device is configured but didn't resolve."""
+    input_index, output_index = resolved
+    wants_input = os.getenv("AUDIO_INPUT_DEVICE_INDEX") or os.getenv("AUDIO_INPUT_DEVICE_NAME")
+    wants_output = os.getenv("AUDIO_OUTPUT_DEVICE_INDEX") or os.getenv("AUDIO_OUTPUT_DEVICE_NAME")
+    return bool((wants_input and input_index is None) or (wants_output and output_index is None))
+
+
+def validate_config() -> list:
+    """Return a list of configuration problems (empty if everything looks right)."""
+    problems = []
+    for var in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "GOOGLE_API_KEY"):
+        if not os.getenv(var):
+            problems.append(f"{var} is not set")
+    if bool(os.getenv("GMAIL_USER")) != bool(os.getenv("GMAIL_APP_PASSWORD")):
+        problems.append("GMAIL_USER and GMAIL_APP_PASSWORD must be set together")
+    for var in ("AUDIO_INPUT_DEVICE_INDEX", "AUDIO_OUTPUT_DEVICE_INDEX"):
+        value = os.getenv(var)
+        if value and not value.strip().lstrip("-").isdigit():
+            problems.append(f"{var} must be an integer, got '{value}'")
+    return problems
+
+
+def warm_tool_dependencies() -> None:
+    """Import the tools' deferred dependencies so the first tool call doesn't pay for them."""
+    for module in (tools.pyautogui, tools.psutil, tools.smtplib):
         try:
-            out_idx = int(output_device_index)
-            logger.info(f"Using audio output device index: {out_idx}")
-        except ValueError:
-            logger.warning(f"Invalid AUDIO_OUTPUT_DEVICE_INDEX: {output_device_index}")
-    
-    # Apply device settings
-    if chosen_index is not None and out_idx is not None:
-        sd.default.device = (chosen_index, out_idx)
-        logger.info("Set sounddevice default input device to index %s and output to %s", chosen_index, out_idx)
-    elif chosen_index is not None:
-        sd.default.device = (chosen_index, sd.default.device[1])
-        logger.info("Set sounddevice default input device to index %s", chosen_index)
+            module.load()
+        except Exception as e:
+            logger.warning(f"Could not preload {module.__name__}: {e}")
+    try:
+        # Loads registry.json and, with APP_SCAN_ENABLED, the installed-app scan
+        registry.get_registry()
+    except Exception as e:
+        logger.warning(f"Could not load the app registry: {e}")
+    try:
+        schedule.get_schedule().refresh()
+    except Exception as e:
+        logger.warning(f"Could not load the schedule: {e}")
+
+
+def prewarm(proc: agents.JobProcess):
+    """
+    Run once per worker process, before any job is assigned to it.
+    Everything stored in proc.userdata is reused by every job in the process.
+    """
+    start = time.perf_counter()
+    for problem in validate_config():
+        logger.warning(f"Configuration problem: {problem}")
+    proc.userdata["audio_devices"] = configure_audio_devices()
+    proc.userdata["noise_cancellation"] = noise_cancellation.BVC()
+    # Opening (and memory-mapping) the memory index happens here, not on the first greeting
+    proc.userdata["memory"] = memory.get_store()
+    # Building Silero's ONNX session takes tens of ms; not on the way to the greeting
+    if voice_gate.VAD_SUPPRESSION:
+        proc.userdata["vad_detector"] = voice_gate.create_detector()
+    try:
+        proc.userdata["llm"] = build_realtime_model()
+    except ValueError as e:
+        logger.error(f"Could not build realtime model during prewarm: {e}")
+    warm_tool_dependencies()
+    logger.info(f"Worker process prewarmed in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def create_session_components(userdata: dict) -> tuple:
+    """
+    Build the per-job agent and room input options, reusing whatever the
+    prewarm stage left in userdata and building the rest on demand.
+
+    Returns:
+        (Assistant, RoomInputOptions)
+    """
+    # Resolved once at prewarm; only try again if a configured device wasn't found then
+    resolved = userdata.get("audio_devices")
+    if resolved is None or audio_devices_missing(resolved):
+        userdata["audio_devices"] = configure_audio_devices()
+    store = userdata.setdefault("memory", memory.get_store())
+    memories = store.session_memories() if store is not None else []
+    agent = Assistant(llm=userdata.get("llm"), memories=memories)
+    room_input_options = RoomInputOptions(
+        # LiveKit Cloud enhanced noise cancellation
+        # - If self-hosting, omit this parameter
+        # - For telephony applications, use `BVCTelephony` for best results
+        video_enabled=True,
+        noise_cancellation=userdata.get("noise_cancellation") or noise_cancellation.BVC(),
+    )
+    return agent, room_input_options
+
+
+async def start_session(ctx: agents.JobContext, on_activity=None, on_close=None) -> AgentSession:
+    """
+    Build and start the agent session for this job's room.
+
+    Args:
+        ctx: The job context
+        on_activity: Called whenever Boss or the agent starts or stops speaking or thinking
+        on_close: Called once the session has closed (after a goodbye, the goodbye has played)
+
+    Returns:
+        The started AgentSession
+    """
+    # Background work the session's tools start is tracked per session, so
+    # closing this session cancels only its own
+    tools.bind_session_tasks()
+    agent, room_input_options = create_session_components(ctx.proc.userdata)
     session = AgentSession(
         
     )
 
     await session.start(
         room=ctx.room,
-        agent=Assistant(),
-        room_input_options=RoomInputOptions(
-            # LiveKit Cloud enhanced noise cancellation
-            # - If self-hosting, omit this parameter
-            # - For telephony applications, use `BVCTelephony` for best results
-            video_enabled=True,
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
+        agent=agent,
+        room_input_options=room_input_options,
     )
 
+    # Learn from what Boss says; extraction is cheap and storage runs off the loop
+    store = ctx.proc.userdata.get("memory")
+    if store is not None:
+        @session.on("conversation_item_added")
+        def _remember(event):
+            if getattr(event.item, "role", None) == "user" and event.item.text_content:
+                store.observe_turn(event.item.text_content)
+
+    # Run trivial commands ("pause", "volume up", "what time is it") as soon as
+    # the transcript is final instead of waiting for the model's tool call
+    if intent_router.FAST_PATH_ENABLED:
+        router = intent_router.IntentRouter({tool.info.name: tool for tool in agent.tools})
+
+        @session.on("user_input_transcribed")
+        def _fast_path(event):
+            if event.is_final:
+                tools._run_in_background(router.handle(event.transcript))
+
+        @session.on("user_state_changed")
+        def _expire_fast_path(event):
+            if event.new_state == "speaking":
+                intent_router.new_turn()
+
+    # Send only speech (with a little padding) to the realtime model, not the silence around it
+    detector = ctx.proc.userdata.get("vad_detector")
+    if detector is None and voice_gate.VAD_SUPPRESSION:
+        detector = ctx.proc.userdata["vad_detector"] = await asyncio.to_thread(voice_gate.create_detector)
+    gated_input = voice_gate.install(session, detector)
+    if gated_input is not None:
+        session.on("close", lambda event: gated_input.close())
+
+    if on_close is not None:
+        session.on("close", lambda event: on_close())
+
+    if on_activity is not None:
+        @session.on("user_state_changed")
+        @session.on("agent_state_changed")
+        def _activity(event):
+            if event.new_state != "away":
+                on_activity()
+
+    # Let the model see the desktop (opt-in with VISION_ENABLED)
+    await vision.start(ctx.room, session)
+    return session
+
+
+async def release_services() -> None:
+    """
+    Job shutdown callback: release pooled HTTP connections, flush queued
+    emails, screenshots and memories, and stop the background pollers, the
+    weather prefetcher, the watchdog, the load reporter and the metrics
+    snapshots. Each job has its own process, which exits after this.
+    """
+    for close in (weather.close, http_client.close, mailer.close, memory.close, screenshots.close,
+                  system_monitor.close, processes.close, loop_watchdog.close, load.close, tool_metrics.close):
+        try:
+            await close()
+        except Exception as e:
+            logger.warning(f"{close.__module__}.close failed: {e}")
+
+
+async def stop_session(session: AgentSession) -> None:
+    """Tear down a session started by start_session, leaving the room connected."""
+    await vision.close()
+    await session.aclose()
+
+
+async def entrypoint(ctx: agents.JobContext):
+    job_start = time.perf_counter()
+    ctx.add_shutdown_callback(release_services)
+    # Stop screen sharing into this job's room
+    ctx.add_shutdown_callback(vision.close)
+    if wake.WAKE_MODE:
+        # Join the room but keep the realtime model closed until the wake word or hotkey
+        await ctx.connect()
+        controller = None
+
+        async def _activate() -> AgentSession:
+            # A goodbye ends the session early and goes back to listening
+            session = await start_session(ctx, on_activity=controller.touch, on_close=controller.end)
+            await session.generate_reply(instructions=WAKE_INSTRUCTION)
+            return session
+
+        controller = wake.ActivationController(_activate, stop_session)
+        wake_service = wake.WakeService(controller)
+        await wake_service.start(ctx.room)
+        ctx.add_shutdown_callback(wake_service.close)
+        tool_metrics.register_collector("wake", wake_service.stats, wake_service.prometheus_lines)
+        logger.info(f"Listening for the wake word {(time.perf_counter() - job_start) * 1000:.0f} ms after job start")
+    else:
+        # A goodbye ends this job: its room is left and the worker keeps taking jobs
+        session = await start_session(ctx, on_close=lambda: ctx.shutdown(reason="session closed"))
+
+    # Keep system metrics and the process index warm so the system tools answer instantly
+    system_monitor.get_sampler()
+    processes.get_index()
+    # Keep the weather for often asked-about cities fresh in the local store
+    weather.get_service().start()
+    # Log and count anything that blocks the event loop (and with it the audio)
+    watchdog = loop_watchdog.get_watchdog()
+    # Tell the worker how loaded this job is (loop lag, heavy tools in flight)
+    load.get_reporter(watchdog.current_lag)
+    # Per-tool latency histograms, served by the worker on http://127.0.0.1:9464/metrics
+    tool_metrics.get_writer()
+
+    if wake.WAKE_MODE:
+        return
+
     await ctx.connect()
 
     await session.generate_reply(
         instructions=SESSION_INSTRUCTION,
     )
+    logger.info(f"Greeting requested {(time.perf_counter() - job_start) * 1000:.0f} ms after job start")
+
+
+_metrics_task: Optional[asyncio.Task] = None
+
+
+def start_metrics_server() -> None:
+    """Runs in the worker process as it starts: serves every job's metrics on one port, before any job arrives."""
+    global _metrics_task
+    _metrics_task = asyncio.get_running_loop().create_task(tool_metrics.start_server())
+
+
+def build_server() -> agents.AgentServer:
+    """The worker: jobs run entrypoint, and the metrics endpoint comes up with the worker itself."""
+    server = agents.AgentServer.from_server_options(agents.WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        # Dispatch by loop lag, CPU, memory and heavy tools in flight, not CPU alone
+        load_fnc=load.worker_load,
+        load_threshold=load.LOAD_THRESHOLD,
+        request_fnc=load.admit,
+    ))
+    server.on("worker_started", start_metrics_server)
+    return server
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    agents.cli.run_app(build_server())
@@ -0,0 +1,247 @@
+"""
+Cached audio device resolver.
+
+DeviceResolver enumerates the sound devices once, indexes them by
+normalized name and by capability (input/output), and answers the
+AUDIO_* device settings from that index for every job.
+
+PortAudio snapshots the device list when it is initialized, so
+re-enumerating never shows a device plugged in after startup. Seeing one
+means re-initializing PortAudio, which goes through sounddevice's private
+API and breaks any stream that is open at the time. By default that is
+never done, and a hot-plugged device needs a worker restart. With
+AUDIO_DEVICE_RESCAN a lookup miss re-initializes PortAudio once: the one
+case where a device was actually asked for and isn't in the list.
+"""
+import logging
+import os
+from typing import Callable, NamedTuple, Optional
+
+from cache import normalize_key
+
+# Re-initialize PortAudio on a lookup miss to find hot-plugged devices
+AUDIO_DEVICE_RESCAN = os.getenv("AUDIO_DEVICE_RESCAN", "false").lower() in ("1", "true", "yes")
+
+INPUT = "input"
+OUTPUT = "output"
+
+
+class AudioDevice(NamedTuple):
+    index: int
+    name: str
+    max_input_channels: int
+    max_output_channels: int
+
+    def supports(self, kind: str) -> bool:
+        if kind == INPUT:
+            return self.max_input_channels > 0
+        return self.max_output_channels > 0
+
+
+def _query_sounddevice(rescan: bool) -> list:
+    """
+    Enumerate devices through sounddevice.
+
+    PortAudio snapshots the device list when it is initialized, so a rescan
+    re-initializes it to see devices plugged in since. That uses private
+    sounddevice functions and invalidates open streams.
+    """
+    import sounddevice as sd  # deferred: loading PortAudio is only needed when configuring devices
+
+    if rescan:
+        sd._terminate()
+        sd._initialize()
+    return [dict(dev) for dev in sd.query_devices()]
+
+
+class DeviceResolver:
+    def __init__(
+        self,
+        query_fn: Callable[[bool], list] = _query_sounddevice,
+        rescan_on_miss: bool = AUDIO_DEVICE_RESCAN,
+    ) -> None:
+        """
+        Args:
+            query_fn: Returns the raw device list (dicts with name and
+                max_input_channels/max_output_channels); called with True
+                when it should look for newly attached devices
+            rescan_on_miss: Ask query_fn to look for new devices when a lookup misses
+        """
+        self.query_fn = query_fn
+        self.rescan_on_miss = rescan_on_miss
+        self._devices: list = []
+        self._by_name: dict = {}
+        self._fingerprint: Optional[tuple] = None
+        # Bumped whenever the device list actually changes
+        self.generation = 0
+        self.enumerations = 0
+        self._resolved: dict = {}
+
+    def refresh(self, rescan: bool = False) -> bool:
+        """
+        Re-enumerate the devices. Returns True if the device list changed.
+
+        Args:
+            rescan: Look for newly attached devices (restarts PortAudio)
+        """
+        raw = self.query_fn(rescan)
+        self.enumerations += 1
+        devices = [
+            AudioDevice(
+                index=dev.get("index", i),
+                name=dev["name"],
+                max_input_channels=dev.get("max_input_channels", 0),
+                max_output_channels=dev.get("max_output_channels", 0),
+            )
+            for i, dev in enumerate(raw)
+        ]
+        fingerprint = tuple(devices)
+        if fingerprint == self._fingerprint:
+            return False
+
+        by_name = {}
+        for dev in devices:
+            by_name.setdefault(normalize_key(dev.name), []).append(dev)
+        if self._fingerprint is not None:
+            logging.info(f"Audio devices changed ({len(self._devices)} -> {len(devices)} devices)")
+        self._devices = devices
+        self._by_name = by_name
+        self._fingerprint = fingerprint
+        self._resolved.clear()
+        self.generation += 1
+        return True
+
+    def _ensure_fresh(self) -> None:
+        if self._fingerprint is None:
+            self.refresh()
+
+    def _rescan(self) -> bool:
+        """After a miss: restart PortAudio to look for the device, if allowed."""
+        return self.rescan_on_miss and self.refresh(rescan=True)
+
+    @property
+    def devices(self) -> list:
+        self._ensure_fresh()
+        return list(self._devices)
+
+    def _match(self, name: str, kind: str) -> Optional[AudioDevice]:
+        key = normalize_key(name)
+        for dev in self._by_name.get(key, ()):
+            if dev.supports(kind):
+                return dev
+        # Fall back to a substring match, as the old name lookup did
+        for dev_key, devs in self._by_name.items():
+            if key in dev_key:
+                for dev in devs:
+                    if dev.supports(kind):
+                        return dev
+        return None
+
+    def find(self, name: str, kind: str = INPUT) -> Optional[AudioDevice]:
+        """
+        Find a device by name (exact normalized match first, then substring).
+
+        Args:
+            name: Device name or part of it, case-insensitive
+            kind: INPUT or OUTPUT; the device must have channels of that kind
+
+        With AUDIO_DEVICE_RESCAN, a miss rescans once in case the device was just plugged in.
+        """
+        self._ensure_fresh()
+        dev = self._match(name, kind)
+        if dev is None and self._rescan():
+            dev = self._match(name, kind)
+        return dev
+
+    def get(self, index: int, kind: str = INPUT) -> Optional[AudioDevice]:
+        """Return the device at this index if it exists and supports `kind`."""
+        self._ensure_fresh()
+        for dev in self._devices:
+            if dev.index == index:
+                return dev if dev.supports(kind) else None
+        if self._rescan():
+            return self.get(index, kind)
+        return None
+
+    def resolve(
+        self,
+        input_index: Optional[str] = None,
+        input_name: Optional[str] = None,
+        output_index: Optional[str] = None,
+        output_name: Optional[str] = None,
+    ) -> tuple:
+        """
+        Resolve the AUDIO_* settings to device indexes. An explicit index wins
+        over a name. Results are memoized until the device list changes (a rescan).
+
+        Returns:
+            (input device index, output device index), either may be None
+        """
+        settings = (input_index, input_name, output_index, output_name)
+        if not any(settings):
+            # Nothing configured: keep the system defaults without touching PortAudio
+            return None, None
+        self._ensure_fresh()
+        if settings in self._resolved:
+            return self._resolved[settings]
+
+        chosen = []
+        missed = False
+        for kind, index, name in ((INPUT, input_index, input_name), (OUTPUT, output_index, output_name)):
+            dev = None
+            if index:
+                try:
+                    dev = self.get(int(index), kind)
+                except ValueError:
+                    logging.warning(f"Invalid AUDIO_{kind.upper()}_DEVICE_INDEX: {index}")
+                else:
+                    if dev is None:
+                        logging.warning(f"No {kind} device at index {index}")
+            elif name:
+                dev = self.find(name, kind)
+                if dev is None:
+                    logging.warning(f"No {kind} device matching '{name}'")
+            missed = missed or (dev is None and bool(index or name))
+            if dev is not None:
+                logging.info(f"Using audio {kind} device: {dev.name} (index {dev.index})")
+            chosen.append(dev.index if dev is not None else None)
+
+        result = tuple(chosen)
+        # A miss is only final when it can't be rescanned; otherwise the next job looks again
+        if not missed or not self.rescan_on_miss:
+            self._resolved[settings] = result
+        return result
+
+    def resolve_from_env(self) -> tuple:
+        """resolve() with the AUDIO_* environment variables."""
+        return self.resolve(
+            os.getenv("AUDIO_INPUT_DEVICE_INDEX"),
+            os.getenv("AUDIO_INPUT_DEVICE_NAME"),
+            os.getenv("AUDIO_OUTPUT_DEVICE_INDEX"),
+            os.getenv("AUDIO_OUTPUT_DEVICE_NAME"),
+        )
+
+
+def apply(input_index: Optional[int], output_index: Optional[int]) -> None:
+    """Make the resolved devices sounddevice's defaults (no-op if neither is set)."""
+    if input_index is None and output_index is None:
+        return
+    import sounddevice as sd
+
+    current_in, current_out = sd.default.device
+    sd.default.device = (
+        input_index if input_index is not None else current_in,
+        output_index if output_index is not None else current_out,
+    )
+    logging.info(f"Set sounddevice default devices to {sd.default.device}")
+
+
+_resolver: Optional[DeviceResolver] = None
+
+
+def get_resolver() -> DeviceResolver:
+    """Return the shared device resolver."""
+    global _resolver
+    if _resolver is None:
+        _resolver = DeviceResolver()
+    return _resolver
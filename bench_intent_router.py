@@ -0,0 +1,80 @@
+"""
+End-to-end latency for common voice commands with and without the fast path.
+
+Without the router a command waits for the realtime model to turn the
+transcript into a tool call; with it, the tool runs once the transcript is
+final. The model round trip is simulated with a latency distribution
+(override with --model-ms MEAN), the tools are instant stand-ins, so the
+numbers are the time from final transcript to the action happening.
+
+Usage: python bench_intent_router.py [runs] [--model-ms MEAN]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from intent_router import INTENT_PATTERNS, IntentRouter
+
+COMMANDS = [
+    "pause the music", "resume", "next track", "previous song", "volume up",
+    "turn it down", "mute", "unmute", "what time is it", "what's the date today",
+]
+# Phrases the router must leave to the model
+FALLBACKS = [
+    "play some lofi on youtube", "what time is it in new york", "pause the music and check my email",
+    "close chrome", "how's the weather",
+]
+
+
+def make_tools() -> dict:
+    async def tool(context, **kwargs):
+        return "Done, Boss."
+
+    return {name: tool for _, name, _ in INTENT_PATTERNS}
+
+
+async def via_model(router: IntentRouter, text: str, model_ms: float) -> float:
+    start = time.perf_counter()
+    # Realtime round trip until the model emits the tool call
+    await asyncio.sleep(max(0.05, random.gauss(model_ms, model_ms / 4)) / 1000)
+    intent = router.match(text)
+    await router.tools[intent.tool](None, **intent.kwargs)
+    return time.perf_counter() - start
+
+
+async def via_router(router: IntentRouter, text: str) -> float:
+    start = time.perf_counter()
+    await router.handle(text)
+    return time.perf_counter() - start
+
+
+async def main(runs: int, model_ms: float) -> None:
+    router = IntentRouter(make_tools())
+    without = [await via_model(router, text, model_ms) for _ in range(runs) for text in COMMANDS]
+    with_router = [await via_router(router, text) for _ in range(runs) for text in COMMANDS]
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        for text in COMMANDS + FALLBACKS:
+            router.match(text)
+    match_us = (time.perf_counter() - start) / (runs * (len(COMMANDS) + len(FALLBACKS))) * 1e6
+    wrongly_matched = [text for text in FALLBACKS if router.match(text)]
+
+    print(f"{'path':<14}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, samples in (("model", without), ("fast path", with_router)):
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{name:<14}{statistics.median(samples) * 1000:>10.2f}{p95 * 1000:>10.2f}")
+    print(f"\nmatch cost: {match_us:.1f} us per utterance")
+    print(f"fallback phrases wrongly matched: {len(wrongly_matched)}/{len(FALLBACKS)}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    model_ms = 700.0
+    if "--model-ms" in sys.argv:
+        model_ms = float(sys.argv[sys.argv.index("--model-ms") + 1])
+        args = [a for a in args if a != sys.argv[sys.argv.index("--model-ms") + 1]]
+    asyncio.run(main(int(args[0]) if args else 3, model_ms))
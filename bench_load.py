@@ -0,0 +1,158 @@
+"""
+Soak benchmark for admission control: ramps up simulated sessions on one
+event loop and records tool-call latency as they pile up.
+
+A job request arrives every --interval seconds and goes through
+WorkerLoad.admit. Each session it accepts calls an instrumented tool every
+~50 ms. The tool holds the loop for --block-ms, like pyautogui or psutil
+work, then waits on a thread. Each session reports its in-flight tools and
+the loop lag as its own job, the way separate job processes would. Runs
+once with admission control and once accepting everything.
+
+Usage: python bench_load.py [requests] [--interval=0.15] [--block-ms=4] [--hold=1.5]
+"""
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+
+import load
+import tool_metrics
+from loop_watchdog import LoopWatchdog
+
+
+@tool_metrics.instrument
+async def simulated_tool(block: float, io: float) -> str:
+    time.sleep(block)  # on-loop work, as in pyautogui or psutil calls
+    await asyncio.to_thread(time.sleep, io)
+    return "ok"
+
+
+class FakeJob:
+    def __init__(self, job_id: str) -> None:
+        self.id = job_id
+
+
+class FakeRequest:
+    """The parts of JobRequest admission uses."""
+
+    def __init__(self, job_id: str) -> None:
+        self.job = FakeJob(job_id)
+        self.outcome = None
+
+    async def accept(self) -> None:
+        self.outcome = "accepted"
+
+    async def reject(self, *, terminate: bool = True) -> None:
+        self.outcome = "refused"
+
+
+class SimulatedJob:
+    """One session, reporting as its own job process would (they all share this loop's lag)."""
+
+    def __init__(self, lag_fn) -> None:
+        self.lag_fn = lag_fn
+        self.in_flight = 0
+
+    def report(self) -> dict:
+        return {"lag": self.lag_fn(), "tools": self.in_flight, "at": time.time()}
+
+    async def run(self, block: float, latencies: list, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await asyncio.sleep(random.uniform(0.03, 0.07))
+            start = time.perf_counter()
+            self.in_flight += 1
+            try:
+                await simulated_tool(block, 0.005)
+            finally:
+                self.in_flight -= 1
+            latencies.append((time.perf_counter(), time.perf_counter() - start))
+
+
+async def soak(requests: int = 30, interval: float = 0.15, block: float = 0.004, hold: float = 1.5,
+               admission: bool = True, queue_seconds: float = 0.3) -> dict:
+    """
+    Returns:
+        accepted, refused, peak sessions, p50/p99 tool latency and p99 loop lag
+        (seconds), and latency p99 per number of running sessions
+    """
+    random.seed(3)
+    watchdog = LoopWatchdog(threshold=10, interval=0.01)
+    watchdog.start()
+    jobs: list = []
+    worker = load.WorkerLoad(
+        model=load.LoadModel(lag_budget=0.05),
+        threshold=0.75 if admission else float("inf"),
+        queue_seconds=queue_seconds,
+        reports_fn=lambda: [job.report() for job in jobs],
+        # Only what the sessions do here should count, not the rest of the machine
+        system_fn=lambda: (0.0, float("inf")),
+    )
+    stop = asyncio.Event()
+    latencies: list = []
+    sessions: list = []
+    running_at: list = []
+    admitting: list = []
+
+    async def request(i: int) -> None:
+        req = FakeRequest(f"job-{i}")
+        await worker.admit(req)
+        if req.outcome == "accepted":
+            jobs.append(SimulatedJob(watchdog.current_lag))
+            sessions.append(asyncio.create_task(jobs[-1].run(block, latencies, stop)))
+            running_at.append((time.perf_counter(), len(sessions)))
+
+    for i in range(requests):
+        admitting.append(asyncio.create_task(request(i)))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*admitting)
+    await asyncio.sleep(hold)
+    stop.set()
+    await asyncio.gather(*sessions)
+    await watchdog.stop()
+
+    by_sessions: dict = {}
+    for at, latency in latencies:
+        count = sum(1 for started, _ in running_at if started <= at)
+        by_sessions.setdefault(count, []).append(latency)
+    values = sorted(latency for _, latency in latencies)
+    return {
+        "accepted": worker.accepted,
+        "refused": worker.refused,
+        "queued": worker.queued,
+        "peak_sessions": len(sessions),
+        "p50": statistics.median(values),
+        "p99": values[int(len(values) * 0.99)],
+        "lag_p99": watchdog.lag.percentile(99) / 1_000_000,
+        "p99_by_sessions": {
+            count: sorted(samples)[int(len(samples) * 0.99)] for count, samples in sorted(by_sessions.items())
+        },
+    }
+
+
+def main(argv: list) -> None:
+    requests = int(next((arg for arg in argv if not arg.startswith("--")), "30"))
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    kwargs = {
+        "requests": requests,
+        "interval": float(options.get("interval", "0.15")),
+        "block": float(options.get("block-ms", "4")) / 1000,
+        "hold": float(options.get("hold", "1.5")),
+    }
+    # Refusals are expected here; keep the table readable
+    logging.getLogger().setLevel(logging.ERROR)
+    for admission in (False, True):
+        result = asyncio.run(soak(admission=admission, **kwargs))
+        print(f"\n{'with' if admission else 'without'} admission control: {result['accepted']} accepted, "
+              f"{result['refused']} refused ({result['queued']} waited)")
+        print(f"  tool latency p50 {result['p50'] * 1000:.1f} ms, p99 {result['p99'] * 1000:.1f} ms; "
+              f"loop lag p99 {result['lag_p99'] * 1000:.1f} ms")
+        print(f"  {'sessions':>8}  {'p99 ms':>8}")
+        for count, p99 in result["p99_by_sessions"].items():
+            print(f"  {count:>8}  {p99 * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,66 @@
+"""
+Screenshot encoding benchmark on a synthetic 4K frame.
+
+Compares Pillow's default PNG (level 6, what take_screenshot used to do on
+the event loop) with the pipeline's fast encoders, at full resolution and
+downscaled to 1920 px wide. Runs headless: the frame is generated, not
+captured.
+
+Usage: python bench_screenshots.py [runs]
+"""
+import io
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+from screenshots import downscale, encode_options
+
+WIDTH, HEIGHT = 3840, 2160
+DOWNSCALED_WIDTH = 1920
+
+VARIANTS = [
+    ("png level 6", "png", {"png_level": 6}),
+    ("png level 1", "png", {"png_level": 1}),
+    ("webp", "webp", {}),
+    ("jpeg", "jpeg", {}),
+]
+
+
+def synthetic_frame() -> Image.Image:
+    """A desktop-like frame: gradients, flat panels and lots of small text."""
+    frame = Image.linear_gradient("L").resize((WIDTH, HEIGHT)).convert("RGB")
+    draw = ImageDraw.Draw(frame)
+    for i in range(12):
+        draw.rectangle((i * 300, 100 + i * 40, i * 300 + 700, 900 + i * 40), fill=(30 + i * 15, 60, 120))
+    for row in range(0, HEIGHT, 18):
+        draw.text((20, row), "The quick brown fox jumps over the lazy dog 0123456789 " * 6, fill=(230, 230, 230))
+    return frame
+
+
+def time_encode(frame: Image.Image, fmt: str, max_width: int, **kwargs) -> tuple[float, int]:
+    """Return (seconds, encoded bytes) for one downscale + encode."""
+    options = encode_options(fmt, **kwargs)
+    start = time.perf_counter()
+    image = downscale(frame, max_width)
+    if options["format"] == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return time.perf_counter() - start, buffer.tell()
+
+
+def main(runs: int) -> None:
+    frame = synthetic_frame()
+    print(f"{'encoder':<14}{'size':>8}{'p50 ms':>10}{'max ms':>10}{'KiB':>10}")
+    for max_width, size_label in ((0, "4K"), (DOWNSCALED_WIDTH, "1080p")):
+        for label, fmt, kwargs in VARIANTS:
+            samples = [time_encode(frame, fmt, max_width, **kwargs) for _ in range(runs)]
+            times = [t for t, _ in samples]
+            print(f"{label:<14}{size_label:>8}{statistics.median(times) * 1000:>10.0f}"
+                  f"{max(times) * 1000:>10.0f}{samples[-1][1] / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,55 @@
+"""
+Time-to-first-result benchmark: streaming vs batch search.
+
+Uses a synthetic blocking search function with per-backend latencies, so it
+runs offline and is repeatable.
+
+Usage: python bench_search.py [runs]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from web_search import SearchPool
+
+# Typical spread of backend response times (seconds)
+BACKEND_LATENCY = {"duckduckgo": (0.15, 0.45), "brave": (0.25, 0.7), "mojeek": (0.3, 0.9), "wikipedia": (0.1, 0.3)}
+
+
+def synthetic_search(query, backend, max_results, timeout):
+    low, high = BACKEND_LATENCY[backend]
+    time.sleep(random.uniform(low, high))
+    return [{"title": f"{backend} {i}", "body": query, "href": f"https://{backend}.example/{i}"} for i in range(3)]
+
+
+async def time_batch(pool: SearchPool) -> float:
+    start = time.perf_counter()
+    await pool.search("benchmark query", max_results=5)
+    return time.perf_counter() - start
+
+
+async def time_stream(pool: SearchPool) -> float:
+    start = time.perf_counter()
+    stream = pool.stream("benchmark query", max_results=5)
+    await stream.first_batch()
+    elapsed = time.perf_counter() - start
+    await stream.drain()
+    return elapsed
+
+
+async def main(runs: int) -> None:
+    pool = SearchPool(max_workers=len(BACKEND_LATENCY), backends=list(BACKEND_LATENCY), search_fn=synthetic_search)
+    batch = [await time_batch(pool) for _ in range(runs)]
+    stream = [await time_stream(pool) for _ in range(runs)]
+    pool.shutdown()
+
+    print(f"{'mode':<10}{'p50 ms':>10}{'max ms':>10}")
+    for name, samples in (("batch", batch), ("stream", stream)):
+        print(f"{name:<10}{statistics.median(samples) * 1000:>10.0f}{max(samples) * 1000:>10.0f}")
+    print(f"time-to-first-result speedup: {statistics.median(batch) / statistics.median(stream):.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,61 @@
+"""
+Worker startup import benchmark based on `python -X importtime`.
+
+Compares importing tools.py as the worker does now (heavy dependencies
+deferred) with eagerly importing those dependencies as the old top-level
+imports did. Each variant runs in a fresh interpreter.
+
+Usage: python bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+# What tools.py and agent.py used to import at module load
+HEAVY_MODULES = ["pyautogui", "psutil", "smtplib", "email.mime.multipart", "email.mime.text", "ddgs", "requests", "sounddevice"]
+
+LAZY = "import tools"
+EAGER = "import tools\n" + "\n".join(
+    # Some of these fail without a display or PortAudio; what they import up to the failure still counts
+    f"try:\n    import {name}\nexcept Exception:\n    pass" for name in HEAVY_MODULES
+)
+
+
+def import_times(code: str) -> tuple[float, dict]:
+    """Run code under -X importtime; return (total ms, {top-level module: cumulative ms})."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only count modules imported directly by the script, not their children
+        if not name.startswith("  "):
+            modules[name.strip()] = int(cumulative) / 1000
+    return sum(modules.values()), modules
+
+
+def main(runs: int) -> None:
+    lazy = [import_times(LAZY) for _ in range(runs)]
+    eager = [import_times(EAGER) for _ in range(runs)]
+    lazy_ms = statistics.median(total for total, _ in lazy)
+    eager_ms = statistics.median(total for total, _ in eager)
+
+    print(f"{'variant':<10}{'import ms (median)':>20}")
+    print(f"{'eager':<10}{eager_ms:>20.0f}")
+    print(f"{'lazy':<10}{lazy_ms:>20.0f}")
+    print(f"saved {eager_ms - lazy_ms:.0f} ms ({(1 - lazy_ms / eager_ms) * 100:.0f}%) per worker start")
+
+    _, modules = eager[-1]
+    print("\nheaviest deferred modules (eager run):")
+    for name in HEAVY_MODULES:
+        if name in modules:
+            print(f"  {name:<24}{modules[name]:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
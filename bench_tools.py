@@ -0,0 +1,472 @@
+"""
+Offline benchmark of every tool in tools.py, with a regression gate.
+
+Each tool is called through its FunctionTool wrapper with a fake
+RunContext. The outside world is replaced with local stand-ins: a stub
+wttr.in server, a fake DDGS search function, a local SMTP sink
+(aiosmtpd), and fake pyautogui, psutil, browser and process launchers.
+No network, display or audio is needed, and nothing is opened or killed.
+
+Per tool it reports:
+    p50/p99 latency  - wall time of one call
+    block p99        - the longest single stretch a call held the event loop
+                       (the time audio would stall), 99th percentile
+    alloc KiB        - peak memory allocated during one call (tracemalloc)
+
+Results are compared with bench_tools_baseline.json. A tool regresses when
+a metric exceeds its baseline by both the relative and the absolute
+margin, and then the run exits with status 1.
+
+Usage: python bench_tools.py [runs] [--update-baseline] [--tool NAME]
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import webbrowser
+
+from livekit.agents import llm
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_tools_baseline.json")
+# Allowed growth over the baseline before a metric counts as a regression
+REL_TOLERANCE = 0.5
+ABS_TOLERANCE_MS = 2.0
+ALLOC_SLACK_KIB = 64.0
+
+# Arguments each tool is benchmarked with
+CASES = {
+    "get_weather": {"city": "London"},
+    "search_web": {"query": "python asyncio"},
+    "send_email": {"to_email": "boss@example.com", "subject": "Benchmark", "message": "Hello"},
+    "control_volume": {"action": "up"},
+    "open_application": {"app_name": "calculator"},
+    "close_application": {"app_name": "notepad"},
+    "open_website": {"site_name": "github"},
+    "search_google": {"query": "livekit agents"},
+    "get_system_status": {},
+    "get_schedule": {"day": "monday"},
+    "get_next_event": {},
+    "check_availability": {"time": "3 PM", "day": "tuesday"},
+    "get_time_and_date": {},
+    "take_screenshot": {"filename": "bench"},
+    "play_music": {"query": "lofi beats"},
+    "control_media": {"action": "pause"},
+    "open_youtube_music": {"query": "lofi"},
+    "open_spotify": {"query": "lofi"},
+    "close_assistant": {},
+    "force_close_application": {"app_name": "notepad"},
+    "close_browser": {"browser": None},
+    "close_youtube": {},
+}
+
+# Outputs that mean the stand-ins weren't wired up right
+FAILURE_MARKERS = ("could not", "error", "failed", "don't know", "unknown")
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.shutdowns = 0
+
+    def shutdown(self, *, drain: bool = True) -> None:
+        self.shutdowns += 1
+
+
+class FakeRunContext:
+    """Stands in for RunContext, with only the attributes the real one has."""
+
+    def __init__(self) -> None:
+        self.session = FakeSession()
+        self.speech_handle = None
+        self.function_call = None
+        self.userdata = {}
+
+
+# ---- fake pyautogui ----
+
+def make_fake_pyautogui() -> types.ModuleType:
+    from PIL import Image
+
+    module = types.ModuleType("pyautogui")
+    module.presses = []
+    frame = Image.linear_gradient("L").resize((1920, 1080)).convert("RGB")
+    module.press = module.presses.append
+    module.screenshot = lambda: frame.copy()
+    return module
+
+
+# ---- fake psutil ----
+
+class _PsutilError(Exception):
+    pass
+
+
+class _NoSuchProcess(_PsutilError):
+    pass
+
+
+class _AccessDenied(_PsutilError):
+    pass
+
+
+class _ZombieProcess(_NoSuchProcess):
+    pass
+
+
+class FakeProcess:
+    """Always running: terminate() succeeds but the process is back for the next run."""
+
+    def __init__(self, pid: int, name: str, cpu: float) -> None:
+        self.pid = pid
+        self._name = name
+        self.info = {"name": name, "cpu_percent": cpu, "memory_percent": cpu / 4}
+
+    def name(self) -> str:
+        return self._name
+
+    def is_running(self) -> bool:
+        return True
+
+    def terminate(self) -> None:
+        pass
+
+    def kill(self) -> None:
+        pass
+
+
+def make_fake_psutil() -> types.ModuleType:
+    module = types.ModuleType("psutil")
+    names = ["chrome.exe", "chrome.exe", "msedge.exe", "firefox.exe", "notepad.exe", "explorer.exe", "python"]
+    # Enough unrelated processes that index lookups are not trivially small
+    names += [f"service{i}" for i in range(300)]
+    table = {1000 + i: FakeProcess(1000 + i, name, float(i % 37)) for i, name in enumerate(names)}
+
+    def process(pid):
+        if pid not in table:
+            raise _NoSuchProcess(pid)
+        return table[pid]
+
+    module.Error = _PsutilError
+    module.NoSuchProcess = _NoSuchProcess
+    module.AccessDenied = _AccessDenied
+    module.ZombieProcess = _ZombieProcess
+    module.pids = lambda: list(table)
+    module.Process = process
+    module.process_iter = lambda attrs=None: iter(list(table.values()))
+    module.wait_procs = lambda procs, timeout=None: (list(procs), [])
+    module.cpu_percent = lambda interval=None: 12.5
+    module.virtual_memory = lambda: types.SimpleNamespace(percent=48.0)
+    module.disk_usage = lambda path: types.SimpleNamespace(percent=61.0)
+    module.sensors_battery = lambda: types.SimpleNamespace(percent=87, power_plugged=True)
+    module.youtube_pid = 1000  # the first chrome.exe has a YouTube window
+    return module
+
+
+# ---- fake DDGS ----
+
+def fake_ddgs(query, backend, max_results, timeout):
+    return [{"title": f"{backend} result {i}", "body": f"About {query}", "href": f"https://{backend}.example/{i}"}
+            for i in range(max_results)]
+
+
+class _Patches:
+    """setattr with undo, like pytest's monkeypatch."""
+
+    def __init__(self) -> None:
+        self._undo = []
+
+    def setattr(self, target, name: str, value) -> None:
+        missing = object()
+        self._undo.append((False, target, name, getattr(target, name, missing), missing))
+        setattr(target, name, value)
+
+    def setitem(self, mapping, key, value) -> None:
+        missing = object()
+        self._undo.append((True, mapping, key, mapping.get(key, missing), missing))
+        mapping[key] = value
+
+    def undo(self) -> None:
+        for is_item, target, name, old, missing in reversed(self._undo):
+            if is_item:
+                if old is missing:
+                    target.pop(name, None)
+                else:
+                    target[name] = old
+            elif old is missing:
+                delattr(target, name)
+            else:
+                setattr(target, name, old)
+        self._undo.clear()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class OfflineEnvironment:
+    """Point every tool dependency at a local stand-in; undo it all on exit."""
+
+    def __init__(self) -> None:
+        self.patches = _Patches()
+        self.opened: list = []
+        self.launched: list = []
+        self._tmp = None
+        self._runner = None
+        self._smtp = None
+
+    async def __aenter__(self) -> "OfflineEnvironment":
+        from aiohttp import web
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import AuthResult
+
+        import mailer
+        import processes
+        import schedule
+        import screenshots
+        import system_monitor
+        import tools
+        import weather
+        from cache import TTLCache
+        from web_search import SearchPool
+
+        p = self.patches
+        self._tmp = tempfile.TemporaryDirectory()
+
+        # wttr.in stand-in
+        async def report(request):
+            return web.Response(text=f"{request.match_info['city']}: ⛅️ +12°C\n")
+
+        app = web.Application()
+        app.router.add_get("/{city}", report)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        # max_age=0: every call goes all the way to the stub
+        p.setattr(weather, "_service", weather.WeatherService(
+            weather.WttrProvider(base_url), weather.ForecastStore(":memory:"), max_age=0))
+
+        # DDGS stand-in
+        p.setattr(tools, "SEARCH_POOL", SearchPool(backends=["duckduckgo"], search_fn=fake_ddgs))
+        p.setattr(tools, "SEARCH_CACHE", TTLCache("bench-search", ttl=0))
+
+        # SMTP sink
+        class Sink:
+            async def handle_DATA(self, server, session, envelope):
+                return "250 OK"
+
+        port = _free_port()
+        self._smtp = Controller(
+            Sink(), hostname="127.0.0.1", port=port, auth_require_tls=False,
+            authenticator=lambda *args: AuthResult(success=True, handled=False),
+        )
+        self._smtp.start()
+        p.setitem(os.environ, "GMAIL_USER", "bench@example.com")
+        p.setitem(os.environ, "GMAIL_APP_PASSWORD", "secret")
+        p.setattr(mailer, "_mailer", mailer.SMTPMailer(
+            "127.0.0.1", port, user="bench@example.com", password="secret", starttls=False))
+
+        # Desktop stand-ins
+        pyautogui = make_fake_pyautogui()
+        psutil = make_fake_psutil()
+        p.setitem(sys.modules, "pyautogui", pyautogui)
+        p.setitem(sys.modules, "psutil", psutil)
+        p.setattr(tools, "pyautogui", pyautogui)
+        p.setattr(tools, "psutil", psutil)
+        p.setattr(processes, "psutil", psutil)
+        p.setattr(processes, "_index", None)
+        p.setattr(processes, "_engine", processes.TerminationEngine(
+            window_titles_fn=lambda: {psutil.youtube_pid: ["Lofi beats - YouTube - Google Chrome"]}))
+        p.setattr(system_monitor, "_sampler", None)
+        p.setattr(screenshots, "_pipeline", screenshots.ScreenshotPipeline(
+            capture_fn=pyautogui.screenshot, directory=self._tmp.name))
+        p.setattr(schedule, "_schedule", schedule.Schedule())
+
+        p.setattr(webbrowser, "open", lambda url, *args, **kwargs: self.opened.append(url) or True)
+        p.setattr(subprocess, "Popen", lambda args, *a, **kw: self.launched.append(args))
+        p.setattr(os, "startfile", lambda target, *args: self.launched.append(target))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        import http_client
+        import mailer
+        import processes
+        import screenshots
+        import system_monitor
+        import weather
+
+        await screenshots.close()
+        await system_monitor.close()
+        await processes.close()
+        await mailer.close()
+        await weather.close()
+        await http_client.close()
+        self._smtp.stop()
+        await self._runner.cleanup()
+        self.patches.undo()
+        self._tmp.cleanup()
+
+
+class _StepMeter:
+    """Drive an awaitable and time each step it runs on the event loop."""
+
+    def __init__(self, awaitable) -> None:
+        self._iter = awaitable.__await__()
+        self.longest = 0.0
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                future = self._iter.throw(error) if error is not None else self._iter.send(value)
+            except StopIteration as stop:
+                self.longest = max(self.longest, time.perf_counter() - start)
+                return stop.value
+            self.longest = max(self.longest, time.perf_counter() - start)
+            value, error = None, None
+            try:
+                value = yield future
+            except BaseException as e:
+                error = e
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _call(tool, kwargs: dict):
+    return await tool(FakeRunContext(), **kwargs)
+
+
+async def measure(tool, kwargs: dict, runs: int) -> dict:
+    """Latency, loop blocking and allocation figures for one tool."""
+    result = await _call(tool, kwargs)  # warm-up (first-use setup, imports)
+    latencies, blocking = [], []
+    for _ in range(runs):
+        meter = _StepMeter(_call(tool, kwargs))
+        start = time.perf_counter()
+        result = await meter
+        latencies.append(time.perf_counter() - start)
+        blocking.append(meter.longest)
+
+    # A separate pass: tracing allocations slows everything down
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await _call(tool, kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "block_ms": _percentile(blocking, 0.99) * 1000,
+        "alloc_kib": max(0, peak - baseline) / 1024,
+        "result": result,
+    }
+
+
+def all_tools() -> dict:
+    import tools
+
+    return {obj.info.name: obj for obj in vars(tools).values() if llm.is_function_tool(obj)}
+
+
+async def run_suite(runs: int, only: list = ()) -> tuple:
+    """
+    Returns:
+        ({tool name: figures}, [problems]) - problems are tools without a
+        benchmark case and tools whose output looks like an error
+    """
+    tools_by_name = all_tools()
+    problems = [f"{name}: no benchmark case" for name in tools_by_name if name not in CASES]
+    results = {}
+    async with OfflineEnvironment():
+        for name in sorted(tools_by_name):
+            if name not in CASES or (only and name not in only):
+                continue
+            figures = await measure(tools_by_name[name], CASES[name], runs)
+            output = str(figures["result"]).lower()
+            if any(marker in output for marker in FAILURE_MARKERS):
+                problems.append(f"{name}: {figures['result']}")
+            results[name] = figures
+    return results, problems
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """Regressions of results against the baseline, as readable strings."""
+    regressions = []
+    for name, figures in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for metric in ("p99_ms", "block_ms"):
+            limit = expected[metric] * (1 + REL_TOLERANCE) + ABS_TOLERANCE_MS
+            if figures[metric] > limit:
+                regressions.append(f"{name} {metric}: {figures[metric]:.2f} > {limit:.2f} (baseline {expected[metric]:.2f})")
+        limit = expected["alloc_kib"] * (1 + REL_TOLERANCE) + ALLOC_SLACK_KIB
+        if figures["alloc_kib"] > limit:
+            regressions.append(f"{name} alloc_kib: {figures['alloc_kib']:.0f} > {limit:.0f} (baseline {expected['alloc_kib']:.0f})")
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results: dict, path: str = BASELINE_PATH) -> None:
+    figures = {name: {k: round(v, 3) for k, v in r.items() if k != "result"} for name, r in sorted(results.items())}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(figures, f, indent=2)
+        f.write("\n")
+
+
+async def main(runs: int, update: bool, only: list) -> int:
+    results, problems = await run_suite(runs, only)
+    baseline = load_baseline()
+
+    print(f"{'tool':<26}{'p50 ms':>9}{'p99 ms':>9}{'block ms':>10}{'alloc KiB':>11}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['block_ms']:>10.2f}{r['alloc_kib']:>11.0f}")
+
+    for problem in problems:
+        print(f"PROBLEM  {problem}")
+    if update:
+        save_baseline({**baseline, **results} if only else results)
+        print(f"\nBaseline written to {os.path.basename(BASELINE_PATH)}")
+        return 1 if problems else 0
+
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f"REGRESSION  {regression}")
+    if not baseline:
+        print("\nNo baseline yet; run with --update-baseline to record one")
+    elif not regressions:
+        print("\nNo regressions against the baseline")
+    return 1 if problems or regressions else 0
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    only = []
+    if "--tool" in sys.argv:
+        name = sys.argv[sys.argv.index("--tool") + 1]
+        only = [name]
+        args = [a for a in args if a != name]
+    sys.exit(asyncio.run(main(int(args[0]) if args else 50, "--update-baseline" in sys.argv, only)))
@@ -0,0 +1,146 @@
+"""
+Voice gate benchmark: upstream audio saved and end-of-turn latency.
+
+Frames are replayed through GatedAudioInput as the room would deliver
+them (10 ms each). A stand-in for the model's turn detection counts
+consecutive quiet audio as it arrives and ends a turn after
+--server-silence-ms of it. End-of-turn times are compared with the same
+stand-in fed everything (no gate).
+
+Without arguments it synthesizes a conversation: speech-like bursts of
+1-4 s separated by 2-8 s pauses in a quiet room, gated on energy. WAV files
+(16-bit) are gated with Silero when it loads.
+
+Usage: python bench_voice_gate.py [file.wav ...] [--server-silence-ms=800] [--quiet-rms=200]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import numpy as np
+from livekit import rtc
+from livekit.agents.voice import io
+
+import voice_gate
+from bench_wake import read_wav
+
+RATE = 16000
+FRAME_SAMPLES = RATE // 100
+
+
+def synthesize(seconds: float = 180.0, seed: int = 2) -> np.ndarray:
+    """A quiet room with speech-like bursts of 1-4 s every 3-12 s."""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 40, int(seconds * RATE))
+    at = 1.0
+    while at < seconds - 5:
+        length = rng.uniform(1.0, 4.0)
+        t = np.arange(int(length * RATE)) / RATE
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+        voiced = sum(np.sin(2 * np.pi * f * t + rng.uniform(0, 6)) for f in (180, 360, 540, 1200))
+        i = int(at * RATE)
+        audio[i:i + len(t)] += envelope * (rng.normal(0, 500, len(t)) + 600 * voiced)
+        at += length + rng.uniform(2.0, 8.0)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def to_frames(audio: np.ndarray) -> list:
+    return [rtc.AudioFrame(audio[i:i + FRAME_SAMPLES].tobytes(), RATE, 1, FRAME_SAMPLES)
+            for i in range(0, len(audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES)]
+
+
+class ReplayInput(io.AudioInput):
+    """Yields recorded frames, remembering the audio time of the last one read."""
+
+    def __init__(self, frames: list) -> None:
+        super().__init__(label="Replay")
+        self._frames = iter(frames)
+        self.now = 0.0
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        try:
+            frame = next(self._frames)
+        except StopIteration:
+            raise StopAsyncIteration
+        self.now += frame.duration
+        return frame
+
+
+class TurnDetectorStandIn:
+    """Ends a turn after `silence` seconds of quiet audio following loud audio."""
+
+    def __init__(self, silence: float, quiet_rms: float) -> None:
+        self.silence = silence
+        self.quiet_rms = quiet_rms
+        self._quiet = 0.0
+        self._in_turn = False
+        self.turn_ends: list = []
+
+    def receive(self, frame: rtc.AudioFrame, now: float) -> None:
+        samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float64)
+        if np.sqrt(np.mean(samples ** 2)) >= self.quiet_rms:
+            self._in_turn, self._quiet = True, 0.0
+            return
+        self._quiet += frame.duration
+        if self._in_turn and self._quiet >= self.silence:
+            self._in_turn = False
+            self.turn_ends.append(now)
+
+
+async def replay(frames: list, gated: bool, detector, server_silence: float, quiet_rms: float) -> tuple:
+    """(turn end times, gate stats or None, CPU seconds spent per input second)"""
+    source = ReplayInput(frames)
+    turns = TurnDetectorStandIn(server_silence, quiet_rms)
+    audio_input = voice_gate.GatedAudioInput(source, voice_gate.VoiceActivity(detector)) if gated else source
+    cpu = time.process_time()
+    async for frame in audio_input:
+        turns.receive(frame, source.now)
+    cpu = time.process_time() - cpu
+    if gated:
+        audio_input.close()
+    return turns.turn_ends, audio_input.gate.stats() if gated else None, cpu / max(source.now, 1e-9)
+
+
+def pair(reference: list, other: list, window: float = 3.0) -> list:
+    """How much earlier each reference turn end happened in `other`."""
+    gains = []
+    for end in reference:
+        match = min(other, key=lambda t: abs(t - end), default=None)
+        if match is not None and abs(match - end) <= window:
+            gains.append(end - match)
+    return gains
+
+
+def report(name: str, audio: np.ndarray, detector, server_silence: float, quiet_rms: float) -> None:
+    frames = to_frames(audio)
+    seconds = len(audio) / RATE
+    plain, _, _ = asyncio.run(replay(frames, False, detector, server_silence, quiet_rms))
+    gated, stats, cpu = asyncio.run(replay(frames, True, detector, server_silence, quiet_rms))
+    gains = pair(plain, gated)
+    print(f"\n{name}: {seconds:.0f} s, {type(detector).__name__}")
+    print(f"  frames in {stats['frames_in']}, sent {stats['frames_sent']} "
+          f"({stats['tail_frames']} tail), dropped {stats['frames_dropped']}")
+    print(f"  upstream audio saved: {stats['saved_percent']}% "
+          f"({stats['bytes_saved'] * 60 / seconds / 1024:.0f} KiB per minute)")
+    print(f"  turns: {len(plain)} ungated, {len(gated)} gated, {len(gains)} matched")
+    if gains:
+        print(f"  end of turn earlier by p50 {statistics.median(gains) * 1000:.0f} ms, "
+              f"min {min(gains) * 1000:.0f} ms, max {max(gains) * 1000:.0f} ms")
+    print(f"  gate CPU: {cpu * 100:.2f}% of one core")
+
+
+def main(argv: list) -> None:
+    paths = [arg for arg in argv if not arg.startswith("--")]
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    server_silence = float(options.get("server-silence-ms", "800")) / 1000
+    quiet_rms = float(options.get("quiet-rms", "200"))
+    if paths:
+        for path in paths:
+            report(path, read_wav(path), voice_gate.create_detector(), server_silence, quiet_rms)
+    else:
+        report("synthetic conversation", synthesize(), voice_gate.EnergyDetector(), server_silence, quiet_rms)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,164 @@
+"""
+Wake listener benchmark: CPU cost, detection latency and false triggers on
+recorded audio, plus trigger-to-session latency with a stubbed connect.
+
+Without arguments it synthesizes a recording: a quiet room with speech-like
+bursts and a few 1 kHz tone "wake words", run through the ToneDetector.
+WAV files (16 kHz mono 16-bit) are run through Porcupine when
+PICOVOICE_ACCESS_KEY is set, or the tone detector otherwise; for those,
+latency and false triggers are only reported if the wake word times are
+given (--wake-at=12.5,40.2).
+
+Usage: python bench_wake.py [file.wav ...] [--wake-at=seconds,...] [--connect-ms=300]
+"""
+import asyncio
+import statistics
+import sys
+import time
+import wave
+
+import numpy as np
+
+import wake
+
+TONE_HZ = 1000.0
+
+
+def synthesize(seconds: float = 120.0, wake_at: tuple = (20.0, 55.0, 90.0), speech_every: float = 7.0,
+               seed: int = 1) -> np.ndarray:
+    """
+    A quiet room (low noise) with a one-second speech-like burst every
+    `speech_every` seconds and a 0.5 s tone at each `wake_at` second.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * wake.SAMPLE_RATE)
+    audio = rng.normal(0, 40, n)
+    t = np.arange(int(1.0 * wake.SAMPLE_RATE)) / wake.SAMPLE_RATE
+    # Noise shaped by a 4 Hz syllable envelope and a few formant-ish partials
+    envelope = 0.5 * (1 - np.cos(2 * np.pi * 4 * t))
+    for start in np.arange(3.0, seconds - 1.0, speech_every):
+        i = int(start * wake.SAMPLE_RATE)
+        voiced = sum(np.sin(2 * np.pi * f * t + rng.uniform(0, 6)) for f in (220, 440, 660, 1400))
+        audio[i:i + len(t)] += envelope * (rng.normal(0, 600, len(t)) + 700 * voiced)
+    tone_t = np.arange(int(0.5 * wake.SAMPLE_RATE)) / wake.SAMPLE_RATE
+    for at in wake_at:
+        i = int(at * wake.SAMPLE_RATE)
+        audio[i:i + len(tone_t)] += 3000 * np.sin(2 * np.pi * TONE_HZ * tone_t)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def read_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        channels, rate = f.getnchannels(), f.getframerate()
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != wake.SAMPLE_RATE:
+        positions = np.arange(0, len(audio), rate / wake.SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.int16)
+    return audio
+
+
+def make_detector(synthetic: bool):
+    if not synthetic and wake.PICOVOICE_ACCESS_KEY:
+        try:
+            return wake.create_porcupine()
+        except Exception as e:
+            print(f"Porcupine unavailable ({e}); using the tone detector")
+    return wake.ToneDetector(TONE_HZ)
+
+
+def run_listener(audio: np.ndarray, detector, gated: bool) -> tuple:
+    """
+    Push the recording through a listener frame by frame on this thread.
+
+    Returns:
+        (listener, CPU seconds, detection times in audio seconds)
+    """
+    listener = wake.WakeListener(detector, on_wake=lambda keyword: None, gate=wake.EnergyGate() if gated else None)
+    size = detector.frame_length
+    detections = []
+    cpu_start = time.thread_time()
+    for i in range(0, len(audio) - size + 1, size):
+        if listener.process(audio[i:i + size]) is not None:
+            detections.append((i + size) / wake.SAMPLE_RATE)
+    return listener, time.thread_time() - cpu_start, detections
+
+
+def score(detections: list, wake_at: tuple, window: float = 2.0) -> tuple:
+    """(detection latencies from each wake word's start, missed count, false trigger count)."""
+    latencies, matched = [], set()
+    for at in wake_at:
+        hit = next((d for d in detections if at <= d <= at + window), None)
+        if hit is None:
+            continue
+        latencies.append(hit - at)
+        matched.add(hit)
+    return latencies, len(wake_at) - len(latencies), len([d for d in detections if d not in matched])
+
+
+async def activation_latency(connect_seconds: float, runs: int = 20) -> list:
+    """Trigger-to-session times through the ActivationController with a stubbed connect."""
+    samples = []
+    ready = asyncio.Event()
+
+    async def start():
+        await asyncio.sleep(connect_seconds)
+        ready.set()
+        return object()
+
+    async def stop(session):
+        pass
+
+    controller = wake.ActivationController(start, stop, idle_timeout=0.01)
+    for _ in range(runs):
+        ready.clear()
+        began = time.perf_counter()
+        controller.trigger("bench")
+        await ready.wait()
+        samples.append(time.perf_counter() - began)
+        while controller.active:
+            await asyncio.sleep(0.005)
+    await controller.close()
+    return samples
+
+
+def report(name: str, audio: np.ndarray, synthetic: bool, wake_at: tuple) -> None:
+    seconds = len(audio) / wake.SAMPLE_RATE
+    print(f"\n{name}: {seconds:.0f} s of audio")
+    print(f"{'mode':<10}{'cpu %':>8}{'detected %':>12}{'latency ms':>12}{'missed':>8}{'false':>7}")
+    for gated in (False, True):
+        listener, cpu, detections = run_listener(audio, make_detector(synthetic), gated)
+        share = 100 * listener.detected_frames / max(listener.frames, 1)
+        if wake_at:
+            latencies, missed, false = score(detections, wake_at)
+            latency = f"{statistics.median(latencies) * 1000:.0f}" if latencies else "-"
+        else:
+            latency, missed, false = "-", "-", len(detections)
+        print(f"{'gated' if gated else 'ungated':<10}{100 * cpu / seconds:>8.2f}{share:>12.1f}"
+              f"{latency:>12}{missed:>8}{false:>7}")
+
+
+def main(argv: list) -> None:
+    paths = [arg for arg in argv if not arg.startswith("--")]
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    connect = float(options.get("connect-ms", "300")) / 1000
+    if paths:
+        wake_at = tuple(float(x) for x in options["wake-at"].split(",")) if "wake-at" in options else ()
+        for path in paths:
+            report(path, read_wav(path), synthetic=False, wake_at=wake_at)
+    else:
+        wake_at = (20.0, 55.0, 90.0)
+        report("synthetic room", synthesize(wake_at=wake_at), synthetic=True, wake_at=wake_at)
+
+    samples = asyncio.run(activation_latency(connect))
+    overhead = [s - connect for s in samples]
+    print(f"\nTrigger to session with a {connect * 1000:.0f} ms connect: "
+          f"p50 {statistics.median(samples) * 1000:.0f} ms, controller overhead p50 "
+          f"{statistics.median(overhead) * 1000:.1f} ms, max {max(overhead) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
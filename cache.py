@@ -0,0 +1,193 @@
+"""
+In-process result cache for the web-facing tools.
+
+TTLCache is a bounded LRU map with a per-instance time-to-live and hit/miss
+counters. With stale_while_revalidate enabled, an expired entry is still
+returned immediately while a background task refreshes it, so repeat
+questions never wait on the network. Concurrent misses for one key share a
+single fetch instead of each going to the network.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+
+def normalize_key(text: str) -> str:
+    """Normalize a city or query so 'London ' and 'london' share an entry."""
+    return " ".join(text.lower().split())
+
+
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 128,
+        ttl: float = 300.0,
+        stale_while_revalidate: bool = False,
+        max_stale: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            name: Label used in logs and stats
+            maxsize: Maximum number of entries before LRU eviction
+            ttl: Seconds an entry stays fresh
+            stale_while_revalidate: Serve expired entries while refreshing them
+            max_stale: Seconds past expiry an entry may still be served (None = no limit)
+            clock: Time source, injectable for tests
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale = max_stale
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        # Misses that waited on another caller's fetch rather than starting one
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> tuple[bool, Any, bool]:
+        """
+        Look up a key without fetching.
+
+        Returns:
+            (found, value, is_stale)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None, False
+        stored_at, value = entry
+        age = self._clock() - stored_at
+        if age <= self.ttl:
+            self._entries.move_to_end(key)
+            return True, value, False
+        if self.stale_while_revalidate and (self.max_stale is None or age <= self.ttl + self.max_stale):
+            self._entries.move_to_end(key)
+            return True, value, True
+        del self._entries[key]
+        return False, None, False
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: value is not None,
+    ) -> Any:
+        """
+        Return the cached value for key, calling fetch() on a miss.
+
+        A fetch that raises, or whose value fails should_cache (by default a
+        None value), is not cached. A miss while the key is already being
+        fetched waits for that fetch and gets its value or its exception.
+        """
+        found, value, stale = self.get(key)
+        if found and not stale:
+            self.hits += 1
+            return value
+        if found and stale:
+            self.stale_hits += 1
+            self._schedule_refresh(key, fetch, should_cache)
+            return value
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(key, fetch, should_cache))
+            task.add_done_callback(lambda done: self._fetched(key, done))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller giving up doesn't cancel the fetch the others wait on
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool],
+    ) -> Any:
+        value = await fetch()
+        if should_cache(value):
+            self.set(key, value)
+        return value
+
+    def _fetched(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marks the exception retrieved when every waiter was cancelled
+            task.exception()
+
+    def _schedule_refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool],
+    ) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                value = await fetch()
+                if should_cache(value):
+                    self.set(key, value)
+            except Exception as e:
+                logging.warning(f"Background refresh of {self.name} cache entry '{key}' failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+def prometheus_lines(caches: list) -> list:
+    """Metrics for several caches, one label value per cache name."""
+    stats = [cache.stats() for cache in caches]
+    lines = [
+        "# HELP nevira_cache_lookups_total Cache lookups by result.",
+        "# TYPE nevira_cache_lookups_total counter",
+    ]
+    for s in stats:
+        for result, key in (("hit", "hits"), ("stale_hit", "stale_hits"), ("miss", "misses")):
+            lines.append(f'nevira_cache_lookups_total{{cache="{s["name"]}",result="{result}"}} {s[key]}')
+    lines.append("# HELP nevira_cache_evictions_total Entries evicted to stay under maxsize.")
+    lines.append("# TYPE nevira_cache_evictions_total counter")
+    lines.extend(f'nevira_cache_evictions_total{{cache="{s["name"]}"}} {s["evictions"]}' for s in stats)
+    lines.append("# HELP nevira_cache_entries Entries currently cached.")
+    lines.append("# TYPE nevira_cache_entries gauge")
+    lines.extend(f'nevira_cache_entries{{cache="{s["name"]}"}} {s["size"]}' for s in stats)
+    return lines
@@ -0,0 +1,68 @@
+"""
+Shared async HTTP client for the web-facing tools.
+
+Every worker process keeps one pooled, keep-alive aiohttp session so tools
+like get_weather never block the event loop and never pay a fresh TCP/TLS
+handshake per call. Call close() from the job shutdown callback.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import aiohttp
+
+# Timeouts (seconds) and pool size can be tuned from .env
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "8"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Return the shared session, creating it on first use.
+
+    The session is bound to the running event loop, so a new one is created
+    if the previous loop has gone away (e.g. between test runs).
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+        )
+        timeout = aiohttp.ClientTimeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            sock_read=HTTP_READ_TIMEOUT,
+        )
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _session_loop = loop
+        logging.info("Created shared HTTP session (pool size %s)", HTTP_POOL_SIZE)
+    return _session
+
+
+async def fetch_text(url: str, params: Optional[dict] = None) -> tuple[int, str]:
+    """
+    GET a URL through the shared session.
+
+    Returns:
+        (status code, response body as text)
+    """
+    session = get_session()
+    async with session.get(url, params=params) as response:
+        return response.status, await response.text()
+
+
+async def close() -> None:
+    """Close the shared session and its pooled connections."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logging.info("Closed shared HTTP session")
+    _session = None
+    _session_loop = None
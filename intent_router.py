@@ -0,0 +1,155 @@
+"""
+Deterministic fast path for trivial voice commands.
+
+IntentRouter matches the final transcript of a user turn against a small
+set of precompiled, fully anchored patterns ("pause the music", "volume
+up", "what time is it", "next track"). On a match it runs the tool right
+away instead of waiting for the realtime model to decide to call it.
+Anything that doesn't match a pattern end to end (extra clauses, other
+requests) is left to the model.
+
+The realtime model still hears the same audio and will usually call the
+same tool a moment later. Tools wrapped with @fast_path recognize that
+repeat and return the result the router already got instead of acting
+twice, which matters for toggles like play/pause. A repeat is recognized by
+the key the action presses, not its wording: "play" after the router's
+"pause" is the same playpause toggle. Entries only cover the turn that
+produced them and are dropped when Boss starts speaking again.
+"""
+import functools
+import inspect
+import logging
+import os
+import re
+import time
+from typing import Callable, NamedTuple, Optional
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+# How long a model call repeating a fast-path action is answered from the router's result
+FAST_PATH_DEDUPE_SECONDS = float(os.getenv("FAST_PATH_DEDUPE_SECONDS", "8"))
+
+# Filler allowed around a command without making it ambiguous
+_PREFIX = r"^(?:(?:hey|ok|okay)\s+)?(?:nevira[,\s]+)?(?:(?:please|can you|could you|would you)\s+)?"
+_SUFFIX = r"(?:[,\s]+(?:please|now|nevira|boss))*[.!?\s]*$"
+
+
+class Intent(NamedTuple):
+    tool: str
+    kwargs: dict
+
+
+# (pattern body, tool name, tool kwargs), in the spirit of the AGENT_INSTRUCTION examples
+INTENT_PATTERNS = [
+    (r"(?:pause|pause (?:the |my )?(?:music|song|track|playback|video))", "control_media", {"action": "pause"}),
+    (r"(?:resume|unpause|resume (?:the |my )?(?:music|song|playback)|play (?:the |my )?music again)", "control_media", {"action": "play"}),
+    (r"(?:next|skip)(?: (?:the )?(?:track|song))?(?: please)?|play (?:the )?next (?:track|song)", "control_media", {"action": "next"}),
+    (r"(?:previous|last|go back)(?: (?:a |one )?(?:track|song))?|play (?:the )?previous (?:track|song)", "control_media", {"action": "previous"}),
+    (r"stop (?:the |my )?(?:music|song|playback)", "control_media", {"action": "stop"}),
+    (r"(?:turn (?:the )?volume up|turn it up|volume up|louder|increase (?:the )?volume|raise (?:the )?volume)", "control_volume", {"action": "up"}),
+    (r"(?:turn (?:the )?volume down|turn it down|volume down|quieter|decrease (?:the )?volume|lower (?:the )?volume)", "control_volume", {"action": "down"}),
+    (r"(?:mute|mute (?:the )?(?:volume|sound|audio))", "control_volume", {"action": "mute"}),
+    (r"(?:unmute|unmute (?:the )?(?:volume|sound|audio))", "control_volume", {"action": "unmute"}),
+    (
+        r"(?:what(?:'s| is) the time|what time is it|what(?:'s| is) (?:the |today's )?date|what day is (?:it|today)"
+        r"|what(?:'s| is) the (?:time and date|date and time))(?: (?:right )?now| today)?",
+        "get_time_and_date",
+        {},
+    ),
+]
+
+
+def _compile(patterns: list) -> list:
+    return [(re.compile(_PREFIX + f"(?:{body})" + _SUFFIX, re.IGNORECASE), Intent(tool, kwargs))
+            for body, tool, kwargs in patterns]
+
+
+# Action spellings the tools treat as the same key press (tools.control_media/control_volume)
+ACTION_ALIASES = {
+    "control_media": {"play": "playpause", "pause": "playpause", "skip": "next", "back": "previous", "prev": "previous"},
+    "control_volume": {"mute": "volumemute", "silence": "volumemute", "unmute": "volumemute",
+                       "increase": "up", "raise": "up", "decrease": "down", "lower": "down"},
+}
+
+
+def _call_key(tool: str, kwargs: dict) -> tuple:
+    aliases = ACTION_ALIASES.get(tool, {})
+    values = {k: str(v).lower().strip() for k, v in kwargs.items()}
+    if "action" in values:
+        values["action"] = aliases.get(values["action"], values["action"])
+    return tool, tuple(sorted(values.items()))
+
+
+# (tool, args) -> (result, time) of actions the router has already performed this turn
+_handled: dict = {}
+
+
+def new_turn() -> None:
+    """Boss started speaking again: what the router did before is no longer a repeat."""
+    _handled.clear()
+
+
+def fast_path(func):
+    """
+    Let a tool answer the model's repeat of an action the router already
+    performed with the router's result, instead of performing it again.
+    Apply it under @instrumented_tool().
+    """
+    name = func.__name__
+    signature = inspect.signature(func)
+    context_param = next(iter(signature.parameters))
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        call_args = {k: v for k, v in bound.arguments.items() if k != context_param}
+        handled = _handled.pop(_call_key(name, call_args), None)
+        if handled is not None and time.monotonic() - handled[1] <= FAST_PATH_DEDUPE_SECONDS:
+            logging.info(f"{name}{call_args} already handled by the fast path")
+            return handled[0]
+        return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class IntentRouter:
+    def __init__(self, tools: dict, patterns: list = INTENT_PATTERNS, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            tools: Tool name -> function tool (called as tool(context, **kwargs))
+            patterns: (pattern body, tool name, kwargs) triples
+            clock: Time source
+        """
+        self.tools = tools
+        self.clock = clock
+        self._patterns = [(pattern, intent) for pattern, intent in _compile(patterns) if intent.tool in tools]
+        self.matched = 0
+        self.fallbacks = 0
+
+    def match(self, text: str) -> Optional[Intent]:
+        """The intent if the whole utterance is one known command, else None."""
+        text = " ".join(text.split())
+        for pattern, intent in self._patterns:
+            if pattern.match(text):
+                return intent
+        return None
+
+    async def handle(self, text: str, context=None) -> Optional[str]:
+        """
+        Run the tool for a recognized command.
+
+        Returns:
+            The tool's result, or None if the model should handle the turn
+        """
+        intent = self.match(text)
+        if intent is None:
+            self.fallbacks += 1
+            return None
+        self.matched += 1
+        start = self.clock()
+        result = await self.tools[intent.tool](context, **intent.kwargs)
+        _handled[_call_key(intent.tool, intent.kwargs)] = (result, time.monotonic())
+        logging.info(f"Fast path ran {intent.tool}{intent.kwargs} for '{text}' in {(self.clock() - start) * 1000:.0f} ms")
+        return result
+
+    def stats(self) -> dict:
+        return {"matched": self.matched, "fallbacks": self.fallbacks}
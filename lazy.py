@@ -0,0 +1,42 @@
+"""
+Deferred imports for heavy tool dependencies.
+
+Importing tools.py should only build the @function_tool schemas. Modules
+like pyautogui (which probes the display), psutil and smtplib are bound as
+LazyModule placeholders and imported on the first attribute access, i.e.
+the first time a tool actually uses them. A failed import (missing package,
+no display) surfaces inside that tool's own error handling instead of
+breaking worker startup.
+"""
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._module = None
+
+    def load(self) -> types.ModuleType:
+        """Import the real module now (a no-op once loaded)."""
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        if attr == "_module":
+            super().__setattr__(attr, value)
+        else:
+            setattr(self.load(), attr, value)
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a placeholder that imports `name` on first use."""
+    return LazyModule(name)
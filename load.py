@@ -0,0 +1,322 @@
+"""
+Load reporting and admission control for the worker.
+
+LiveKit dispatches jobs to workers by the load each one reports. By
+default that is CPU alone, which misses what actually hurts a voice
+session here: event-loop lag (audio stutters) and a pile-up of heavy tools
+like take_screenshot or force_close_application. The score combines four
+things, each as a fraction of its budget:
+
+- event-loop lag: the worst recent loop lag across the jobs, against
+  LOAD_LAG_BUDGET_MS
+- CPU: system CPU use
+- memory: LOAD_MEMORY_RESERVE_MB against the memory still available, so it
+  only counts once memory is about to run out (a desktop sitting at 70%
+  RAM has plenty left)
+- tools: tool calls in flight, weighted by cost, against LOAD_TOOL_SLOTS
+
+The score is the highest of the four, capped at 1: the first resource to
+run out decides how many sessions fit.
+
+Jobs run in their own processes, so each job writes a small report (its
+loop lag and weighted in-flight tools) to LOAD_STATE_DIR every second.
+The worker's load function reads them. Above LOAD_THRESHOLD LiveKit stops
+sending the worker jobs. Below it, a job request is only accepted if one
+more session's share of load still fits. Otherwise the request waits up
+to LOAD_QUEUE_SECONDS for load to drop, and is then refused so another
+worker can take it. A worker with no jobs always takes one: with a single
+worker on the desktop, it is the only place the session can go.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Callable, Optional
+
+import tool_metrics
+from lazy import lazy_import
+
+psutil = lazy_import("psutil")
+
+LOAD_THRESHOLD = float(os.getenv("LOAD_THRESHOLD", "0.75"))
+LOAD_LAG_BUDGET_MS = float(os.getenv("LOAD_LAG_BUDGET_MS", "100"))
+# Available memory that counts as fully loaded
+LOAD_MEMORY_RESERVE_MB = float(os.getenv("LOAD_MEMORY_RESERVE_MB", "512"))
+LOAD_TOOL_SLOTS = float(os.getenv("LOAD_TOOL_SLOTS", "16"))
+LOAD_QUEUE_SECONDS = float(os.getenv("LOAD_QUEUE_SECONDS", "3"))
+# Load one session is assumed to add before any job has reported
+LOAD_JOB_ESTIMATE = float(os.getenv("LOAD_JOB_ESTIMATE", "0.1"))
+LOAD_STATE_DIR = os.getenv("LOAD_STATE_DIR", os.path.join(tempfile.gettempdir(), "nevira-load"))
+# Job reports older than this are from jobs that are gone
+REPORT_MAX_AGE = 5.0
+
+# Relative cost of a call in flight; unlisted tools count 1
+TOOL_WEIGHTS = {
+    "take_screenshot": 4,
+    "force_close_application": 3,
+    "close_application": 2,
+    "close_browser": 2,
+    "close_youtube": 2,
+    "get_system_status": 2,
+    "search_web": 2,
+}
+
+
+def parse_weights(spec: str) -> dict:
+    """"take_screenshot=6,search_web=1" -> {"take_screenshot": 6.0, "search_web": 1.0}"""
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() and weight.strip():
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+TOOL_WEIGHTS.update(parse_weights(os.getenv("LOAD_TOOL_WEIGHTS", "")))
+
+
+def weighted_tools(in_flight: dict, weights: dict = TOOL_WEIGHTS) -> float:
+    return sum(weights.get(name, 1) * count for name, count in in_flight.items())
+
+
+class LoadModel:
+    def __init__(
+        self,
+        lag_budget: float = LOAD_LAG_BUDGET_MS / 1000,
+        memory_reserve: float = LOAD_MEMORY_RESERVE_MB * 2**20,
+        tool_slots: float = LOAD_TOOL_SLOTS,
+    ) -> None:
+        """
+        Args:
+            lag_budget: Seconds of loop lag that count as fully loaded
+            memory_reserve: Bytes of available memory that count as fully loaded
+            tool_slots: Weighted tool calls in flight that count as fully loaded
+        """
+        self.lag_budget = lag_budget
+        self.memory_reserve = memory_reserve
+        self.tool_slots = tool_slots
+
+    def components(self, lag: float, cpu: float, available: float, tools: float) -> dict:
+        """Each input as a fraction of its budget (lag in seconds, cpu as 0-1, available memory in bytes)."""
+        return {
+            "lag": lag / self.lag_budget,
+            "cpu": cpu,
+            "memory": self.memory_reserve / available if available > 0 else 1.0,
+            "tools": tools / self.tool_slots,
+        }
+
+    def score(self, lag: float, cpu: float, available: float, tools: float) -> float:
+        return min(1.0, max(self.components(lag, cpu, available, tools).values()))
+
+
+class JobReporter:
+    """Writes this job process's loop lag and in-flight tool load for the worker to read."""
+
+    def __init__(self, lag_fn: Callable[[], float], state_dir: str = LOAD_STATE_DIR, interval: float = 1.0) -> None:
+        """
+        Args:
+            lag_fn: Current loop lag in seconds
+            state_dir: Directory shared with the worker
+            interval: Seconds between reports
+        """
+        self.lag_fn = lag_fn
+        self.path = os.path.join(state_dir, f"{os.getpid()}.json")
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(state_dir, exist_ok=True)
+
+    def report(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "lag": self.lag_fn(),
+            "tools": weighted_tools(tool_metrics.in_flight()),
+            "at": time.time(),
+        }
+
+    def write(self) -> None:
+        """Blocking; replaces the report atomically."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f)
+        os.replace(tmp, self.path)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError as e:
+                logging.warning(f"Could not write the load report: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def read_reports(state_dir: str = LOAD_STATE_DIR, now: Optional[float] = None) -> list:
+    """Fresh job reports. Blocking (reads files)."""
+    now = now if now is not None else time.time()
+    reports = []
+    try:
+        names = os.listdir(state_dir)
+    except OSError:
+        return reports
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(state_dir, name), encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - report.get("at", 0) <= REPORT_MAX_AGE:
+            reports.append(report)
+    return reports
+
+
+class WorkerLoad:
+    """The worker side: computes the load score and decides on job requests."""
+
+    def __init__(
+        self,
+        model: Optional[LoadModel] = None,
+        threshold: float = LOAD_THRESHOLD,
+        queue_seconds: float = LOAD_QUEUE_SECONDS,
+        reports_fn: Callable[[], list] = read_reports,
+        system_fn: Optional[Callable[[], tuple]] = None,
+    ) -> None:
+        """
+        Args:
+            model: How the inputs combine into a score
+            threshold: Score at which the worker is full
+            queue_seconds: How long a job request may wait for load to drop
+            reports_fn: Returns the running jobs' reports
+            system_fn: Returns (cpu as 0-1, available memory in bytes) (psutil by default)
+        """
+        self.model = model or LoadModel()
+        self.threshold = threshold
+        self.queue_seconds = queue_seconds
+        self.reports_fn = reports_fn
+        self.system_fn = system_fn or self._system
+        # Requests accepted whose job hasn't reported yet
+        self.admitting = 0
+        self.accepted = 0
+        self.queued = 0
+        self.refused = 0
+        self.last_components: dict = {}
+
+    @staticmethod
+    def _system() -> tuple:
+        return psutil.cpu_percent(interval=None) / 100, psutil.virtual_memory().available
+
+    def measure(self) -> tuple:
+        """
+        Blocking (reads job reports and system counters).
+
+        Returns:
+            (score, number of reporting jobs)
+        """
+        reports = self.reports_fn()
+        cpu, available = self.system_fn()
+        lag = max((r["lag"] for r in reports), default=0.0)
+        tools = sum(r["tools"] for r in reports)
+        self.last_components = self.model.components(lag, cpu, available, tools)
+        return self.model.score(lag, cpu, available, tools), len(reports)
+
+    def load(self) -> float:
+        """The score reported to LiveKit (WorkerOptions.load_fnc)."""
+        score, jobs = self.measure()
+        if not jobs and not self.admitting:
+            # Idle: never report full, or nothing would take the session
+            return min(score, self.threshold - LOAD_JOB_ESTIMATE)
+        return min(1.0, score + self.admitting * self._per_job(score, jobs))
+
+    @staticmethod
+    def _per_job(score: float, jobs: int) -> float:
+        return max(score / jobs, LOAD_JOB_ESTIMATE) if jobs else LOAD_JOB_ESTIMATE
+
+    def has_room(self) -> bool:
+        """Blocking. Whether one more session fits under the threshold (always, when idle)."""
+        score, jobs = self.measure()
+        if not jobs and not self.admitting:
+            return True
+        return score + (self.admitting + 1) * self._per_job(score, jobs) <= self.threshold
+
+    async def admit(self, request) -> None:
+        """WorkerOptions.request_fnc: accept if there's room, else wait a little, else refuse."""
+        deadline = time.monotonic() + self.queue_seconds
+        waited = False
+        while not await asyncio.to_thread(self.has_room):
+            if time.monotonic() >= deadline:
+                self.refused += 1
+                logging.warning(f"Refusing job {request.job.id}: worker load {self.last_components}")
+                # Not terminal: the job goes to another worker
+                await request.reject(terminate=False)
+                return
+            waited = True
+            await asyncio.sleep(0.25)
+        if waited:
+            self.queued += 1
+        self.accepted += 1
+        self.admitting += 1
+        try:
+            await request.accept()
+        finally:
+            # The job reports for itself from here on
+            asyncio.get_running_loop().call_later(REPORT_MAX_AGE / 2, self._admitted)
+
+    def _admitted(self) -> None:
+        self.admitting = max(0, self.admitting - 1)
+
+
+_reporter: Optional[JobReporter] = None
+_worker_load: Optional[WorkerLoad] = None
+
+
+def get_reporter(lag_fn: Optional[Callable[[], float]] = None) -> JobReporter:
+    """Return this job process's reporter, starting it on first use."""
+    global _reporter
+    if _reporter is None:
+        _reporter = JobReporter(lag_fn or (lambda: 0.0), LOAD_STATE_DIR)
+    _reporter.start()
+    return _reporter
+
+
+def get_worker_load() -> WorkerLoad:
+    global _worker_load
+    if _worker_load is None:
+        _worker_load = WorkerLoad()
+    return _worker_load
+
+
+def worker_load() -> float:
+    """load_fnc for WorkerOptions."""
+    return get_worker_load().load()
+
+
+async def admit(request) -> None:
+    """request_fnc for WorkerOptions."""
+    await get_worker_load().admit(request)
+
+
+async def close() -> None:
+    """Stop reporting for this job process."""
+    global _reporter
+    if _reporter is not None:
+        await _reporter.close()
+        _reporter = None
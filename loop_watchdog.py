@@ -0,0 +1,182 @@
+"""
+Event-loop stall detector for the agent worker.
+
+A heartbeat task on the event loop wakes every few milliseconds and records
+how late it woke (the loop lag). A watcher thread checks the heartbeat; when
+it falls more than LOOP_STALL_THRESHOLD_MS behind, the loop is stuck in
+synchronous code, so the watcher snapshots the loop thread's stack, works
+out which tool is holding the loop and counts the stall against it. The
+stack is logged while the stall is still in progress, so even a loop that
+never recovers leaves a trace.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+
+import tool_metrics
+from tool_metrics import LATENCY_BUCKETS, Histogram, histogram_lines
+
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+LOOP_HEARTBEAT_MS = float(os.getenv("LOOP_HEARTBEAT_MS", "25"))
+RECENT_STALLS = 20
+
+
+class Stall(NamedTuple):
+    tool: str
+    # Seconds the loop had been blocked when the stack was taken
+    detected_after: float
+    stack: str
+
+
+def _attribute(frame) -> str:
+    """Name the culprit when no instrumented tool is running: the innermost frame outside asyncio."""
+    fallback = "<unknown>"
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(("asyncio", "threading", "selectors", "concurrent")):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback
+
+
+class LoopWatchdog:
+    def __init__(
+        self,
+        threshold: float = LOOP_STALL_THRESHOLD_MS / 1000,
+        interval: float = LOOP_HEARTBEAT_MS / 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            threshold: Seconds of lag beyond the heartbeat interval that count as a stall
+            interval: Seconds between heartbeats
+            clock: Time source
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.clock = clock
+        # Microseconds of lag per heartbeat
+        self.lag = Histogram()
+        # Seconds of lag of the heartbeats in the last two seconds
+        self.recent_lag: deque = deque(maxlen=max(1, int(2 / interval)))
+        self.stalls: dict = {}
+        self.recent: deque = deque(maxlen=RECENT_STALLS)
+        self._lock = threading.Lock()
+        self._beat = 0.0
+        self._current: Optional[Stall] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def total_stalls(self) -> int:
+        return sum(self.stalls.values())
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = self.clock()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = self.clock() + self.interval
+            await asyncio.sleep(self.interval)
+            now = self.clock()
+            lag = max(0.0, now - expected)
+            self.lag.record(lag * 1_000_000)
+            self.recent_lag.append(lag)
+            with self._lock:
+                self._beat = now
+                stall, self._current = self._current, None
+            if stall is not None:
+                logging.warning(f"Event loop was blocked for {lag * 1000:.0f} ms by {stall.tool}")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                blocked = self.clock() - self._beat - self.interval
+                if self._current is not None or blocked < self.threshold:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+                tool = tool_metrics.running_tool() or _attribute(frame)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                stall = Stall(tool=tool, detected_after=blocked, stack=stack)
+                self._current = stall
+                self.stalls[tool] = self.stalls.get(tool, 0) + 1
+                self.recent.append(stall)
+            logging.warning(f"Event loop stalled for over {blocked * 1000:.0f} ms in {tool}:\n{stack}")
+
+    def current_lag(self) -> float:
+        """95th percentile lag over the last two seconds, in seconds."""
+        if not self.recent_lag:
+            return 0.0
+        lags = sorted(self.recent_lag)
+        return lags[min(len(lags) - 1, int(len(lags) * 0.95))]
+
+    def snapshot(self) -> dict:
+        return {
+            "stalls": dict(self.stalls),
+            "lag_p50_ms": self.lag.percentile(50) / 1000,
+            "lag_p99_ms": self.lag.percentile(99) / 1000,
+            "lag_max_ms": self.lag.max / 1000,
+        }
+
+    def prometheus_lines(self) -> list:
+        lines = [
+            "# HELP nevira_event_loop_stalls_total Event loop stalls by the tool or function holding the loop.",
+            "# TYPE nevira_event_loop_stalls_total counter",
+        ]
+        for tool, count in sorted(self.stalls.items()):
+            lines.append(f'nevira_event_loop_stalls_total{{tool="{tool}"}} {count}')
+        lines.append("# HELP nevira_event_loop_lag_seconds Heartbeat lateness of the event loop.")
+        lines.append("# TYPE nevira_event_loop_lag_seconds histogram")
+        lines.extend(histogram_lines("nevira_event_loop_lag_seconds", "", self.lag, LATENCY_BUCKETS, 1_000_000))
+        return lines
+
+
+_watchdog: Optional[LoopWatchdog] = None
+
+
+def get_watchdog() -> LoopWatchdog:
+    """Return the shared watchdog, starting it on first use."""
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = LoopWatchdog()
+        tool_metrics.register_collector("event_loop", _watchdog.snapshot, _watchdog.prometheus_lines)
+    _watchdog.start()
+    return _watchdog
+
+
+async def close() -> None:
+    """Stop the shared watchdog."""
+    if _watchdog is not None:
+        await _watchdog.stop()
@@ -0,0 +1,240 @@
+"""
+Persistent SMTP connection manager with an async outbound queue.
+
+SMTPMailer keeps one authenticated SMTP session open and sends every
+message through it from a single background thread, so send_email never
+blocks the event loop and several emails in a row share one STARTTLS +
+login handshake. A dropped connection is re-established transparently.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import tool_metrics
+from lazy import lazy_import
+
+smtplib = lazy_import("smtplib")
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "15"))
+# Reconnect instead of reusing a session that has been idle this long
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "240"))
+
+
+class SMTPMailer:
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = SMTP_STARTTLS,
+        timeout: float = SMTP_TIMEOUT_SECONDS,
+        idle_timeout: float = SMTP_IDLE_SECONDS,
+    ) -> None:
+        """
+        Args:
+            host: SMTP server host
+            port: SMTP server port
+            user: Login user (no AUTH if None)
+            password: Login password
+            starttls: Upgrade the connection with STARTTLS before login
+            timeout: Socket timeout in seconds
+            idle_timeout: Seconds after which an idle session is replaced
+        """
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        # smtplib is blocking and not thread-safe: every SMTP call runs on this one thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._smtp = None
+        self._last_used = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Set once a login has succeeded with these credentials
+        self.verified = False
+        self.sent = 0
+        self.failed = 0
+        self.connects = 0
+
+    # ---- blocking helpers, only run on the SMTP thread ----
+
+    def _connect(self) -> None:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.starttls:
+            smtp.starttls()
+            smtp.ehlo()
+        if self.user:
+            smtp.login(self.user, self.password or "")
+        self._smtp = smtp
+        self._last_used = time.monotonic()
+        self.verified = True
+        self.connects += 1
+        logging.info(f"Opened SMTP session to {self.host}:{self.port}")
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+    def _send_blocking(self, from_addr: str, recipients: list, message: str) -> None:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self._disconnect()
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.sendmail(from_addr, recipients, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            logging.info(f"SMTP session dropped ({e}), reconnecting")
+            self._smtp.close()
+            self._smtp = None
+            self._connect()
+            self._smtp.sendmail(from_addr, recipients, message)
+        self._last_used = time.monotonic()
+
+    def _open_blocking(self) -> None:
+        if self._smtp is None:
+            self._connect()
+
+    # ---- async API ----
+
+    async def verify(self) -> None:
+        """
+        Log in once if no login has succeeded yet, so bad credentials are reported
+        before a message is queued. The session stays open for the first send.
+
+        Raises:
+            smtplib.SMTPAuthenticationError: The server rejected the credentials
+            smtplib.SMTPException, OSError: The server could not be reached
+        """
+        if not self.verified:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._open_blocking)
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._queue = asyncio.Queue()
+            self._loop = loop
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            from_addr, recipients, message, future = await self._queue.get()
+            try:
+                await loop.run_in_executor(self._executor, self._send_blocking, from_addr, recipients, message)
+                self.sent += 1
+                logging.info(f"Email delivered to {', '.join(recipients)}")
+                if not future.done():
+                    future.set_result(None)
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Email delivery to {', '.join(recipients)} failed: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def enqueue(self, from_addr: str, recipients: list, message: str) -> asyncio.Future:
+        """
+        Queue a message for delivery and return immediately.
+
+        Returns:
+            A future that resolves when the message is sent (or raises the
+            SMTP error). It is safe to ignore it.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        # Mark the exception as retrieved so fire-and-forget sends don't warn
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._queue.put_nowait((from_addr, recipients, message, future))
+        return future
+
+    async def send(self, from_addr: str, recipients: list, message: str) -> None:
+        """Queue a message and wait until it has been delivered."""
+        await self.enqueue(from_addr, recipients, message)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def close(self) -> None:
+        """Flush queued messages, QUIT the SMTP session and stop the SMTP thread."""
+        if self._worker is not None and not self._worker.done():
+            await self._queue.join()
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._disconnect)
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": self.pending,
+            "connects": self.connects,
+        }
+
+    def prometheus_lines(self) -> list:
+        return [
+            "# HELP nevira_email_messages_total Emails by delivery outcome.",
+            "# TYPE nevira_email_messages_total counter",
+            f'nevira_email_messages_total{{outcome="sent"}} {self.sent}',
+            f'nevira_email_messages_total{{outcome="failed"}} {self.failed}',
+            "# HELP nevira_email_pending Emails queued and not yet sent.",
+            "# TYPE nevira_email_pending gauge",
+            f"nevira_email_pending {self.pending}",
+            "# HELP nevira_smtp_connects_total SMTP logins (reuse keeps this low).",
+            "# TYPE nevira_smtp_connects_total counter",
+            f"nevira_smtp_connects_total {self.connects}",
+        ]
+
+
+_mailer: Optional[SMTPMailer] = None
+# Closes of mailers replaced after a credential change, still flushing
+_retiring: set = set()
+
+
+def get_mailer(user: str, password: str) -> SMTPMailer:
+    """
+    Return the shared mailer for these credentials, creating it on first use.
+    A mailer for other credentials is flushed and closed in the background.
+    """
+    global _mailer
+    if _mailer is None or (_mailer.user, _mailer.password) != (user, password):
+        if _mailer is not None:
+            task = asyncio.get_running_loop().create_task(_mailer.close())
+            _retiring.add(task)
+            task.add_done_callback(_retiring.discard)
+        _mailer = SMTPMailer(user=user, password=password)
+        tool_metrics.register_collector("email", _mailer.stats, _mailer.prometheus_lines)
+    return _mailer
+
+
+async def close() -> None:
+    """Flush and close the shared mailer, if one was created, and any it replaced."""
+    global _mailer
+    if _retiring:
+        await asyncio.gather(*_retiring, return_exceptions=True)
+    if _mailer is not None:
+        await _mailer.close()
+        _mailer = None
@@ -0,0 +1,255 @@
+"""
+Long-term memory for the assistant.
+
+Facts Boss states about themselves ("my sister is called Anna", "I prefer
+dark mode", "remember that ...") are pulled out of user turns, embedded and
+appended to an on-disk vector index. The vectors live in one flat float32
+file that is memory-mapped for search, so recall is a single matrix-vector
+product over pages the OS already caches; the fact texts live next to it in
+a JSON-lines file. Writes happen on a background thread and only ever
+append, and the most relevant memories are injected into the instructions
+when a session starts.
+
+Embeddings are hashed word and word-pair features rather than a neural
+model: they need no download or GPU, run in microseconds and are good
+enough to match a fact to the words it was stated with.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() in ("1", "true", "yes")
+MEMORY_DIR = os.getenv("MEMORY_DIR", os.path.join(os.path.expanduser("~"), ".nevira", "memory"))
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "8"))
+# Facts at least this similar to a stored one are treated as repeats
+MEMORY_DUPLICATE_SIMILARITY = float(os.getenv("MEMORY_DUPLICATE_SIMILARITY", "0.92"))
+EMBEDDING_DIM = 512
+
+STOPWORDS = frozenset(
+    "a an the is are was were be been am i me my mine you your it its of to in on at for and or "
+    "that this with as by from do does did so just really very".split()
+)
+
+# What follows "I have" in conversation rather than in a fact about Boss
+CHATTER = (
+    r"(?:(?:no|got|to|been|just)\b"
+    r"|(?:a |an |another |one more |some )?(?:quick )?(?:question|problem|idea|request|minute|moment|second)s?\b)"
+)
+
+# First-person statements worth keeping. Each yields the clause to store.
+FACT_PATTERNS = [
+    re.compile(r"\bremember (?:that )?(?P<fact>[^.?!]{3,200})", re.IGNORECASE),
+    re.compile(r"\b(?P<fact>my [a-z' ]{2,40}? (?:is|are|was) [^.?!]{1,120})", re.IGNORECASE),
+    re.compile(
+        r"\b(?P<fact>i(?: really)? (?:like|love|prefer|hate|dislike|enjoy|study|use"
+        r"|work (?:at|as|for|in|on|from)|live (?:in|at|near|with|on)|am allergic to|am (?:from|an?)"
+        rf"|have(?! {CHATTER})) [^.?!]{{2,120}})",
+        re.IGNORECASE,
+    ),
+    re.compile(r"\b(?P<fact>call me [^.?!]{1,40})", re.IGNORECASE),
+]
+
+# Questions and hedges are not statements of fact
+NOT_A_FACT = re.compile(r"^(?:what|who|where|when|why|how|is|are|do|does|can|could|would)\b|\?\s*$", re.IGNORECASE)
+
+
+def _tokens(text: str) -> list:
+    return [w for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in STOPWORDS]
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Signed feature-hashing embedding of words and adjacent word pairs, unit length."""
+    vector = np.zeros(dim, dtype=np.float32)
+    words = _tokens(text)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def extract_facts(text: str) -> list:
+    """Pull first-person facts out of one user turn."""
+    facts = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if not sentence or NOT_A_FACT.search(sentence):
+            continue
+        for pattern in FACT_PATTERNS:
+            match = pattern.search(sentence)
+            if match:
+                facts.append(" ".join(match.group("fact").split()))
+                break
+    return facts
+
+
+class VectorIndex:
+    """
+    Append-only vector index: `vectors.f32` holds one float32 row per fact
+    and is memory-mapped read-only for search; `facts.jsonl` holds the text.
+    """
+
+    def __init__(self, directory: str, dim: int = EMBEDDING_DIM) -> None:
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.facts_path = os.path.join(directory, "facts.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self.facts: list = []
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._load()
+
+    def _load(self) -> None:
+        if os.path.exists(self.facts_path):
+            with open(self.facts_path, encoding="utf-8") as f:
+                self.facts = [json.loads(line) for line in f if line.strip()]
+        rows = os.path.getsize(self.vectors_path) // (self.dim * 4) if os.path.exists(self.vectors_path) else 0
+        # A crash between the two appends leaves one file a row ahead; ignore the extra
+        count = min(rows, len(self.facts))
+        self.facts = self.facts[:count]
+        self._map(count)
+
+    def _map(self, count: int) -> None:
+        if count:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+        else:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def append(self, vectors: np.ndarray, facts: list) -> None:
+        """Append rows; only the new bytes are written."""
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.facts_path, "a", encoding="utf-8") as f:
+            for fact in facts:
+                f.write(json.dumps(fact) + "\n")
+        self.facts.extend(facts)
+        self._map(len(self.facts))
+
+    def search(self, query: np.ndarray, k: int) -> list:
+        """Return up to k (similarity, fact dict) pairs, best first."""
+        if not len(self.facts) or k <= 0:
+            return []
+        scores = self._vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.facts[i]) for i in top]
+
+
+class MemoryStore:
+    def __init__(self, directory: str = MEMORY_DIR, dim: int = EMBEDDING_DIM) -> None:
+        """
+        Args:
+            directory: Where the index files live
+            dim: Embedding size
+        """
+        self.index = VectorIndex(directory, dim)
+        self.dim = dim
+        # All writes go through one thread, so appends never interleave
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+        self._pending: set = set()
+        # remember() runs on the loop, the done callback on the memory thread
+        self._pending_lock = threading.Lock()
+
+    def _write(self, facts: list) -> int:
+        """Embed and append facts that aren't already known. Blocking."""
+        rows, records = [], []
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        for text in facts:
+            vector = embed(text, self.dim)
+            if not vector.any():
+                continue
+            best = self.index.search(vector, 1)
+            batch_best = float(np.max(np.stack(rows) @ vector)) if rows else 0.0
+            if (best and best[0][0] >= MEMORY_DUPLICATE_SIMILARITY) or batch_best >= MEMORY_DUPLICATE_SIMILARITY:
+                continue
+            rows.append(vector)
+            records.append({"text": text, "created": now})
+        if rows:
+            self.index.append(np.stack(rows), records)
+            logging.info(f"Stored {len(rows)} new memor{'y' if len(rows) == 1 else 'ies'}")
+        return len(rows)
+
+    def remember(self, facts: list) -> Future:
+        """Queue facts for storage off the event loop."""
+        future = self._executor.submit(self._write, list(facts))
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending.discard(future)
+        if future.exception() is not None:
+            logging.error(f"Storing memories failed: {future.exception()}")
+
+    def observe_turn(self, text: str) -> Optional[Future]:
+        """Extract facts from a user turn and queue them. Cheap enough for an event handler."""
+        facts = extract_facts(text)
+        return self.remember(facts) if facts else None
+
+    def recall(self, query: str, k: int = MEMORY_TOP_K) -> list:
+        """Texts of the k memories most relevant to the query."""
+        return [fact["text"] for _, fact in self.index.search(embed(query, self.dim), k)]
+
+    def session_memories(self, k: int = MEMORY_TOP_K) -> list:
+        """
+        What to bring into a new session: the most recent facts, which are the
+        likeliest to still matter, with older ones about identity and
+        preferences filling the rest.
+        """
+        recent = [fact["text"] for fact in self.index.facts[-(k // 2):]] if k > 1 else []
+        relevant = self.recall("name call prefer like love work live family birthday", k)
+        chosen = list(dict.fromkeys(recent[::-1] + relevant))
+        return chosen[:k]
+
+    async def flush(self) -> None:
+        with self._pending_lock:
+            pending = list(self._pending)
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in pending), return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.flush()
+        self._executor.shutdown(wait=False)
+
+
+def format_memories(memories: list) -> str:
+    """Instruction block for the memories, or an empty string if there are none."""
+    if not memories:
+        return ""
+    lines = "\n".join(f"- {m}" for m in memories)
+    return f"\n\n# What you remember about Boss from earlier conversations\n{lines}\n"
+
+
+_store: Optional[MemoryStore] = None
+
+
+def get_store() -> Optional[MemoryStore]:
+    """Return the shared memory store (None if MEMORY_ENABLED is off)."""
+    global _store
+    if _store is None and MEMORY_ENABLED:
+        _store = MemoryStore()
+    return _store
+
+
+async def close() -> None:
+    """Finish queued memory writes."""
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
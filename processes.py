@@ -0,0 +1,382 @@
+"""
+Incrementally maintained process index and async process termination.
+
+ProcessIndex keeps a name -> PIDs map that a background poller updates by
+diffing psutil.pids() against the known set, so only new processes are
+inspected on each pass. Tools can then resolve a name to processes without
+walking every process on the machine. terminate() stops a batch of
+processes concurrently, escalating to kill() after a bounded wait, and
+reports the outcome for each PID.
+
+TerminationEngine is what the close_* tools share: it matches processes by
+executable name and optionally by window title, and closes everything a
+request matched in one batched terminate() call instead of one taskkill
+shell per process.
+"""
+import asyncio
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import threading
+from typing import Callable, Optional
+
+from lazy import lazy_import
+
+psutil = lazy_import("psutil")
+
+PROCESS_POLL_INTERVAL = float(os.getenv("PROCESS_POLL_INTERVAL", "2"))
+TERMINATE_TIMEOUT_SECONDS = float(os.getenv("TERMINATE_TIMEOUT_SECONDS", "3"))
+
+
+class ProcessIndex:
+    def __init__(self, poll_interval: float = PROCESS_POLL_INTERVAL) -> None:
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # pid -> (psutil.Process handle, lowercase name). The PID diff alone misses a
+        # PID reused between refreshes; the handle's create time catches it (refresh(verify=True))
+        self._procs: dict = {}
+        # lowercase name -> set of pids
+        self._by_name: dict = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self.refreshes = 0
+
+    def refresh(self, verify: bool = False) -> tuple[int, int]:
+        """
+        Apply the diff between the live PID set and the index. Blocking.
+
+        Args:
+            verify: Also check that each indexed PID still belongs to the process
+                indexed under it (one create-time check per process), so a PID
+                reused since the last refresh is re-read
+
+        Returns:
+            (added, removed) process counts
+        """
+        live = set(psutil.pids())
+        with self._lock:
+            known = dict(self._procs)
+        added, removed = live - set(known), set(known) - live
+        if verify:
+            reused = {pid for pid in live & set(known) if not known[pid][0].is_running()}
+            added |= reused
+            removed |= reused
+        new_entries = {}
+        for pid in added:
+            try:
+                proc = psutil.Process(pid)
+                new_entries[pid] = (proc, proc.name().lower())
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        with self._lock:
+            for pid in removed:
+                self._drop(pid)
+            for pid, (proc, name) in new_entries.items():
+                self._procs[pid] = (proc, name)
+                self._by_name.setdefault(name, set()).add(pid)
+        self.refreshes += 1
+        return len(new_entries), len(removed)
+
+    def _drop(self, pid: int) -> None:
+        entry = self._procs.pop(pid, None)
+        if entry is None:
+            return
+        name = entry[1]
+        pids = self._by_name.get(name)
+        if pids is not None:
+            pids.discard(pid)
+            if not pids:
+                del self._by_name[name]
+
+    def find(self, name: str, exact: bool = False) -> list:
+        """
+        Return process handles whose name matches. Matching is case-insensitive;
+        a substring match unless exact is True. The calling process is never
+        included.
+        """
+        needle = name.lower().strip()
+        own_pid = os.getpid()
+        with self._lock:
+            if exact:
+                pids = set(self._by_name.get(needle, ()))
+            else:
+                pids = set()
+                for proc_name, name_pids in self._by_name.items():
+                    if needle in proc_name:
+                        pids |= name_pids
+            return [self._procs[pid][0] for pid in sorted(pids) if pid != own_pid]
+
+    def names(self) -> list:
+        with self._lock:
+            return sorted(self._by_name)
+
+    def __len__(self) -> int:
+        return len(self._procs)
+
+    # ---- background poller ----
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+                self._ready.set()
+            except Exception as e:
+                logging.warning(f"Process index refresh failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def wait_ready(self, timeout: float = 10.0) -> None:
+        """Wait for the first full scan if the poller has only just started."""
+        self.start()
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    def _find_live(self, name: str, exact: bool) -> list:
+        """find() that rescans once on a miss or a stale match. Blocking: one is_running() per match."""
+        matches = self.find(name, exact)
+        if not matches or not all(proc.is_running() for proc in matches):
+            self.refresh(verify=True)
+            matches = self.find(name, exact)
+        return matches
+
+    async def lookup(self, name: str, exact: bool = False) -> list:
+        """
+        find() that rescans once on a miss or a stale match, so a just-launched
+        process is still found between poller passes, even at a reused PID.
+        The liveness checks and any rescan run off the event loop.
+        """
+        await self.wait_ready()
+        return await asyncio.to_thread(self._find_live, name, exact)
+
+
+def _terminate_blocking(procs: list, timeout: float) -> dict:
+    outcomes = {}
+    signalled = []
+    for proc in procs:
+        try:
+            proc.terminate()
+            signalled.append(proc)
+        except psutil.NoSuchProcess:
+            outcomes[proc.pid] = "already exited"
+        except psutil.AccessDenied:
+            outcomes[proc.pid] = "access denied"
+
+    # wait_procs polls every process in one loop, so the wait is bounded by
+    # timeout in total rather than per process
+    gone, alive = psutil.wait_procs(signalled, timeout=timeout)
+    for proc in gone:
+        outcomes[proc.pid] = "terminated"
+
+    killed = []
+    for proc in alive:
+        try:
+            proc.kill()
+            killed.append(proc)
+        except psutil.NoSuchProcess:
+            outcomes[proc.pid] = "terminated"
+        except psutil.AccessDenied:
+            outcomes[proc.pid] = "access denied"
+    if killed:
+        gone, alive = psutil.wait_procs(killed, timeout=timeout)
+        for proc in gone:
+            outcomes[proc.pid] = "killed"
+        for proc in alive:
+            outcomes[proc.pid] = "still running"
+    return outcomes
+
+
+async def terminate(procs: list, timeout: float = TERMINATE_TIMEOUT_SECONDS) -> dict:
+    """
+    Terminate processes concurrently off the event loop, escalating to kill
+    for any that outlive the timeout.
+
+    Returns:
+        {pid: outcome} where outcome is one of "terminated", "killed",
+        "already exited", "access denied" or "still running"
+    """
+    if not procs:
+        return {}
+    return await asyncio.to_thread(_terminate_blocking, procs, timeout)
+
+
+def _window_titles_windows() -> dict:
+    """Map pid -> visible top-level window titles using the Win32 API."""
+    import ctypes
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    titles: dict = {}
+
+    @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    def on_window(hwnd, _):
+        if user32.IsWindowVisible(hwnd):
+            length = user32.GetWindowTextLengthW(hwnd)
+            if length:
+                buffer = ctypes.create_unicode_buffer(length + 1)
+                user32.GetWindowTextW(hwnd, buffer, length + 1)
+                pid = wintypes.DWORD()
+                user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+                titles.setdefault(pid.value, []).append(buffer.value)
+        return True
+
+    user32.EnumWindows(on_window, 0)
+    return titles
+
+
+def _window_titles_wmctrl() -> dict:
+    """Map pid -> window titles on X11 desktops that have wmctrl installed."""
+    if not shutil.which("wmctrl"):
+        return {}
+    output = subprocess.run(["wmctrl", "-lp"], capture_output=True, text=True, timeout=2).stdout
+    titles: dict = {}
+    for line in output.splitlines():
+        # <window id> <desktop> <pid> <host> <title>
+        parts = line.split(None, 4)
+        if len(parts) == 5 and parts[2].isdigit():
+            titles.setdefault(int(parts[2]), []).append(parts[4])
+    return titles
+
+
+def window_titles() -> dict:
+    """Map pid -> window titles for the current desktop. Blocking."""
+    if platform.system() == "Windows":
+        return _window_titles_windows()
+    return _window_titles_wmctrl()
+
+
+def _name_variants(name: str) -> set:
+    """'chrome.exe' also matches 'chrome' (and vice versa) so one table works on every OS."""
+    name = name.lower().strip()
+    base = name[:-4] if name.endswith(".exe") else name
+    return {base, f"{base}.exe"}
+
+
+class TerminationEngine:
+    def __init__(
+        self,
+        index: Optional[ProcessIndex] = None,
+        window_titles_fn: Callable[[], dict] = window_titles,
+        timeout: float = TERMINATE_TIMEOUT_SECONDS,
+    ) -> None:
+        """
+        Args:
+            index: Process index to resolve names with (the shared one by default)
+            window_titles_fn: Blocking pid -> [titles] provider, injectable for tests
+            timeout: Seconds to wait for a graceful exit before killing
+        """
+        self._index = index
+        self._window_titles_fn = window_titles_fn
+        self.timeout = timeout
+
+    @property
+    def index(self) -> ProcessIndex:
+        return self._index if self._index is not None else get_index()
+
+    def _find(self, names: list) -> list:
+        found = {}
+        for name in names:
+            for variant in _name_variants(name):
+                for proc in self.index.find(variant, exact=True):
+                    found[proc.pid] = proc
+        return list(found.values())
+
+    async def resolve(self, targets: list) -> list:
+        """
+        Resolve a batch of targets to process handles.
+
+        Args:
+            targets: (process names, title substring or None, fall back to all
+                processes of those names if no window title matches)
+
+        Returns:
+            De-duplicated process handles matched by any target
+        """
+        index = self.index
+        await index.wait_ready()
+        all_names = [name for names, _, _ in targets for name in names]
+        if not self._find(all_names):
+            # Nothing indexed under these names yet; catch processes started since the last poll
+            await asyncio.to_thread(index.refresh)
+
+        titles = None
+        if any(title for _, title, _ in targets):
+            titles = await asyncio.to_thread(self._window_titles_fn)
+
+        matched = {}
+        for names, title, fallback in targets:
+            procs = self._find(names)
+            if title:
+                needle = title.lower()
+                titled = [p for p in procs if any(needle in t.lower() for t in titles.get(p.pid, ()))]
+                if titled or not fallback:
+                    procs = titled
+            for proc in procs:
+                matched[proc.pid] = proc
+        return list(matched.values())
+
+    async def close(self, names: list, title: Optional[str] = None, fallback: bool = False) -> dict:
+        """Close processes with any of these names (and a matching window title, if given)."""
+        return await self.close_many([(names, title, fallback)])
+
+    async def close_many(self, targets: list) -> dict:
+        """
+        Resolve several targets and close everything they match in one batch.
+
+        Returns:
+            {pid: outcome} as returned by terminate()
+        """
+        procs = await self.resolve(targets)
+        outcomes = await terminate(procs, self.timeout)
+        for pid, outcome in outcomes.items():
+            logging.info(f"Close PID {pid}: {outcome}")
+        return outcomes
+
+
+def closed_any(outcomes: dict) -> bool:
+    return any(outcome in ("terminated", "killed") for outcome in outcomes.values())
+
+
+_index: Optional[ProcessIndex] = None
+_engine: Optional[TerminationEngine] = None
+
+
+def get_index() -> ProcessIndex:
+    """Return the shared process index, starting its poller on first use."""
+    global _index
+    if _index is None:
+        _index = ProcessIndex()
+    _index.start()
+    return _index
+
+
+def get_engine() -> TerminationEngine:
+    """Return the shared termination engine."""
+    global _engine
+    if _engine is None:
+        _engine = TerminationEngine()
+    return _engine
+
+
+async def close() -> None:
+    """Stop the shared index's poller."""
+    if _index is not None:
+        await _index.stop()
@@ -0,0 +1,282 @@
+"""
+Registry of the applications and websites the desktop tools know about.
+
+Entries come from registry.json (APP_REGISTRY_PATH to override), loaded
+once per process, plus optionally the applications found installed on
+this machine (APP_SCAN_ENABLED). The scan result is cached on disk and
+only redone when the scanned folders change. Every alias is normalized
+into one index that answers exact names at dictionary speed and falls
+back to a trigram-filtered fuzzy match, so "calc", "vs code" and "calculater"
+all resolve. open_application, close_application, open_website,
+close_browser and close_youtube all share it.
+"""
+import difflib
+import glob
+import json
+import logging
+import os
+import platform
+import shlex
+import subprocess
+import webbrowser
+from typing import NamedTuple, Optional
+
+from cache import normalize_key
+
+APP_REGISTRY_PATH = os.getenv("APP_REGISTRY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "registry.json"))
+APP_SCAN_ENABLED = os.getenv("APP_SCAN_ENABLED", "false").lower() in ("1", "true", "yes")
+APP_SCAN_CACHE = os.getenv(
+    "APP_SCAN_CACHE", os.path.join(os.path.expanduser("~"), ".nevira", "installed_apps.json"))
+# Minimum similarity (0-1) for a fuzzy match to be accepted
+FUZZY_MIN_SCORE = float(os.getenv("REGISTRY_FUZZY_MIN_SCORE", "0.75"))
+
+
+class App(NamedTuple):
+    key: str
+    # Platform ("windows", "darwin", "linux") -> launch target
+    launch: dict
+    processes: tuple
+    browser: bool = False
+
+
+class Site(NamedTuple):
+    key: str
+    url: str
+
+
+def _platform() -> str:
+    return platform.system().lower()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Alias -> key index with exact, space-insensitive and typo-tolerant lookup."""
+
+    def __init__(self) -> None:
+        self._exact: dict = {}
+        self._trigrams: dict = {}
+
+    def add(self, alias: str, key: str) -> None:
+        alias = normalize_key(alias)
+        for variant in (alias, alias.replace(" ", "")):
+            self._exact.setdefault(variant, key)
+        for gram in _trigrams(alias):
+            self._trigrams.setdefault(gram, set()).add(alias)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def exact(self, query: str) -> Optional[str]:
+        query = normalize_key(query)
+        return self._exact.get(query) or self._exact.get(query.replace(" ", ""))
+
+    def lookup(self, query: str) -> Optional[tuple]:
+        """
+        Returns:
+            (key, score) for the best match, score 1.0 for exact names, or
+            None if nothing is close enough or two entries tie
+        """
+        key = self.exact(query)
+        if key is not None:
+            return key, 1.0
+        query = normalize_key(query)
+
+        # Only score aliases sharing at least a third of the query's trigrams
+        grams = _trigrams(query)
+        overlap: dict = {}
+        for gram in grams:
+            for alias in self._trigrams.get(gram, ()):
+                overlap[alias] = overlap.get(alias, 0) + 1
+        needed = max(1, len(grams) // 3)
+        scored = sorted(
+            ((difflib.SequenceMatcher(None, query, alias).ratio(), alias)
+             for alias, shared in overlap.items() if shared >= needed),
+            reverse=True,
+        )
+        if not scored or scored[0][0] < FUZZY_MIN_SCORE:
+            return None
+        best_score, best_alias = scored[0]
+        best_key = self._exact[best_alias]
+        for score, alias in scored[1:]:
+            if best_score - score >= 0.05:
+                break
+            if self._exact[alias] != best_key:
+                return None  # ambiguous between two different entries
+        return best_key, best_score
+
+
+def _scan_dirs() -> list:
+    system = _platform()
+    if system == "windows":
+        return [
+            os.path.join(os.environ.get("PROGRAMDATA", r"C:\ProgramData"), "Microsoft", "Windows", "Start Menu", "Programs"),
+            os.path.join(os.environ.get("APPDATA", ""), "Microsoft", "Windows", "Start Menu", "Programs"),
+        ]
+    if system == "darwin":
+        return ["/Applications", "/System/Applications", os.path.expanduser("~/Applications")]
+    return ["/usr/share/applications", os.path.expanduser("~/.local/share/applications")]
+
+
+def _dir_signature(dirs: list) -> dict:
+    return {d: os.path.getmtime(d) for d in dirs if os.path.isdir(d)}
+
+
+def scan_installed(dirs: Optional[list] = None) -> dict:
+    """
+    Find installed applications. Blocking (walks the filesystem).
+
+    Returns:
+        name -> {"launch": target, "processes": [process name]}
+    """
+    system = _platform()
+    found = {}
+    for directory in dirs if dirs is not None else _scan_dirs():
+        if system == "windows":
+            for path in glob.glob(os.path.join(directory, "**", "*.lnk"), recursive=True):
+                name = os.path.splitext(os.path.basename(path))[0]
+                found[name] = {"launch": path, "processes": []}
+        elif system == "darwin":
+            for path in glob.glob(os.path.join(directory, "*.app")):
+                name = os.path.splitext(os.path.basename(path))[0]
+                found[name] = {"launch": name, "processes": [name]}
+        else:
+            for path in glob.glob(os.path.join(directory, "*.desktop")):
+                entry = _read_desktop_file(path)
+                if entry:
+                    found[entry[0]] = {"launch": entry[1], "processes": [os.path.basename(shlex.split(entry[1])[0])]}
+    return found
+
+
+def _read_desktop_file(path: str) -> Optional[tuple]:
+    """(Name, Exec without field codes) from a .desktop file, or None for hidden entries."""
+    name = command = None
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("[") and line != "[Desktop Entry]" and name:
+                    break
+                if line.startswith("Name=") and name is None:
+                    name = line[5:]
+                elif line.startswith("Exec=") and command is None:
+                    command = " ".join(part for part in line[5:].split() if not part.startswith("%"))
+                elif line in ("NoDisplay=true", "Hidden=true"):
+                    return None
+    except OSError:
+        return None
+    return (name, command) if name and command else None
+
+
+class Registry:
+    def __init__(self, config: dict, installed: Optional[dict] = None) -> None:
+        """
+        Args:
+            config: {"apps": {...}, "sites": {...}} as in registry.json
+            installed: Scanned applications (name -> launch/processes), lower priority than config
+        """
+        self.apps: dict = {}
+        self.sites: dict = {}
+        self._app_index = FuzzyIndex()
+        self._site_index = FuzzyIndex()
+
+        for key, spec in config.get("apps", {}).items():
+            self.apps[key] = App(
+                key=key,
+                launch=dict(spec.get("launch", {})),
+                processes=tuple(spec.get("processes", ())),
+                browser=bool(spec.get("browser", False)),
+            )
+            for alias in [key, *spec.get("aliases", ())]:
+                self._app_index.add(alias, key)
+        for name, spec in (installed or {}).items():
+            key = normalize_key(name)
+            if self._app_index.exact(key) is not None:
+                continue  # the config entry (with its process names) wins
+            self.apps[key] = App(key=key, launch={_platform(): spec["launch"]}, processes=tuple(spec.get("processes", ())))
+            self._app_index.add(key, key)
+
+        for key, spec in config.get("sites", {}).items():
+            self.sites[key] = Site(key=key, url=spec["url"])
+            for alias in [key, *spec.get("aliases", ())]:
+                self._site_index.add(alias, key)
+
+    @classmethod
+    def from_file(cls, path: str = APP_REGISTRY_PATH, installed: Optional[dict] = None) -> "Registry":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), installed)
+
+    def find_app(self, name: str) -> Optional[App]:
+        match = self._app_index.lookup(name)
+        return self.apps[match[0]] if match else None
+
+    def find_site(self, name: str) -> Optional[Site]:
+        match = self._site_index.lookup(name)
+        return self.sites[match[0]] if match else None
+
+    def browsers(self) -> list:
+        return [app for app in self.apps.values() if app.browser]
+
+    def launchable(self) -> list:
+        """Configured app names that can be opened on this platform (for suggestions)."""
+        system = _platform()
+        return [app.key for app in self.apps.values() if system in app.launch][:15]
+
+    def launch(self, app: App) -> None:
+        """Start an application with this platform's launcher."""
+        system = _platform()
+        target = app.launch.get(system)
+        if target is None:
+            raise ValueError(f"{app.key} has no launcher on {platform.system()}")
+        if system == "windows":
+            if target.startswith("ms-"):
+                # For Windows 10/11 URI schemes
+                webbrowser.open(target)
+            else:
+                os.startfile(target)
+        elif system == "darwin":
+            subprocess.Popen(["open", "-a", target])
+        else:
+            subprocess.Popen([os.path.expanduser(part) for part in shlex.split(target)])
+
+
+def load_installed(cache_path: str = APP_SCAN_CACHE, dirs: Optional[list] = None) -> dict:
+    """Scanned applications, from the on-disk cache unless the scanned folders changed."""
+    dirs = dirs if dirs is not None else _scan_dirs()
+    signature = _dir_signature(dirs)
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("signature") == signature:
+            return cached["apps"]
+    except (OSError, ValueError, KeyError):
+        pass
+    apps = scan_installed(dirs)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "apps": apps}, f)
+    except OSError as e:
+        logging.warning(f"Could not cache installed applications: {e}")
+    logging.info(f"Scanned {len(apps)} installed applications")
+    return apps
+
+
+_registry: Optional[Registry] = None
+
+
+def get_registry() -> Registry:
+    """Return the shared registry, loading it on first use."""
+    global _registry
+    if _registry is None:
+        installed = None
+        if APP_SCAN_ENABLED:
+            try:
+                installed = load_installed()
+            except Exception as e:
+                logging.warning(f"Installed application scan failed: {e}")
+        _registry = Registry.from_file(installed=installed)
+    return _registry
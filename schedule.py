@@ -0,0 +1,432 @@
+"""
+Calendar behind get_schedule, get_next_event and check_availability.
+
+Events are read from an iCalendar (.ics) or JSON file (SCHEDULE_PATH),
+recurring ones are expanded over a window around today, and every
+occurrence goes into an interval index: occurrences sorted by start plus a
+running maximum of their ends, so "what's next", "am I free at 3 PM" and
+"what's on Tuesday" are binary searches rather than scans.
+
+The file is watched by size and modification time. On a change it is
+parsed again, but only event definitions whose text changed are expanded
+again; the rest reuse their previous occurrences.
+
+JSON format (schedule.json):
+    {"events": [
+        {"title": "Algorithm class", "days": ["monday"], "start": "09:00", "end": "09:50"},
+        {"title": "Dentist", "start": "2026-10-21T15:00", "end": "2026-10-21T16:00"},
+        {"title": "Standup", "start": "2026-09-01T10:00", "end": "2026-09-01T10:15",
+         "rrule": "FREQ=WEEKLY;BYDAY=MO,WE,FR", "exdates": ["2026-12-25"]}
+    ]}
+
+iCalendar support covers VEVENT with DTSTART, DTEND or DURATION, RRULE
+(DAILY, WEEKLY with BYDAY, MONTHLY, YEARLY; INTERVAL, COUNT, UNTIL) and
+EXDATE. Times are treated as local; UTC times are converted.
+"""
+import bisect
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Callable, NamedTuple, Optional
+
+SCHEDULE_PATH = os.getenv(
+    "SCHEDULE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "schedule.json"))
+# How far ahead recurring events are expanded (grown on demand for later queries)
+SCHEDULE_HORIZON_DAYS = int(os.getenv("SCHEDULE_HORIZON_DAYS", "180"))
+
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+ICAL_DAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+# Start of weekly JSON entries without a "from" date (a Monday; earlier weeks are skipped, not walked)
+WEEKLY_EPOCH = datetime.date(2000, 1, 3)
+
+
+class Event(NamedTuple):
+    start: datetime.datetime
+    end: datetime.datetime
+    title: str
+
+
+class Rule(NamedTuple):
+    freq: str
+    interval: int = 1
+    byday: tuple = ()
+    count: Optional[int] = None
+    until: Optional[datetime.datetime] = None
+
+
+class EventSpec(NamedTuple):
+    """One event definition, possibly recurring."""
+    title: str
+    start: datetime.datetime
+    duration: datetime.timedelta
+    rule: Optional[Rule] = None
+    exdates: frozenset = frozenset()
+
+
+def _parse_ical_datetime(value: str) -> datetime.datetime:
+    value = value.strip()
+    if len(value) == 8:
+        return datetime.datetime.strptime(value, "%Y%m%d")
+    if value.endswith("Z"):
+        utc = datetime.datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=datetime.timezone.utc)
+        return utc.astimezone().replace(tzinfo=None)
+    return datetime.datetime.strptime(value, "%Y%m%dT%H%M%S")
+
+
+def _parse_ical_duration(value: str) -> datetime.timedelta:
+    match = re.fullmatch(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", value.strip())
+    if not match:
+        raise ValueError(f"Bad duration '{value}'")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = datetime.timedelta(
+        weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+        minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    return -delta if sign == "-" else delta
+
+
+def parse_rrule(text: str) -> Rule:
+    parts = dict(part.split("=", 1) for part in text.strip().upper().split(";") if "=" in part)
+    freq = parts.get("FREQ")
+    if freq not in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+        raise ValueError(f"Unsupported recurrence '{text}'")
+    # Ordinals such as 1MO (first Monday) are not supported; the weekday is kept
+    byday = tuple(sorted(ICAL_DAYS[day[-2:]] for day in parts["BYDAY"].split(","))) if "BYDAY" in parts else ()
+    until = _parse_ical_datetime(parts["UNTIL"]) if "UNTIL" in parts else None
+    if until is not None and len(parts["UNTIL"]) == 8:
+        until += datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+    return Rule(
+        freq=freq,
+        interval=max(1, int(parts.get("INTERVAL", "1"))),
+        byday=byday,
+        count=int(parts["COUNT"]) if "COUNT" in parts else None,
+        until=until,
+    )
+
+
+def parse_ical(text: str) -> list:
+    """
+    Returns:
+        (source text, EventSpec) per VEVENT
+    """
+    # Unfold continuation lines first
+    lines = re.sub(r"\r?\n[ \t]", "", text).splitlines()
+    specs = []
+    block: Optional[list] = None
+    for line in lines:
+        if line == "BEGIN:VEVENT":
+            block = []
+        elif line == "END:VEVENT" and block is not None:
+            props: dict = {}
+            for entry in block:
+                name, _, value = entry.partition(":")
+                props.setdefault(name.split(";")[0].upper(), []).append(value)
+            if "DTSTART" in props:
+                start = _parse_ical_datetime(props["DTSTART"][0])
+                if "DTEND" in props:
+                    duration = _parse_ical_datetime(props["DTEND"][0]) - start
+                elif "DURATION" in props:
+                    duration = _parse_ical_duration(props["DURATION"][0])
+                else:
+                    duration = datetime.timedelta(days=1) if len(props["DTSTART"][0].strip()) == 8 else datetime.timedelta()
+                exdates = frozenset(
+                    _parse_ical_datetime(value) for values in props.get("EXDATE", ()) for value in values.split(","))
+                specs.append(("\n".join(block), EventSpec(
+                    title=props.get("SUMMARY", ["(untitled)"])[0].replace("\\,", ",").replace("\\;", ";"),
+                    start=start,
+                    duration=duration,
+                    rule=parse_rrule(props["RRULE"][0]) if "RRULE" in props else None,
+                    exdates=exdates,
+                )))
+            block = None
+        elif block is not None:
+            block.append(line)
+    return specs
+
+
+def _json_time(value: str) -> datetime.time:
+    return datetime.time.fromisoformat(value)
+
+
+def parse_json(text: str) -> list:
+    """
+    Returns:
+        (source text, EventSpec) per event. Weekly entries given as "days"
+        plus times of day recur from their "from" date, or indefinitely.
+    """
+    specs = []
+    for entry in json.loads(text).get("events", []):
+        source = json.dumps(entry, sort_keys=True)
+        title = entry.get("title", "(untitled)")
+        exdates = frozenset(datetime.datetime.fromisoformat(value) for value in entry.get("exdates", ()))
+        if "days" in entry:
+            start = datetime.datetime.combine(
+                datetime.date.fromisoformat(entry["from"]) if "from" in entry else WEEKLY_EPOCH, _json_time(entry["start"]))
+            end = datetime.datetime.combine(start.date(), _json_time(entry["end"]))
+            until = datetime.datetime.combine(datetime.date.fromisoformat(entry["until"]), datetime.time.max) if "until" in entry else None
+            rule = Rule("WEEKLY", byday=tuple(sorted(DAY_NAMES.index(day.lower()) for day in entry["days"])), until=until)
+        else:
+            start = datetime.datetime.fromisoformat(entry["start"])
+            end = datetime.datetime.fromisoformat(entry["end"]) if "end" in entry else start
+            rule = parse_rrule(entry["rrule"]) if "rrule" in entry else None
+        specs.append((source, EventSpec(title=title, start=start, duration=end - start, rule=rule, exdates=exdates)))
+    return specs
+
+
+def _add_months(day: datetime.datetime, months: int) -> Optional[datetime.datetime]:
+    year, month = divmod(day.month - 1 + months, 12)
+    try:
+        return day.replace(year=day.year + year, month=month + 1)
+    except ValueError:
+        return None  # e.g. the 31st in a 30-day month is skipped, as in RFC 5545
+
+
+def _candidates(spec: EventSpec, window_start: datetime.datetime):
+    """Occurrence starts in order. Without COUNT, whole periods before the window are skipped."""
+    rule = spec.rule
+    skip = rule.count is None
+    if rule.freq == "DAILY":
+        step = datetime.timedelta(days=rule.interval)
+        first = 0
+        if skip and window_start > spec.start:
+            first = max(0, (window_start - spec.start - spec.duration) // step)
+        k = first
+        while True:
+            yield spec.start + k * step
+            k += 1
+    elif rule.freq == "WEEKLY":
+        days = rule.byday or (spec.start.weekday(),)
+        week_start = spec.start - datetime.timedelta(days=spec.start.weekday())
+        step = datetime.timedelta(weeks=rule.interval)
+        k = 0
+        if skip and window_start > spec.start:
+            k = max(0, (window_start - week_start - spec.duration) // step - 1)
+        while True:
+            base = week_start + k * step
+            for weekday in days:
+                candidate = base + datetime.timedelta(days=weekday)
+                if candidate >= spec.start:
+                    yield candidate
+            k += 1
+    else:
+        months = rule.interval * (12 if rule.freq == "YEARLY" else 1)
+        k = 0
+        if skip and window_start > spec.start:
+            elapsed = (window_start.year - spec.start.year) * 12 + window_start.month - spec.start.month
+            k = max(0, elapsed // months - 1)
+        while True:
+            candidate = _add_months(spec.start, k * months)
+            if candidate is not None:
+                yield candidate
+            k += 1
+
+
+def expand(spec: EventSpec, window_start: datetime.datetime, window_end: datetime.datetime) -> list:
+    """Occurrences of one event that overlap [window_start, window_end)."""
+    if spec.rule is None:
+        end = spec.start + spec.duration
+        overlaps = spec.start < window_end and (end > window_start or spec.start >= window_start)
+        return [Event(spec.start, end, spec.title)] if overlaps else []
+    rule = spec.rule
+    occurrences = []
+    produced = 0
+    for start in _candidates(spec, window_start):
+        if start >= window_end or (rule.until is not None and start > rule.until):
+            break
+        if rule.count is not None:
+            if produced >= rule.count:
+                break
+            produced += 1
+        # A date-only exclusion drops every occurrence on that day
+        if start in spec.exdates or datetime.datetime.combine(start.date(), datetime.time.min) in spec.exdates:
+            continue
+        end = start + spec.duration
+        if end > window_start or start >= window_start:
+            occurrences.append(Event(start, end, spec.title))
+    return occurrences
+
+
+class IntervalIndex:
+    """
+    Occurrences sorted by start, with a running maximum of their ends.
+    Because that maximum never decreases, the first occurrence that could
+    still be running at a time is found by binary search too.
+    """
+
+    def __init__(self, events: list) -> None:
+        self.events = sorted(events)
+        self._starts = [event.start for event in self.events]
+        self._max_ends = []
+        latest = datetime.datetime.min
+        for event in self.events:
+            latest = max(latest, event.end)
+            self._max_ends.append(latest)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def overlapping(self, start: datetime.datetime, end: datetime.datetime) -> list:
+        """Occurrences overlapping [start, end), by start time."""
+        lo = bisect.bisect_right(self._max_ends, start)
+        hi = bisect.bisect_left(self._starts, end)
+        return [event for event in self.events[lo:hi] if event.end > start]
+
+    def at(self, moment: datetime.datetime) -> list:
+        return self.overlapping(moment, moment + datetime.timedelta(microseconds=1))
+
+    def next_after(self, moment: datetime.datetime) -> Optional[Event]:
+        i = bisect.bisect_right(self._starts, moment)
+        return self.events[i] if i < len(self.events) else None
+
+
+class Schedule:
+    def __init__(
+        self,
+        path: str = SCHEDULE_PATH,
+        horizon_days: int = SCHEDULE_HORIZON_DAYS,
+        clock: Callable[[], datetime.datetime] = datetime.datetime.now,
+    ) -> None:
+        """
+        Args:
+            path: .ics or .json calendar file
+            horizon_days: Days ahead of today recurring events are expanded
+            clock: Current local time, injectable for tests
+        """
+        self.path = path
+        self.horizon = datetime.timedelta(days=horizon_days)
+        self.clock = clock
+        today = datetime.datetime.combine(clock().date(), datetime.time.min)
+        self.window = (today - datetime.timedelta(days=7), today + self.horizon)
+        self.index = IntervalIndex([])
+        self._signature: Optional[tuple] = None
+        # Source text hash -> (spec, occurrences in the current window)
+        self._expanded: dict = {}
+        self.reloads = 0
+        self.reexpanded = 0
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def stale(self) -> bool:
+        """Whether the file changed since it was last loaded."""
+        return self._stat() != self._signature
+
+    def _parse(self) -> list:
+        with open(self.path, encoding="utf-8") as f:
+            text = f.read()
+        return parse_ical(text) if self.path.lower().endswith(".ics") else parse_json(text)
+
+    def reload(self) -> None:
+        """Parse the file again, expanding only the events whose definition changed. Blocking."""
+        signature = self._stat()
+        specs = self._parse() if signature is not None else []
+        expanded = {}
+        reexpanded = 0
+        for source, spec in specs:
+            key = hashlib.blake2b(source.encode(), digest_size=16).digest()
+            if key in expanded:
+                key += str(len(expanded)).encode()  # identical duplicates stay separate events
+            previous = self._expanded.get(key)
+            if previous is not None and previous[0] == spec:
+                expanded[key] = previous
+            else:
+                expanded[key] = (spec, expand(spec, *self.window))
+                reexpanded += 1
+        self._expanded = expanded
+        self._signature = signature
+        self.index = IntervalIndex([event for _, events in expanded.values() for event in events])
+        self.reloads += 1
+        self.reexpanded += reexpanded
+        logging.info(f"Schedule loaded: {len(self.index)} occurrences from {len(expanded)} events ({reexpanded} expanded)")
+
+    def _cover(self, start: datetime.datetime, end: datetime.datetime) -> None:
+        """Grow the expansion window to include [start, end)."""
+        if not self.reloads:
+            self.reload()
+        if start >= self.window[0] and end <= self.window[1]:
+            return
+        self.window = (min(self.window[0], start), max(self.window[1], end + self.horizon))
+        self._expanded = {key: (spec, expand(spec, *self.window)) for key, (spec, _) in self._expanded.items()}
+        self.index = IntervalIndex([event for _, events in self._expanded.values() for event in events])
+
+    def refresh(self) -> None:
+        """Reload if the file changed. Blocking."""
+        if self.stale() or not self.reloads:
+            self.reload()
+
+    def between(self, start: datetime.datetime, end: datetime.datetime) -> list:
+        self._cover(start, end)
+        return self.index.overlapping(start, end)
+
+    def on(self, day: datetime.date) -> list:
+        start = datetime.datetime.combine(day, datetime.time.min)
+        return self.between(start, start + datetime.timedelta(days=1))
+
+    def at(self, moment: datetime.datetime) -> list:
+        self._cover(moment, moment)
+        return self.index.at(moment)
+
+    def next_event(self, after: Optional[datetime.datetime] = None) -> Optional[Event]:
+        after = after or self.clock()
+        self._cover(after, after)
+        return self.index.next_after(after)
+
+
+def parse_day(text: Optional[str], today: datetime.date) -> Optional[datetime.date]:
+    """
+    "today", "tomorrow", a weekday name (its next occurrence, today
+    included) or an ISO date. None if not understood.
+    """
+    text = (text or "today").lower().strip()
+    if text == "today":
+        return today
+    if text == "tomorrow":
+        return today + datetime.timedelta(days=1)
+    if text in DAY_NAMES:
+        return today + datetime.timedelta(days=(DAY_NAMES.index(text) - today.weekday()) % 7)
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def parse_time(text: str) -> Optional[datetime.time]:
+    """ "3 PM", "3:30pm", "15:00", "noon" or "midnight". None if not understood. """
+    text = text.lower().replace(".", "").strip()
+    if text == "noon":
+        return datetime.time(12)
+    if text == "midnight":
+        return datetime.time(0)
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", text)
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return datetime.time(hour, minute)
+
+
+def format_time(moment: datetime.datetime) -> str:
+    return moment.strftime("%I:%M %p").lstrip("0")
+
+
+_schedule: Optional[Schedule] = None
+
+
+def get_schedule() -> Schedule:
+    """Return the shared schedule (loaded on first use)."""
+    global _schedule
+    if _schedule is None:
+        _schedule = Schedule()
+    return _schedule
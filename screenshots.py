@@ -0,0 +1,176 @@
+"""
+Off-loop screenshot pipeline for take_screenshot.
+
+Capturing the screen is quick; compressing a full-resolution frame is not
+(default PNG on a 4K display takes hundreds of milliseconds). The pipeline
+grabs the frame in a worker thread, hands it to a background encoder
+thread and returns as soon as the capture is done. The encoder optionally
+downscales, compresses with a fast setting (PNG level 1, WebP method 0 or
+JPEG) and writes the file atomically, so a half-written screenshot never
+appears under its final name.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+SCREENSHOT_DIR = os.getenv(
+    "SCREENSHOT_DIR", os.path.join(os.path.expanduser("~"), "Pictures", "Screenshots"))
+# png, webp or jpeg
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "png").lower()
+# zlib level for PNG: 1 is noticeably faster than Pillow's default of 6 (see bench_screenshots.py)
+SCREENSHOT_PNG_LEVEL = int(os.getenv("SCREENSHOT_PNG_LEVEL", "1"))
+# Quality for WebP/JPEG
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "85"))
+# Downscale wider frames to this width (0 keeps full resolution)
+SCREENSHOT_MAX_WIDTH = int(os.getenv("SCREENSHOT_MAX_WIDTH", "0"))
+
+EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+
+
+def grab_screen():
+    import pyautogui  # deferred: probes the display on import
+
+    return pyautogui.screenshot()
+
+
+def encode_options(fmt: str, quality: int = SCREENSHOT_QUALITY, png_level: int = SCREENSHOT_PNG_LEVEL) -> dict:
+    """Pillow save() arguments for the fast setting of each format."""
+    if fmt == "png":
+        return {"format": "PNG", "compress_level": png_level}
+    if fmt == "webp":
+        # method 0 is the fastest WebP encoder effort
+        return {"format": "WEBP", "quality": quality, "method": 0}
+    if fmt == "jpeg":
+        return {"format": "JPEG", "quality": quality}
+    raise ValueError(f"Unsupported screenshot format '{fmt}'. Use: {', '.join(EXTENSIONS)}")
+
+
+def downscale(image, max_width: int):
+    """Resize to max_width keeping the aspect ratio (no-op if already narrower)."""
+    if not max_width or image.width <= max_width:
+        return image
+    from PIL import Image
+
+    height = round(image.height * max_width / image.width)
+    return image.resize((max_width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+
+def save_image(image, filepath: str, options: dict, max_width: int = 0) -> str:
+    """Downscale, encode and atomically write one frame. Blocking."""
+    image = downscale(image, max_width)
+    if options["format"] == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    tmp_path = f"{filepath}.part"
+    with open(tmp_path, "wb") as f:
+        image.save(f, **options)
+    os.replace(tmp_path, filepath)
+    return filepath
+
+
+class ScreenshotPipeline:
+    def __init__(
+        self,
+        capture_fn: Callable = grab_screen,
+        directory: str = SCREENSHOT_DIR,
+        fmt: str = SCREENSHOT_FORMAT,
+        quality: int = SCREENSHOT_QUALITY,
+        png_level: int = SCREENSHOT_PNG_LEVEL,
+        max_width: int = SCREENSHOT_MAX_WIDTH,
+    ) -> None:
+        """
+        Args:
+            capture_fn: Blocking function returning a PIL image of the screen
+            directory: Where screenshots are written
+            fmt: png, webp or jpeg
+            quality: WebP/JPEG quality
+            png_level: PNG zlib compression level
+            max_width: Downscale wider frames to this width (0 = full resolution)
+        """
+        self.capture_fn = capture_fn
+        self.directory = directory
+        self.fmt = fmt
+        self.options = encode_options(fmt, quality, png_level)
+        self.max_width = max_width
+        # One encoder thread keeps memory bounded to one frame being compressed at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+        self._pending: set = set()
+        self.saved = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}{EXTENSIONS[self.fmt]}")
+
+    def _finished(self, future: Future) -> None:
+        # Runs on the event loop thread (see capture), so _pending is only
+        # ever touched from one thread
+        self._pending.discard(future)
+        if future.exception() is not None:
+            self.failed += 1
+            logging.error(f"Saving screenshot failed: {future.exception()}")
+        else:
+            self.saved += 1
+            logging.info(f"Screenshot saved to {future.result()}")
+
+    def _finished_threadsafe(self, loop: asyncio.AbstractEventLoop, future: Future) -> None:
+        try:
+            loop.call_soon_threadsafe(self._finished, future)
+        except RuntimeError:
+            # The loop is already closed; nobody is left to flush
+            self._pending.discard(future)
+
+    async def capture(self, name: str) -> tuple[str, Future]:
+        """
+        Grab the screen off the event loop and queue it for encoding.
+
+        Returns:
+            (final file path, future that resolves to the path once written)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        image = await asyncio.to_thread(self.capture_fn)
+        filepath = self.path_for(name)
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(save_image, image, filepath, self.options, self.max_width)
+        self._pending.add(future)
+        # The done callback fires on the encoder thread; hop back to the loop
+        future.add_done_callback(lambda f: self._finished_threadsafe(loop, f))
+        return filepath, future
+
+    async def flush(self) -> None:
+        """Wait for every queued screenshot to be written."""
+        pending = list(self._pending)
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in pending), return_exceptions=True)
+            # Let the _finished callbacks queued by the encoder thread run
+            await asyncio.sleep(0)
+
+    async def close(self) -> None:
+        await self.flush()
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {"saved": self.saved, "failed": self.failed, "pending": self.pending}
+
+
+_pipeline: Optional[ScreenshotPipeline] = None
+
+
+def get_pipeline() -> ScreenshotPipeline:
+    """Return the shared pipeline, created with the SCREENSHOT_* settings on first use."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ScreenshotPipeline()
+    return _pipeline
+
+
+async def close() -> None:
+    """Finish writing queued screenshots."""
+    global _pipeline
+    if _pipeline is not None:
+        await _pipeline.close()
+        _pipeline = None
@@ -0,0 +1,173 @@
+"""
+Background system metrics sampler for get_system_status.
+
+A MetricsSampler task polls psutil off the event loop every few seconds and
+keeps the readings in a fixed-size ring buffer. The tool then reads the
+latest sample in O(1) instead of sleeping through psutil.cpu_percent(1),
+and can report short trends over the buffered window.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+
+SAMPLE_INTERVAL_SECONDS = float(os.getenv("METRICS_SAMPLE_INTERVAL", "2"))
+# Ring buffer length: 150 samples at 2 s covers the last five minutes
+SAMPLE_HISTORY = int(os.getenv("METRICS_SAMPLE_HISTORY", "150"))
+# Per-process readings are more expensive, so take them every Nth sample
+PROCESS_SAMPLE_EVERY = int(os.getenv("METRICS_PROCESS_EVERY", "5"))
+TOP_PROCESSES = 5
+
+_cpu_primed = False
+
+
+class Sample(NamedTuple):
+    timestamp: float
+    cpu_percent: float
+    memory_percent: float
+    disk_percent: float
+    battery_percent: Optional[float]
+    power_plugged: Optional[bool]
+    # (name, cpu percent, memory percent) for the busiest processes
+    top_processes: tuple
+
+
+def _read_system(with_processes: bool) -> Sample:
+    """Take one reading with psutil. Blocking; run it in a worker thread."""
+    import psutil
+
+    global _cpu_primed
+    if _cpu_primed:
+        # interval=None compares against the previous call instead of sleeping
+        cpu = psutil.cpu_percent(interval=None)
+    else:
+        # The first non-blocking reading is meaningless; this thread can afford a short wait
+        cpu = psutil.cpu_percent(interval=0.1)
+        _cpu_primed = True
+
+    battery = psutil.sensors_battery()
+    top = ()
+    if with_processes:
+        procs = []
+        for proc in psutil.process_iter(['name', 'cpu_percent', 'memory_percent']):
+            info = proc.info
+            procs.append((info['name'] or "?", info['cpu_percent'] or 0.0, info['memory_percent'] or 0.0))
+        top = tuple(sorted(procs, key=lambda p: p[1], reverse=True)[:TOP_PROCESSES])
+    return Sample(
+        timestamp=time.monotonic(),
+        cpu_percent=cpu,
+        memory_percent=psutil.virtual_memory().percent,
+        disk_percent=psutil.disk_usage(os.path.abspath(os.sep)).percent,
+        battery_percent=battery.percent if battery else None,
+        power_plugged=battery.power_plugged if battery else None,
+        top_processes=top,
+    )
+
+
+class MetricsSampler:
+    def __init__(
+        self,
+        interval: float = SAMPLE_INTERVAL_SECONDS,
+        history: int = SAMPLE_HISTORY,
+        process_every: int = PROCESS_SAMPLE_EVERY,
+        read_fn: Callable[[bool], Sample] = _read_system,
+    ) -> None:
+        """
+        Args:
+            interval: Seconds between samples
+            history: Number of samples kept in the ring buffer
+            process_every: Take per-process readings every Nth sample
+            read_fn: Blocking reader (with_processes) -> Sample, injectable for tests
+        """
+        self.interval = interval
+        self.process_every = max(1, process_every)
+        self._read_fn = read_fn
+        self._samples: deque = deque(maxlen=history)
+        self._top_processes: tuple = ()
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        count = 0
+        while True:
+            try:
+                sample = await asyncio.to_thread(self._read_fn, count % self.process_every == 0)
+                if sample.top_processes:
+                    self._top_processes = sample.top_processes
+                self._samples.append(sample)
+                self._ready.set()
+            except Exception as e:
+                logging.warning(f"System metrics sample failed: {e}")
+            count += 1
+            await asyncio.sleep(self.interval)
+
+    async def wait_ready(self, timeout: float = 5.0) -> None:
+        """Wait for the first sample if the sampler has only just started."""
+        if self._samples:
+            return
+        self.start()
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    def latest(self) -> Optional[Sample]:
+        return self._samples[-1] if self._samples else None
+
+    def top_processes(self) -> tuple:
+        """Busiest processes from the most recent per-process reading."""
+        return self._top_processes
+
+    def average(self, field: str, seconds: float) -> Optional[float]:
+        """Average of a numeric field over samples from the last `seconds`."""
+        cutoff = time.monotonic() - seconds
+        values = []
+        for sample in reversed(self._samples):
+            if sample.timestamp < cutoff:
+                break
+            value = getattr(sample, field)
+            if value is not None:
+                values.append(value)
+        return sum(values) / len(values) if values else None
+
+    def window_seconds(self) -> float:
+        """Time span covered by the buffered samples."""
+        if len(self._samples) < 2:
+            return 0.0
+        return self._samples[-1].timestamp - self._samples[0].timestamp
+
+
+_sampler: Optional[MetricsSampler] = None
+
+
+def get_sampler() -> MetricsSampler:
+    """Return the shared sampler, starting it on first use."""
+    global _sampler
+    if _sampler is None:
+        _sampler = MetricsSampler()
+    _sampler.start()
+    return _sampler
+
+
+async def close() -> None:
+    """Stop the shared sampler."""
+    if _sampler is not None:
+        await _sampler.stop()
@@ -0,0 +1,77 @@
+"""
+Tests for the cached audio device resolver, driven by a fake device list.
+"""
+from audio_devices import INPUT, OUTPUT, DeviceResolver
+
+DEVICES = [
+    {"name": "Built-in Microphone", "max_input_channels": 2, "max_output_channels": 0},
+    {"name": "Built-in Output", "max_input_channels": 0, "max_output_channels": 2},
+    {"name": "USB Headset", "max_input_channels": 1, "max_output_channels": 2},
+]
+
+
+class FakeQuery:
+    def __init__(self, devices):
+        self.devices = list(devices)
+        self.calls = 0
+        self.rescans = 0
+
+    def __call__(self, rescan):
+        self.calls += 1
+        self.rescans += rescan
+        return list(self.devices)
+
+
+def test_find_by_name_and_capability():
+    resolver = DeviceResolver(query_fn=FakeQuery(DEVICES))
+    assert resolver.find("usb headset", INPUT).index == 2
+    assert resolver.find("  USB   Headset ", OUTPUT).index == 2
+    assert resolver.find("built-in", INPUT).index == 0
+    assert resolver.find("built-in", OUTPUT).index == 1
+    assert resolver.get(0, OUTPUT) is None
+
+
+def test_resolve_is_memoized_per_job():
+    query = FakeQuery(DEVICES)
+    resolver = DeviceResolver(query_fn=query)
+    for _ in range(50):
+        assert resolver.resolve(input_name="headset", output_name="built-in output") == (2, 1)
+    assert query.calls == 1
+
+
+def test_explicit_index_wins_and_invalid_values_are_ignored():
+    resolver = DeviceResolver(query_fn=FakeQuery(DEVICES))
+    assert resolver.resolve(input_index="0", input_name="headset") == (0, None)
+    assert resolver.resolve(input_index="mic", output_index="9") == (None, None)
+
+
+def test_nothing_configured_skips_enumeration():
+    query = FakeQuery(DEVICES)
+    resolver = DeviceResolver(query_fn=query)
+    assert resolver.resolve() == (None, None)
+    assert query.calls == 0
+
+
+def test_hot_plugged_device_found_on_miss_with_rescan():
+    query = FakeQuery(DEVICES)
+    resolver = DeviceResolver(query_fn=query, rescan_on_miss=True)
+    assert resolver.resolve(input_name="headset") == (2, None)
+    # Not memoized: the next job looks again
+    assert resolver.resolve(input_name="Studio Mic") == (None, None)
+    assert query.rescans == 1
+    query.devices.append({"name": "Studio Mic", "max_input_channels": 1, "max_output_channels": 0})
+    assert resolver.resolve(input_name="studio mic") == (3, None)
+    assert query.rescans == 2 and resolver.generation == 2
+    # Hits never rescan
+    assert resolver.find("headset").index == 2
+    assert query.rescans == 2
+
+
+def test_without_rescan_devices_are_enumerated_once():
+    query = FakeQuery(DEVICES)
+    resolver = DeviceResolver(query_fn=query, rescan_on_miss=False)
+    assert resolver.find("Studio Mic") is None
+    assert resolver.get(9) is None
+    assert resolver.resolve(input_name="headset") == (2, None)
+    # Re-enumerating without restarting PortAudio would only return the same list
+    assert query.calls == 1 and query.rescans == 0
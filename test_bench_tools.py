@@ -0,0 +1,38 @@
+"""
+Runs the offline tool benchmark briefly: every tool works against the
+stand-ins, and the regression check flags slower tools.
+"""
+import asyncio
+
+import bench_tools
+
+
+def test_every_tool_runs_offline():
+    results, problems = asyncio.run(bench_tools.run_suite(runs=3))
+    assert problems == []
+    assert set(results) == set(bench_tools.all_tools())
+    for name, figures in results.items():
+        # Nothing may hold the event loop long enough to break up audio
+        assert figures["block_ms"] < 50, name
+
+
+def test_environment_is_restored():
+    import tools
+    import weather
+
+    before = tools.SEARCH_CACHE, tools.SEARCH_POOL, weather._service, tools.pyautogui
+    asyncio.run(bench_tools.run_suite(runs=1, only=["get_weather"]))
+    assert (tools.SEARCH_CACHE, tools.SEARCH_POOL, weather._service, tools.pyautogui) == before
+
+
+def test_compare_flags_regressions():
+    baseline = {"get_weather": {"p50_ms": 1.0, "p99_ms": 2.0, "block_ms": 0.2, "alloc_kib": 100.0}}
+    steady = {"get_weather": {"p50_ms": 1.1, "p99_ms": 4.5, "block_ms": 0.3, "alloc_kib": 200.0}}
+    assert bench_tools.compare(steady, baseline) == []
+
+    slower = {"get_weather": {"p50_ms": 5.0, "p99_ms": 9.0, "block_ms": 3.0, "alloc_kib": 400.0}}
+    regressions = bench_tools.compare(slower, baseline)
+    assert [r.split(":")[0] for r in regressions] == [
+        "get_weather p99_ms", "get_weather block_ms", "get_weather alloc_kib"]
+    # Tools without a baseline entry are not judged
+    assert bench_tools.compare({"new_tool": slower["get_weather"]}, baseline) == []
@@ -0,0 +1,132 @@
+"""
+Tests for the TTL + LRU result cache.
+"""
+import asyncio
+
+from cache import TTLCache, normalize_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_fetch(values):
+    """Return a fetch factory that hands out values in order and counts calls."""
+    calls = []
+
+    def factory():
+        async def fetch():
+            calls.append(1)
+            return values[len(calls) - 1]
+        return fetch
+
+    return factory, calls
+
+
+def test_normalize_key():
+    assert normalize_key("  New   York ") == "new york"
+    assert normalize_key("LONDON") == normalize_key("london")
+
+
+def test_hit_miss_and_expiry():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=10, clock=clock)
+    factory, calls = make_fetch(["sunny", "rainy"])
+
+    async def run():
+        first = await cache.get_or_fetch("london", factory())
+        second = await cache.get_or_fetch("london", factory())
+        clock.now = 11
+        third = await cache.get_or_fetch("london", factory())
+        return first, second, third
+
+    assert asyncio.run(run()) == ("sunny", "sunny", "rainy")
+    assert len(calls) == 2
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_lru_eviction():
+    cache = TTLCache("test", maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # touch a so b is least recently used
+    cache.set("c", 3)
+    assert cache.get("b")[0] is False
+    assert cache.get("a") == (True, 1, False)
+    assert cache.evictions == 1
+
+
+def test_none_is_not_cached():
+    cache = TTLCache("test")
+    factory, calls = make_fetch([None, "ok"])
+
+    async def run():
+        await cache.get_or_fetch("x", factory())
+        return await cache.get_or_fetch("x", factory())
+
+    assert asyncio.run(run()) == "ok"
+    assert len(calls) == 2
+
+
+def test_stale_while_revalidate():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=10, stale_while_revalidate=True, max_stale=100, clock=clock)
+    factory, calls = make_fetch(["old", "new"])
+
+    async def run():
+        await cache.get_or_fetch("q", factory())
+        clock.now = 20
+        stale = await cache.get_or_fetch("q", factory())
+        # A second stale read while the refresh is in flight starts no new refresh
+        stale_again = await cache.get_or_fetch("q", factory())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        fresh = await cache.get_or_fetch("q", factory())
+        return stale, stale_again, fresh
+
+    assert asyncio.run(run()) == ("old", "old", "new")
+    assert len(calls) == 2
+    assert cache.stale_hits == 2
+
+
+def test_entries_past_max_stale_are_refetched():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=10, stale_while_revalidate=True, max_stale=5, clock=clock)
+    factory, calls = make_fetch(["old", "new"])
+
+    async def run():
+        await cache.get_or_fetch("q", factory())
+        clock.now = 16
+        return await cache.get_or_fetch("q", factory())
+
+    assert asyncio.run(run()) == "new"
+    assert cache.misses == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("backend down")
+        return "ok"
+
+    async def run():
+        failed = await asyncio.gather(*(cache.get_or_fetch("q", fetch) for _ in range(3)), return_exceptions=True)
+        fetched = await asyncio.gather(*(cache.get_or_fetch("q", fetch) for _ in range(3)))
+        return failed, fetched
+
+    failed, fetched = asyncio.run(run())
+    # Waiters get the shared fetch's exception, and the failure isn't remembered
+    assert all(isinstance(e, RuntimeError) for e in failed)
+    assert fetched == ["ok"] * 3
+    assert len(calls) == 2
+    assert cache.misses == 6 and cache.coalesced == 4
@@ -1,44 +1,81 @@
 """
-Quick test for close_assistant functionality
-Run this to verify the exit mechanism works properly
+Tests for close_assistant.
+Calls the real tool with a fake RunContext; closing must stay scoped to the
+session that said goodbye.
 """
 import asyncio
+import os
 import sys
-import logging
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from livekit.agents import RunContext
 
-class MockAgent:
+import tools
+
+
+class FakeSession:
     def __init__(self):
-        self.close_requested = False
+        self.shutdowns = []
+
+    def shutdown(self, *, drain=True):
+        self.shutdowns.append(drain)
+
+
+class FakeRunContext:
+    """The attributes of livekit's RunContext and nothing more, so tools can't lean on ones it lacks."""
 
-class MockContext:
     def __init__(self):
-        self.agent = MockAgent()
-
-async def test_close():
-    logger.info("Testing close_assistant function...")
-    
-    # Simulate the close function
-    context = MockContext()
-    
-    logger.info("Setting close_requested flag...")
-    context.agent.close_requested = True
-    
-    async def delayed_shutdown():
-        await asyncio.sleep(2)
-        logger.info("Terminating process...")
-        sys.exit(0)
-    
-    asyncio.create_task(delayed_shutdown())
-    logger.info("Shutdown scheduled - waiting 2 seconds before exit...")
-    
-    # Keep running until shutdown
-    await asyncio.sleep(5)
-
-if __name__ == "__main__":
-    try:
-        asyncio.run(test_close())
-    except SystemExit:
-        logger.info("✅ Process terminated successfully!")
+        self.session = FakeSession()
+        self.speech_handle = None
+        self.function_call = None
+        self.userdata = None
+
+
+async def run_session(context, started, goodbye):
+    """One session: starts a long background task, then says goodbye on cue."""
+    tools.bind_session_tasks()
+    tools._run_in_background(asyncio.sleep(60))
+    task = next(iter(tools._session_tasks.get()))
+    started.set()
+    await goodbye.wait()
+    result = await tools.close_assistant(context)
+    await asyncio.sleep(0)
+    return result, task
+
+
+def test_close_ends_only_its_own_session(monkeypatch):
+    exits = []
+    monkeypatch.setattr(sys, "exit", exits.append)
+    monkeypatch.setattr(os, "_exit", exits.append)
+    closing, staying = FakeRunContext(), FakeRunContext()
+
+    async def run():
+        started = [asyncio.Event(), asyncio.Event()]
+        goodbye, never = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(run_session(closing, started[0], goodbye))
+        second = asyncio.create_task(run_session(staying, started[1], never))
+        await asyncio.gather(*(event.wait() for event in started))
+        goodbye.set()
+        result, closed_task = await first
+        other_task = next(task for task in tools._background_tasks if task is not closed_task)
+        alive = not other_task.done()
+        second.cancel()
+        other_task.cancel()
+        return result, closed_task.cancelled(), alive
+
+    result, closed_cancelled, other_alive = asyncio.run(run())
+    assert result == "Goodbye, Boss. Closing assistant now."
+    # The goodbye is drained before the session closes; nothing exits the process
+    assert closing.session.shutdowns == [True] and staying.session.shutdowns == []
+    assert closed_cancelled and other_alive
+    assert exits == []
+
+
+def test_fake_context_has_only_real_attributes():
+    assert set(vars(FakeRunContext())) <= set(dir(RunContext))
+
+
+def test_close_without_a_session_reports_it():
+    context = FakeRunContext()
+    context.session = None
+    result = asyncio.run(tools.close_assistant(context))
+    assert result.startswith("Could not close the assistant")
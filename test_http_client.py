@@ -0,0 +1,101 @@
+"""
+Tests for the shared async HTTP client.
+Runs against a local stub of wttr.in, so no network access is needed.
+"""
+import asyncio
+import gc
+import time
+
+from aiohttp import web
+
+import http_client
+import tools
+import weather
+
+
+async def start_stub_server(delay: float = 0.2):
+    """Start a wttr.in stand-in that answers '<city>: +20°C' after a delay."""
+    peers = set()
+
+    async def weather(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(delay)
+        assert request.query.get("format") == "3"
+        return web.Response(text=f"{request.match_info['city']}: +20°C\n")
+
+    app = web.Application()
+    app.router.add_get("/{city}", weather)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", peers
+
+
+async def measure_drift(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Tick every `interval` seconds and return the worst lateness seen."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+def test_concurrent_lookups_keep_loop_responsive(monkeypatch):
+    """Ten get_weather calls at once, through the tool, against the stub."""
+    async def run():
+        runner, base_url, _ = await start_stub_server(delay=0.2)
+        service = weather.WeatherService(weather.WttrProvider(base_url), weather.ForecastStore(":memory:"))
+        monkeypatch.setattr(weather, "_service", service)
+        try:
+            # A full collection due mid-test would show up as drift; take it now
+            gc.collect()
+            stop = asyncio.Event()
+            ticker = asyncio.create_task(measure_drift(stop))
+            start = time.perf_counter()
+            results = await asyncio.gather(*(tools.get_weather(None, f"City{i}") for i in range(10)))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            drift = await ticker
+        finally:
+            await weather.close()
+            await http_client.close()
+            await runner.cleanup()
+        return results, elapsed, drift
+
+    results, elapsed, drift = asyncio.run(run())
+    assert results == [f"City{i}: +20°C (live from wttr.in, just now)" for i in range(10)]
+    # Ten 200 ms lookups overlap instead of running back to back
+    assert elapsed < 1.0
+    # The event loop kept ticking while the requests were in flight
+    assert drift < 0.05
+
+
+def test_sequential_lookups_reuse_connection():
+    async def run():
+        runner, base_url, peers = await start_stub_server(delay=0)
+        try:
+            for city in ("London", "Paris", "Tokyo"):
+                status, _ = await http_client.fetch_text(f"{base_url}/{city}", params={"format": "3"})
+                assert status == 200
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return peers
+
+    peers = asyncio.run(run())
+    # All three requests went over one keep-alive connection
+    assert len(peers) == 1
+
+
+def test_close_releases_session():
+    async def run():
+        session = http_client.get_session()
+        await http_client.close()
+        return session
+
+    session = asyncio.run(run())
+    assert session.closed
+    assert http_client._session is None
@@ -0,0 +1,101 @@
+"""
+Tests for the fast-path intent router.
+"""
+import asyncio
+
+import intent_router
+from intent_router import IntentRouter, fast_path
+from tool_metrics import instrumented_tool
+
+calls = []
+
+
+@instrumented_tool()
+@fast_path
+async def control_media(context, action: str) -> str:
+    """
+    Test stand-in for the media tool.
+
+    Args:
+        action: What to do
+    """
+    calls.append(action)
+    return f"{action} done, Boss."
+
+
+@instrumented_tool()
+@fast_path
+async def get_time_and_date(context) -> str:
+    """Test stand-in for the clock tool."""
+    calls.append("time")
+    return "It is noon, Boss."
+
+
+ROUTER = IntentRouter({"control_media": control_media, "get_time_and_date": get_time_and_date})
+
+
+def test_matches_whole_commands():
+    assert ROUTER.match("Pause the music.").kwargs == {"action": "pause"}
+    assert ROUTER.match("hey nevira, next track please").kwargs == {"action": "next"}
+    assert ROUTER.match("What time is it?").tool == "get_time_and_date"
+    assert ROUTER.match("skip").kwargs == {"action": "next"}
+
+
+def test_ambiguous_or_compound_requests_fall_back():
+    for text in (
+        "pause the music and open spotify",
+        "what time is it in Tokyo",
+        "play some jazz",
+        "turn the volume up a lot",  # control_volume isn't registered with this router
+        "don't pause the music",
+    ):
+        assert ROUTER.match(text) is None, text
+
+
+def test_model_repeat_is_answered_without_acting_twice():
+    calls.clear()
+
+    async def run():
+        fast = await ROUTER.handle("pause the music")
+        # The realtime model heard the same audio and calls the tool too
+        repeat = await control_media(None, action="pause")
+        # A later, separate request runs normally
+        later = await control_media(None, action="pause")
+        return fast, repeat, later
+
+    fast, repeat, later = asyncio.run(run())
+    assert calls == ["pause", "pause"]
+    assert fast == repeat == later == "pause done, Boss."
+
+
+def test_repeat_in_other_words_is_still_one_toggle():
+    calls.clear()
+
+    async def run():
+        await ROUTER.handle("pause the music")
+        # The model may phrase the same playpause toggle as "play"
+        return await control_media(None, action="play")
+
+    assert asyncio.run(run()) == "pause done, Boss."
+    assert calls == ["pause"]
+    assert intent_router._call_key("control_volume", {"action": "silence"}) == \
+        intent_router._call_key("control_volume", {"action": "unmute"})
+
+
+def test_next_turn_expires_the_routers_actions():
+    calls.clear()
+
+    async def run():
+        await ROUTER.handle("pause the music")
+        # Boss speaks again before the model repeated the call: the next pause is a real one
+        intent_router.new_turn()
+        return await control_media(None, action="pause")
+
+    asyncio.run(run())
+    assert calls == ["pause", "pause"]
+
+
+def test_unmatched_turns_leave_tools_alone():
+    calls.clear()
+    assert asyncio.run(ROUTER.handle("tell me a joke")) is None
+    assert calls == []
@@ -0,0 +1,40 @@
+"""
+Tests for deferred tool dependencies.
+"""
+import subprocess
+import sys
+
+from lazy import lazy_import
+
+
+def test_module_loads_on_first_attribute_access():
+    json_lazy = lazy_import("json")
+    assert not json_lazy.loaded
+    assert json_lazy.dumps([1]) == "[1]"
+    assert json_lazy.loaded
+
+
+def test_failed_import_raises_every_time():
+    missing = lazy_import("nevira_no_such_module")
+    for _ in range(2):
+        try:
+            missing.anything
+        except ModuleNotFoundError:
+            pass
+        else:
+            raise AssertionError("expected ModuleNotFoundError")
+
+
+def test_importing_tools_defers_heavy_modules():
+    code = (
+        "import sys, tools\n"
+        "heavy = [m for m in ('pyautogui', 'smtplib', 'ddgs', 'sounddevice') if m in sys.modules]\n"
+        "print(','.join(heavy))\n"
+        "print(tools.control_volume.info.name)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    heavy, tool_name = result.stdout.splitlines()
+    assert heavy == ""
+    # The function_tool schema is still built at import time
+    assert tool_name == "control_volume"
@@ -0,0 +1,93 @@
+"""
+Tests for the worker load model and admission control. The last test is a
+short soak: latency must stay bounded as simulated sessions ramp up.
+"""
+import asyncio
+import os
+import time
+
+import load
+from bench_load import FakeRequest, soak
+
+
+def test_score_is_the_most_loaded_resource():
+    gib = 2**30
+    model = load.LoadModel(lag_budget=0.1, memory_reserve=0.5 * gib, tool_slots=10)
+    assert model.score(lag=0.05, cpu=0.2, available=4 * gib, tools=2) == 0.5
+    assert model.score(lag=0.0, cpu=0.3, available=4 * gib, tools=6) == 0.6
+    assert model.score(lag=1.0, cpu=0.0, available=4 * gib, tools=0) == 1.0
+    # Memory only counts as it nears the reserve
+    assert model.score(lag=0.0, cpu=0.0, available=0.625 * gib, tools=0) == 0.8
+    assert model.score(lag=0.0, cpu=0.0, available=0, tools=0) == 1.0
+
+
+def test_heavy_tools_weigh_more():
+    assert load.weighted_tools({"take_screenshot": 2, "get_weather": 1}) == 9
+    assert load.parse_weights("take_screenshot=6, search_web=1,bad") == {"take_screenshot": 6.0, "search_web": 1.0}
+
+
+def test_job_reports_round_trip_and_expire(tmp_path, monkeypatch):
+    monkeypatch.setitem(load.tool_metrics._in_flight, "force_close_application", 1)
+    reporter = load.JobReporter(lambda: 0.02, state_dir=str(tmp_path))
+    reporter.write()
+    reports = load.read_reports(str(tmp_path))
+    assert len(reports) == 1 and reports[0]["lag"] == 0.02 and reports[0]["tools"] == 3
+    assert load.read_reports(str(tmp_path), now=time.time() + 60) == []
+    asyncio.run(reporter.close())
+    assert not os.path.exists(reporter.path)
+
+
+def test_admission_accepts_refuses_and_waits():
+    reports = []
+    worker = load.WorkerLoad(load.LoadModel(lag_budget=0.1), threshold=0.75, queue_seconds=0.6,
+                             reports_fn=lambda: reports, system_fn=lambda: (0.1, 8 * 2**30))
+
+    async def run():
+        first = FakeRequest("a")
+        await worker.admit(first)
+        # Loaded: three jobs at 0.6 total, one more (0.2) doesn't fit until one ends
+        worker.admitting = 0
+        reports[:] = [{"lag": 0.06, "tools": 0}] * 3
+        refused = FakeRequest("b")
+        await worker.admit(refused)
+        waiting = FakeRequest("c")
+        task = asyncio.create_task(worker.admit(waiting))
+        await asyncio.sleep(0.3)
+        reports[:] = [{"lag": 0.02, "tools": 0}] * 2
+        await task
+        return first, refused, waiting
+
+    first, refused, waiting = asyncio.run(run())
+    assert first.outcome == "accepted"
+    assert refused.outcome == "refused" and worker.refused == 1
+    assert waiting.outcome == "accepted" and worker.queued == 1
+
+
+def test_pending_admissions_count_toward_reported_load():
+    worker = load.WorkerLoad(reports_fn=lambda: [], system_fn=lambda: (0.0, float("inf")))
+    assert worker.load() == 0.0
+    worker.admitting = 3
+    assert round(worker.load(), 3) == round(3 * load.LOAD_JOB_ESTIMATE, 3)
+
+
+def test_idle_worker_always_takes_a_job():
+    # A busy desktop: most of the RAM used and the CPU pegged by other programs
+    worker = load.WorkerLoad(threshold=0.75, queue_seconds=0.3,
+                             reports_fn=lambda: [], system_fn=lambda: (0.95, 300 * 2**20))
+    assert worker.load() < worker.threshold
+    request = FakeRequest("only")
+    asyncio.run(worker.admit(request))
+    assert request.outcome == "accepted"
+    # With that job admitted the same load turns the next one away
+    second = FakeRequest("second")
+    asyncio.run(worker.admit(second))
+    assert second.outcome == "refused"
+
+
+def test_soak_latency_stays_bounded_as_sessions_ramp():
+    result = asyncio.run(soak(requests=25, interval=0.12, block=0.004, hold=0.8))
+    assert result["refused"] > 0
+    assert 2 <= result["peak_sessions"] < 25
+    # Bounded: a few heartbeats of the 50 ms lag budget, however many sessions asked to join
+    assert result["p99"] < 0.06
+    assert max(result["p99_by_sessions"].values()) < 0.08
@@ -0,0 +1,85 @@
+"""
+Tests for the event-loop stall detector. The last test doubles as a CI
+check that the pure tools never block the loop.
+"""
+import asyncio
+import time
+
+import tool_metrics
+from loop_watchdog import LoopWatchdog
+from tool_metrics import instrumented_tool
+from tools import get_schedule, get_time_and_date
+
+
+@instrumented_tool()
+async def blocking_probe(seconds: float) -> str:
+    """
+    Test tool that blocks the loop.
+
+    Args:
+        seconds: How long to block
+    """
+    time.sleep(seconds)
+    return "Done, Boss."
+
+
+def run_watched(coro_fn, threshold=0.05):
+    async def run():
+        dog = LoopWatchdog(threshold=threshold, interval=0.01)
+        dog.start()
+        await asyncio.sleep(0.05)
+        await coro_fn()
+        await asyncio.sleep(0.05)
+        await dog.stop()
+        return dog
+
+    return asyncio.run(run())
+
+
+def test_stall_attributed_to_instrumented_tool():
+    async def call():
+        await blocking_probe(0.3)
+
+    dog = run_watched(call)
+    assert dog.stalls == {"blocking_probe": 1}
+    stall = dog.recent[-1]
+    assert "time.sleep(seconds)" in stall.stack
+    assert dog.lag.max >= 200_000
+
+
+def test_stall_outside_tools_names_the_function():
+    async def plain_blocker():
+        time.sleep(0.3)
+
+    dog = run_watched(plain_blocker)
+    assert list(dog.stalls) == [f"{__name__}.plain_blocker"]
+
+
+def test_short_blocks_are_not_stalls():
+    async def brief():
+        for _ in range(5):
+            time.sleep(0.005)
+            await asyncio.sleep(0)
+
+    dog = run_watched(brief)
+    assert dog.total_stalls == 0
+
+
+def test_exported_with_tool_metrics():
+    dog = LoopWatchdog()
+    dog.stalls["blocking_probe"] = 2
+    tool_metrics.register_collector("event_loop_test", dog.snapshot, dog.prometheus_lines)
+    try:
+        assert 'nevira_event_loop_stalls_total{tool="blocking_probe"} 2' in tool_metrics.render_prometheus()
+        assert '"event_loop_test"' in tool_metrics.render_json()
+    finally:
+        tool_metrics._collectors.pop("event_loop_test")
+
+
+def test_pure_tools_do_not_block_the_loop():
+    async def call():
+        for _ in range(20):
+            await get_time_and_date(None)
+            await get_schedule(None, "today")
+
+    assert run_watched(call, threshold=0.05).total_stalls == 0
@@ -0,0 +1,185 @@
+"""
+Tests for the persistent SMTP mailer.
+Runs against a local aiosmtpd server standing in for Gmail.
+"""
+import asyncio
+import smtplib
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from mailer import SMTPMailer
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.logins = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((envelope.mail_from, envelope.rcpt_tos))
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+
+    def authenticator(server, session, envelope, mechanism, auth_data):
+        handler.logins += 1
+        ok = auth_data.login == b"nevira" and auth_data.password == b"secret"
+        return AuthResult(success=ok, handled=False)
+
+    port = free_port()
+    controller = Controller(
+        handler, hostname="127.0.0.1", port=port,
+        authenticator=authenticator, auth_require_tls=False,
+    )
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+def message(n):
+    return f"Subject: test {n}\r\n\r\nbody {n}\r\n"
+
+
+def test_messages_share_one_session(smtp_server):
+    handler, port = smtp_server
+    mailer = SMTPMailer("127.0.0.1", port, user="nevira", password="secret", starttls=False)
+
+    async def run():
+        futures = [mailer.enqueue("nevira@example.com", [f"user{i}@example.com"], message(i)) for i in range(3)]
+        # enqueue returns before anything is sent
+        assert mailer.sent == 0
+        await asyncio.gather(*futures)
+        await mailer.close()
+
+    asyncio.run(run())
+    assert [rcpt for _, rcpt in handler.messages] == [["user0@example.com"], ["user1@example.com"], ["user2@example.com"]]
+    assert len(handler.sessions) == 1
+    assert handler.logins == 1
+    assert mailer.stats() == {"sent": 3, "failed": 0, "pending": 0, "connects": 1}
+    assert 'nevira_email_messages_total{outcome="sent"} 3' in mailer.prometheus_lines()
+
+
+def test_reconnects_after_server_drops_connection(smtp_server):
+    handler, port = smtp_server
+    mailer = SMTPMailer("127.0.0.1", port, user="nevira", password="secret", starttls=False)
+
+    async def run():
+        await mailer.send("nevira@example.com", ["a@example.com"], message(1))
+        # Simulate the server hanging up on an idle session
+        mailer._smtp.sock.shutdown(socket.SHUT_RDWR)
+        await mailer.send("nevira@example.com", ["b@example.com"], message(2))
+        await mailer.close()
+
+    asyncio.run(run())
+    assert len(handler.messages) == 2
+    assert mailer.connects == 2
+
+
+def test_authentication_failure_is_reported(smtp_server):
+    _, port = smtp_server
+    mailer = SMTPMailer("127.0.0.1", port, user="nevira", password="wrong", starttls=False)
+
+    async def run():
+        with pytest.raises(Exception) as excinfo:
+            await mailer.send("nevira@example.com", ["a@example.com"], message(1))
+        await mailer.close()
+        return excinfo.value
+
+    assert isinstance(asyncio.run(run()), smtplib.SMTPAuthenticationError)
+    assert mailer.failed == 1
+
+
+def test_close_flushes_queue(smtp_server):
+    handler, port = smtp_server
+    mailer = SMTPMailer("127.0.0.1", port, user="nevira", password="secret", starttls=False)
+
+    async def run():
+        for i in range(5):
+            mailer.enqueue("nevira@example.com", ["a@example.com"], message(i))
+        await mailer.close()
+
+    asyncio.run(run())
+    assert len(handler.messages) == 5
+    # A closed mailer doesn't keep its SMTP thread alive
+    smtp_threads = [t for t in threading.enumerate() if t.name.startswith("smtp_")]
+    for thread in smtp_threads:
+        thread.join(timeout=1)
+    assert not any(thread.is_alive() for thread in smtp_threads)
+
+
+def test_verify_logs_in_once_and_keeps_the_session(smtp_server):
+    handler, port = smtp_server
+    mailer = SMTPMailer("127.0.0.1", port, user="nevira", password="secret", starttls=False)
+
+    async def run():
+        await mailer.verify()
+        await mailer.verify()
+        await mailer.send("nevira@example.com", ["a@example.com"], message(1))
+        await mailer.close()
+
+    asyncio.run(run())
+    assert handler.logins == 1 and mailer.connects == 1
+    assert len(handler.messages) == 1
+
+
+def test_queued_email_reports_bad_credentials(smtp_server, monkeypatch):
+    import mailer as mailer_module
+    import tools
+
+    handler, port = smtp_server
+    monkeypatch.setenv("GMAIL_USER", "nevira")
+    monkeypatch.setenv("GMAIL_APP_PASSWORD", "wrong")
+    monkeypatch.setattr(tools, "EMAIL_QUEUE", True)
+    outbox = SMTPMailer("127.0.0.1", port, user="nevira", password="wrong", starttls=False)
+    monkeypatch.setattr(mailer_module, "_mailer", outbox)
+
+    async def run():
+        result = await tools.send_email(None, "a@example.com", "Hi", "Hello")
+        await outbox.close()
+        return result
+
+    result = asyncio.run(run())
+    assert result.startswith("Email sending failed: Authentication error")
+    assert outbox.pending == 0 and handler.messages == []
+
+
+def test_changing_credentials_closes_the_old_mailer(monkeypatch):
+    import mailer as mailer_module
+
+    monkeypatch.setattr(mailer_module, "_mailer", None)
+
+    async def run():
+        old = mailer_module.get_mailer("nevira", "old-password")
+        closed = []
+
+        async def close():
+            closed.append(old)
+
+        old.close = close
+        assert mailer_module.get_mailer("nevira", "old-password") is old
+        new = mailer_module.get_mailer("nevira", "new-password")
+        await mailer_module.close()
+        return old, new, closed
+
+    old, new, closed = asyncio.run(run())
+    assert new is not old and closed == [old]
+    assert mailer_module._mailer is None
@@ -0,0 +1,81 @@
+"""
+Tests for the long-term memory store.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+import agent
+from memory import MemoryStore, VectorIndex, embed, extract_facts, format_memories
+
+
+def test_extract_facts_keeps_statements_only():
+    facts = extract_facts(
+        "My sister is called Anna. What's the weather like? I prefer dark mode in every app. "
+        "Remember that the wifi password is on the fridge."
+    )
+    assert facts == [
+        "My sister is called Anna",
+        "I prefer dark mode in every app",
+        "the wifi password is on the fridge",
+    ]
+    assert extract_facts("Do you know my name?") == []
+
+
+def test_conversational_first_person_is_not_a_fact():
+    assert extract_facts("I have a question about the weather. I am done for today. I have to go.") == []
+    assert extract_facts("I am going to bed. I work tomorrow.") == []
+    assert extract_facts("I have a dog called Rex. I am a vegetarian. I live in Lisbon.") == [
+        "I have a dog called Rex",
+        "I am a vegetarian",
+        "I live in Lisbon",
+    ]
+
+
+def test_write_then_recall_across_restarts(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.observe_turn("My dog is called Rex. I work at the observatory.")
+    store.observe_turn("I love Italian food, especially risotto.")
+    asyncio.run(store.flush())
+
+    reopened = MemoryStore(str(tmp_path))
+    assert len(reopened.index) == 3
+    assert reopened.recall("what is the dog called", k=1) == ["My dog is called Rex"]
+    assert reopened.recall("favourite food risotto", k=1) == ["I love Italian food, especially risotto"]
+
+
+def test_repeated_facts_are_not_stored_twice(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.remember(["I live in Lisbon", "I live in Lisbon"]).result()
+    store.remember(["I live in Lisbon"]).result()
+    assert len(store.index) == 1
+
+
+def test_truncated_write_is_ignored_on_load(tmp_path):
+    index = VectorIndex(str(tmp_path), dim=16)
+    index.append(embed("one fact", 16)[None, :], [{"text": "one fact"}])
+    with open(index.facts_path, "a") as f:
+        f.write('{"text": "orphan without a vector"}\n')
+    assert len(VectorIndex(str(tmp_path), dim=16)) == 1
+
+
+def test_recall_is_fast_on_a_large_index(tmp_path):
+    facts = [f"my project number {i} is named codename{i}" for i in range(20000)]
+    VectorIndex(str(tmp_path)).append(np.stack([embed(f) for f in facts]), [{"text": f} for f in facts])
+    store = MemoryStore(str(tmp_path))
+    start = time.perf_counter()
+    for _ in range(20):
+        found = store.recall("which project is named codename4242", k=5)
+    assert len(found) == 5
+    assert (time.perf_counter() - start) / 20 < 0.01
+
+
+def test_memories_injected_into_instructions(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    store = MemoryStore(str(tmp_path))
+    store.remember(["My name is Sam", "I prefer short answers"]).result()
+    assistant, _ = agent.create_session_components({"memory": store})
+    assert "My name is Sam" in assistant.instructions
+    assert "I prefer short answers" in assistant.instructions
+    assert format_memories([]) == ""
@@ -0,0 +1,178 @@
+"""
+Tests for the worker prewarm stage.
+"""
+import asyncio
+import tempfile
+import time
+import types
+
+import pytest
+
+import agent
+import memory
+import weather
+
+
+@pytest.fixture(autouse=True)
+def memory_dir(tmp_path, monkeypatch):
+    """Keep the memory index out of the home directory."""
+    monkeypatch.setattr(memory, "_store", memory.MemoryStore(str(tmp_path / "memory")))
+
+
+def fake_proc():
+    return types.SimpleNamespace(userdata={})
+
+
+def test_prewarm_fills_userdata(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.delenv("AUDIO_INPUT_DEVICE_INDEX", raising=False)
+    monkeypatch.delenv("AUDIO_INPUT_DEVICE_NAME", raising=False)
+    monkeypatch.delenv("AUDIO_OUTPUT_DEVICE_INDEX", raising=False)
+    proc = fake_proc()
+    agent.prewarm(proc)
+    assert proc.userdata["audio_devices"] == (None, None)
+    assert proc.userdata["noise_cancellation"] is not None
+    assert proc.userdata["llm"] is not None
+    # Silero's ONNX session is built here rather than on the loop when a session starts
+    assert proc.userdata["vad_detector"] is not None
+
+
+def test_jobs_share_prewarmed_components(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    proc = fake_proc()
+    agent.prewarm(proc)
+    first, first_options = agent.create_session_components(proc.userdata)
+    second, second_options = agent.create_session_components(proc.userdata)
+    assert first.llm is second.llm is proc.userdata["llm"]
+    assert first_options.noise_cancellation is proc.userdata["noise_cancellation"]
+    assert second_options.noise_cancellation is proc.userdata["noise_cancellation"]
+
+
+def test_prewarm_survives_missing_api_key(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    proc = fake_proc()
+    agent.prewarm(proc)
+    assert "llm" not in proc.userdata
+
+
+def test_validate_config_reports_problems(monkeypatch):
+    for var in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "GOOGLE_API_KEY"):
+        monkeypatch.setenv(var, "x")
+    monkeypatch.setenv("GMAIL_USER", "boss@example.com")
+    monkeypatch.delenv("GMAIL_APP_PASSWORD", raising=False)
+    monkeypatch.setenv("AUDIO_OUTPUT_DEVICE_INDEX", "speakers")
+    problems = agent.validate_config()
+    assert len(problems) == 2
+    assert any("GMAIL_APP_PASSWORD" in p for p in problems)
+    assert any("AUDIO_OUTPUT_DEVICE_INDEX" in p for p in problems)
+
+
+def test_jobs_reuse_prewarmed_audio_devices(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.delenv("AUDIO_INPUT_DEVICE_INDEX", raising=False)
+    monkeypatch.delenv("AUDIO_OUTPUT_DEVICE_INDEX", raising=False)
+    monkeypatch.setenv("AUDIO_INPUT_DEVICE_NAME", "USB Headset")
+    monkeypatch.delenv("AUDIO_OUTPUT_DEVICE_NAME", raising=False)
+    calls = []
+
+    def configure():
+        calls.append(1)
+        return (2, None)
+
+    monkeypatch.setattr(agent, "configure_audio_devices", configure)
+    proc = fake_proc()
+    agent.prewarm(proc)
+    agent.create_session_components(proc.userdata)
+    agent.create_session_components(proc.userdata)
+    assert calls == [1]
+    # A configured device that didn't resolve at prewarm is looked for again
+    proc.userdata["audio_devices"] = (None, None)
+    agent.create_session_components(proc.userdata)
+    assert calls == [1, 1]
+
+
+class FakeSession:
+    """Stands in for AgentSession; records when the greeting is requested."""
+
+    def __init__(self, *args, **kwargs):
+        self.input = types.SimpleNamespace(audio=None)
+        self.greeted_at = None
+
+    async def start(self, room, agent, room_input_options):
+        self.agent = agent
+
+    def on(self, event, callback=None):
+        return callback if callback is not None else (lambda fn: fn)
+
+    async def generate_reply(self, instructions):
+        self.greeted_at = time.perf_counter()
+
+
+class FakeJobContext:
+    def __init__(self, userdata):
+        self.proc = types.SimpleNamespace(userdata=userdata)
+        self.room = None
+        self.shutdown_callbacks = []
+
+    def add_shutdown_callback(self, callback):
+        self.shutdown_callbacks.append(callback)
+
+    async def connect(self):
+        pass
+
+    def shutdown(self, reason=""):
+        pass
+
+
+def greeting_latency(monkeypatch, userdata) -> float:
+    """Seconds from job start to the greeting request, with the session and model stubbed."""
+    sessions = []
+
+    def make_session(*args, **kwargs):
+        sessions.append(FakeSession())
+        return sessions[-1]
+
+    monkeypatch.setattr(agent, "AgentSession", make_session)
+    monkeypatch.setattr(agent.tool_metrics, "METRICS_STATE_DIR", tempfile.mkdtemp())
+    monkeypatch.setattr(agent.weather, "_service", weather.WeatherService(weather.LocalProvider(), weather.ForecastStore(":memory:")))
+    monkeypatch.setattr(agent.load, "LOAD_STATE_DIR", tempfile.mkdtemp())
+    monkeypatch.setattr(agent.wake, "WAKE_MODE", False)
+    ctx = FakeJobContext(userdata)
+
+    async def run():
+        start = time.perf_counter()
+        await agent.entrypoint(ctx)
+        elapsed = sessions[-1].greeted_at - start
+        for callback in ctx.shutdown_callbacks:
+            await callback()
+        return elapsed
+
+    return asyncio.run(run())
+
+
+def test_time_to_first_greeting(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    proc = fake_proc()
+    agent.prewarm(proc)
+    warm = min(greeting_latency(monkeypatch, proc.userdata) for _ in range(3))
+    # A job with nothing prewarmed builds the model, noise cancellation and devices itself
+    cold = greeting_latency(monkeypatch, {})
+    # With the model stubbed the two are close; the budget catches blocking work creeping into job start
+    assert warm < 0.25, f"time to first greeting: prewarmed {warm * 1000:.1f} ms, cold {cold * 1000:.1f} ms"
+
+
+def test_metrics_endpoint_starts_with_the_worker(monkeypatch):
+    started = []
+
+    async def start_server():
+        started.append(1)
+
+    monkeypatch.setattr(agent.tool_metrics, "start_server", start_server)
+    server = agent.build_server()
+
+    async def run():
+        server.emit("worker_started")
+        await agent._metrics_task
+
+    asyncio.run(run())
+    assert started == [1]
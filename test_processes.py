@@ -0,0 +1,227 @@
+"""
+Tests for the process index and termination helpers.
+Spawns dummy child processes under a unique executable name.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+import pytest
+
+from processes import ProcessIndex, TerminationEngine, closed_any, terminate
+
+SLEEPER = "import time; time.sleep(60)"
+STUBBORN = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(60)"
+
+
+@pytest.fixture
+def dummy_exe(tmp_path):
+    """A symlink to the interpreter so the children get a recognizable process name."""
+    if sys.platform == "win32":
+        pytest.skip("symlinked interpreter names are POSIX-only")
+    path = tmp_path / "neviradummy"
+    os.symlink(sys.executable, path)
+    return str(path)
+
+
+@pytest.fixture
+def spawn(dummy_exe, tmp_path):
+    children = []
+
+    def start(code=SLEEPER, name=None):
+        exe = dummy_exe
+        if name is not None:
+            exe = str(tmp_path / name)
+            if not os.path.exists(exe):
+                os.symlink(sys.executable, exe)
+        child = subprocess.Popen([exe, "-c", code], stdout=subprocess.PIPE)
+        children.append(child)
+        if code is STUBBORN:
+            child.stdout.readline()
+        return child
+
+    yield start
+    for child in children:
+        if child.poll() is None:
+            child.kill()
+        child.wait()
+
+
+def test_refresh_applies_diffs(spawn):
+    index = ProcessIndex()
+    index.refresh()
+    assert index.find("neviradummy") == []
+
+    children = [spawn() for _ in range(3)]
+    added, _ = index.refresh()
+    assert added >= 3
+    assert sorted(p.pid for p in index.find("neviradummy", exact=True)) == sorted(c.pid for c in children)
+    assert [p.pid for p in index.find("viradum")] == sorted(c.pid for c in children)
+
+    children[0].kill()
+    children[0].wait()
+    _, removed = index.refresh()
+    assert removed >= 1
+    assert children[0].pid not in [p.pid for p in index.find("neviradummy")]
+
+
+def test_find_is_fast_and_excludes_self():
+    index = ProcessIndex()
+    index.refresh()
+    own_name = psutil.Process().name()
+    assert os.getpid() not in [p.pid for p in index.find(own_name)]
+
+    start = time.perf_counter()
+    for _ in range(100):
+        index.find("no-such-process")
+    assert (time.perf_counter() - start) / 100 < 0.001
+
+
+def test_lookup_rescans_on_miss(spawn):
+    index = ProcessIndex(poll_interval=60)
+
+    async def run():
+        await index.wait_ready()
+        child = spawn()
+        matches = await index.lookup("neviradummy")
+        await index.stop()
+        return child, matches
+
+    child, matches = asyncio.run(run())
+    assert [p.pid for p in matches] == [child.pid]
+
+
+class ExitedProcess:
+    """Handle of a process that has exited; its PID now belongs to someone else."""
+
+    def __init__(self, pid):
+        self.pid = pid
+
+    def is_running(self):
+        return False
+
+
+class WatchedProcess(ExitedProcess):
+    """Live handle that records which thread asked whether it is running."""
+
+    def __init__(self, pid):
+        super().__init__(pid)
+        self.checked_on = []
+
+    def is_running(self):
+        self.checked_on.append(threading.current_thread())
+        return True
+
+
+def test_lookup_checks_liveness_off_the_loop():
+    index = ProcessIndex(poll_interval=60)
+    proc = WatchedProcess(999999)
+
+    async def run():
+        await index.wait_ready()
+        with index._lock:
+            index._procs[proc.pid] = (proc, "neviradummy")
+            index._by_name.setdefault("neviradummy", set()).add(proc.pid)
+        matches = await index.lookup("neviradummy", exact=True)
+        await index.stop()
+        return matches
+
+    assert asyncio.run(run()) == [proc]
+    assert proc.checked_on and threading.main_thread() not in proc.checked_on
+
+
+def test_lookup_notices_a_reused_pid(spawn):
+    index = ProcessIndex(poll_interval=60)
+
+    async def run():
+        await index.wait_ready()
+        child = spawn(name="neviraother")
+        index.refresh()
+        # As if an old neviradummy had held this PID and it was reused between refreshes
+        with index._lock:
+            index._drop(child.pid)
+            index._procs[child.pid] = (ExitedProcess(child.pid), "neviradummy")
+            index._by_name.setdefault("neviradummy", set()).add(child.pid)
+        stale = await index.lookup("neviradummy", exact=True)
+        found = await index.lookup("neviraother", exact=True)
+        await index.stop()
+        return child, stale, found
+
+    child, stale, found = asyncio.run(run())
+    assert stale == []
+    assert [p.pid for p in found] == [child.pid]
+
+
+def test_terminate_reports_each_pid(spawn):
+    polite = spawn()
+    stubborn = spawn(STUBBORN)
+    index = ProcessIndex()
+    index.refresh()
+    targets = index.find("neviradummy")
+
+    outcomes = asyncio.run(terminate(targets, timeout=0.5))
+    assert outcomes == {polite.pid: "terminated", stubborn.pid: "killed"}
+    assert polite.wait(1) is not None
+    assert stubborn.wait(1) is not None
+
+
+def test_terminate_already_exited(spawn):
+    child = spawn()
+    proc = psutil.Process(child.pid)
+    child.kill()
+    child.wait()
+    assert asyncio.run(terminate([proc])) == {child.pid: "already exited"}
+
+
+def test_engine_matches_exe_names_on_any_platform(spawn):
+    children = [spawn(name="nevirabrowser") for _ in range(2)]
+    engine = TerminationEngine(index=ProcessIndex(), window_titles_fn=dict, timeout=1)
+
+    async def run():
+        outcomes = await engine.close(["NeviraBrowser.exe"])
+        await engine.index.stop()
+        return outcomes
+
+    outcomes = asyncio.run(run())
+    assert outcomes == {c.pid: "terminated" for c in children}
+    assert closed_any(outcomes)
+
+
+def test_engine_batches_title_matches_with_fallback(spawn):
+    tab_a = spawn(name="neviraalpha")
+    other_a = spawn(name="neviraalpha")
+    beta = [spawn(name="nevirabeta") for _ in range(2)]
+    titles = {tab_a.pid: ["Lo-fi beats - YouTube - Alpha"], other_a.pid: ["Inbox - Alpha"]}
+    engine = TerminationEngine(index=ProcessIndex(), window_titles_fn=lambda: titles, timeout=1)
+
+    async def run():
+        start = time.perf_counter()
+        outcomes = await engine.close_many([
+            (["neviraalpha.exe"], "youtube", True),
+            (["nevirabeta.exe"], "youtube", True),
+        ])
+        elapsed = time.perf_counter() - start
+        await engine.index.stop()
+        return outcomes, elapsed
+
+    outcomes, elapsed = asyncio.run(run())
+    # alpha: only the YouTube window's process; beta has none, so all of it
+    assert set(outcomes) == {tab_a.pid, beta[0].pid, beta[1].pid}
+    assert other_a.poll() is None
+    # One batched wait, not one per process
+    assert elapsed < 1.0
+
+
+def test_engine_reports_nothing_when_not_running():
+    engine = TerminationEngine(index=ProcessIndex(), window_titles_fn=dict)
+
+    async def run():
+        outcomes = await engine.close(["definitely-not-running.exe"], title="youtube")
+        await engine.index.stop()
+        return outcomes
+
+    assert asyncio.run(run()) == {}
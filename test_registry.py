@@ -0,0 +1,150 @@
+"""
+Tests for the app/site registry and the tools that use it.
+"""
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+import registry
+import tools
+from registry import FuzzyIndex, Registry, load_installed, scan_installed
+
+
+@pytest.fixture
+def reg():
+    return Registry.from_file()
+
+
+@pytest.mark.parametrize("name,key", [
+    ("calculator", "calculator"),
+    ("Calc", "calculator"),
+    ("calculater", "calculator"),
+    ("vs code", "visual studio code"),
+    ("VSCode", "visual studio code"),
+    ("notepad", "notepad"),
+    ("google chrome", "chrome"),
+    ("fire fox", "firefox"),
+])
+def test_find_app(reg, name, key):
+    assert reg.find_app(name).key == key
+
+
+def test_unknown_app(reg):
+    assert reg.find_app("photoshop") is None
+
+
+def test_find_site(reg):
+    assert reg.find_site("yt").url == "https://youtube.com"
+    assert reg.find_site("githib").key == "github"
+    assert reg.find_site("example.com") is None
+
+
+def test_browsers(reg):
+    assert {b.key for b in reg.browsers()} == {"chrome", "edge", "firefox"}
+
+
+def test_ambiguous_fuzzy_match_is_rejected():
+    index = FuzzyIndex()
+    index.add("pixel", "a")
+    index.add("pixal", "b")
+    assert index.lookup("pixol") is None
+    assert index.lookup("pixel") == ("a", 1.0)
+
+
+def test_lookup_is_fast(reg):
+    start = time.perf_counter()
+    for _ in range(1000):
+        reg.find_app("calculater")
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+
+def test_installed_apps_merge_below_config(monkeypatch):
+    monkeypatch.setattr(registry, "_platform", lambda: "linux")
+    config = {"apps": {"calculator": {"launch": {"linux": "gnome-calculator"}, "processes": ["gnome-calculator"]}}}
+    installed = {
+        "Calculator": {"launch": "other-calc", "processes": ["other-calc"]},
+        "GIMP": {"launch": "gimp", "processes": ["gimp"]},
+    }
+    reg = Registry(config, installed)
+    assert reg.find_app("calculator").processes == ("gnome-calculator",)
+    assert reg.find_app("gimp").launch == {"linux": "gimp"}
+
+
+def _desktop_file(directory, name, command, extra=""):
+    with open(os.path.join(directory, f"{name.lower()}.desktop"), "w") as f:
+        f.write(f"[Desktop Entry]\nName={name}\nExec={command}\n{extra}")
+
+
+def test_scan_reads_desktop_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "_platform", lambda: "linux")
+    _desktop_file(tmp_path, "GIMP", "/usr/bin/gimp %U")
+    _desktop_file(tmp_path, "Hidden", "hidden", "NoDisplay=true\n")
+    found = scan_installed([str(tmp_path)])
+    assert found == {"GIMP": {"launch": "/usr/bin/gimp", "processes": ["gimp"]}}
+
+
+def test_scan_cache_reused_until_dirs_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "_platform", lambda: "linux")
+    apps = tmp_path / "apps"
+    apps.mkdir()
+    cache_path = str(tmp_path / "cache.json")
+    _desktop_file(apps, "GIMP", "gimp")
+
+    scans = []
+    real_scan = registry.scan_installed
+    monkeypatch.setattr(registry, "scan_installed", lambda dirs: scans.append(dirs) or real_scan(dirs))
+
+    assert "GIMP" in load_installed(cache_path, [str(apps)])
+    assert "GIMP" in load_installed(cache_path, [str(apps)])
+    assert len(scans) == 1
+    with open(cache_path) as f:
+        assert "GIMP" in json.load(f)["apps"]
+
+    _desktop_file(apps, "Inkscape", "inkscape")
+    os.utime(apps, (time.time() + 5, time.time() + 5))
+    assert "Inkscape" in load_installed(cache_path, [str(apps)])
+    assert len(scans) == 2
+
+
+class FakeEngine:
+    def __init__(self):
+        self.closed = []
+
+    async def close(self, names, **kwargs):
+        self.closed.append(list(names))
+        return {}
+
+
+def test_tools_share_the_registry(monkeypatch):
+    launched = []
+    monkeypatch.setattr(Registry, "launch", lambda self, app: launched.append(app.key))
+    engine = FakeEngine()
+    monkeypatch.setattr(tools.processes, "get_engine", lambda: engine)
+
+    assert asyncio.run(tools.open_application(None, "calc")) == "Opening calculator now, Boss."
+    assert launched == ["calculator"]
+    assert "don't know how to open" in asyncio.run(tools.open_application(None, "photoshop"))
+
+    assert asyncio.run(tools.close_application(None, "vs code")) == "visual studio code isn't running, Boss."
+    assert engine.closed[-1] == ["Code.exe", "Code", "code"]
+
+    asyncio.run(tools.close_browser(None, "google chrome"))
+    assert engine.closed[-1] == ["chrome.exe", "Google Chrome"]
+    asyncio.run(tools.close_browser(None))
+    assert set(engine.closed[-1]) == {"chrome.exe", "Google Chrome", "msedge.exe", "Microsoft Edge", "firefox.exe"}
+
+
+def test_close_browser_reports_processes_it_could_not_close(monkeypatch):
+    engine = FakeEngine()
+
+    async def denied(names, **kwargs):
+        engine.closed.append(list(names))
+        return {4242: "access denied"}
+
+    engine.close = denied
+    monkeypatch.setattr(tools.processes, "get_engine", lambda: engine)
+    assert asyncio.run(tools.close_browser(None, "chrome")) == "Could not close chrome: access denied."
+    assert asyncio.run(tools.close_browser(None, "all")) == "Could not close the browsers: access denied."
@@ -0,0 +1,202 @@
+"""
+Tests for the schedule engine and the calendar tools.
+"""
+import asyncio
+import datetime
+import json
+import os
+import time
+
+import pytest
+
+import schedule
+import tools
+from schedule import IntervalIndex, Event, Schedule, expand, parse_day, parse_ical, parse_rrule, parse_time
+
+# A Monday
+NOW = datetime.datetime(2026, 10, 19, 9, 30)
+
+ICS = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:standup
+SUMMARY:Standup
+DTSTART:20260901T100000
+DURATION:PT15M
+RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR
+EXDATE:20261021T100000
+END:VEVENT
+BEGIN:VEVENT
+UID:review
+SUMMARY:Quarterly
+  review
+DTSTART:20261001T140000
+DTEND:20261001T150000
+RRULE:FREQ=MONTHLY;INTERVAL=3;COUNT=4
+END:VEVENT
+BEGIN:VEVENT
+UID:trip
+SUMMARY:Trip
+DTSTART;VALUE=DATE:20261024
+DTEND;VALUE=DATE:20261026
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def dt(*args):
+    return datetime.datetime(*args)
+
+
+@pytest.fixture
+def weekly_file(tmp_path):
+    path = tmp_path / "schedule.json"
+    path.write_text(json.dumps({"events": [
+        {"title": "Algorithm class", "days": ["monday", "thursday"], "start": "09:00", "end": "09:50"},
+        {"title": "DSA Lab", "days": ["tuesday"], "start": "14:00", "end": "16:50"},
+        {"title": "Dentist", "start": "2026-10-21T15:00", "end": "2026-10-21T16:00"},
+    ]}))
+    return path
+
+
+def test_weekly_json_events(weekly_file):
+    calendar = Schedule(str(weekly_file), clock=lambda: NOW)
+    calendar.refresh()
+    assert [e.title for e in calendar.on(NOW.date())] == ["Algorithm class"]
+    assert calendar.on(datetime.date(2026, 10, 20)) == [Event(dt(2026, 10, 20, 14), dt(2026, 10, 20, 16, 50), "DSA Lab")]
+    assert [e.title for e in calendar.on(datetime.date(2026, 10, 21))] == ["Dentist"]
+    assert calendar.on(datetime.date(2026, 10, 25)) == []
+
+
+def test_next_event_and_free_busy(weekly_file):
+    calendar = Schedule(str(weekly_file), clock=lambda: NOW)
+    calendar.refresh()
+    assert calendar.next_event().start == dt(2026, 10, 20, 14)
+    assert [e.title for e in calendar.at(NOW)] == ["Algorithm class"]
+    assert calendar.at(dt(2026, 10, 19, 9, 50)) == []
+    assert calendar.at(dt(2026, 10, 20, 15)) != []
+
+
+def test_queries_beyond_the_horizon_grow_the_window(weekly_file):
+    calendar = Schedule(str(weekly_file), horizon_days=14, clock=lambda: NOW)
+    calendar.refresh()
+    far = datetime.date(2027, 6, 7)  # a Monday
+    assert [e.title for e in calendar.on(far)] == ["Algorithm class"]
+    past = datetime.date(2026, 1, 5)  # a Monday
+    assert [e.title for e in calendar.on(past)] == ["Algorithm class"]
+
+
+def test_ical_recurrence():
+    specs = dict((spec.title, spec) for _, spec in parse_ical(ICS))
+    assert set(specs) == {"Standup", "Quarterly review", "Trip"}
+
+    standups = expand(specs["Standup"], dt(2026, 10, 19), dt(2026, 10, 26))
+    assert [e.start.day for e in standups] == [19, 23]  # the 21st is excluded
+    assert standups[0].end == dt(2026, 10, 19, 10, 15)
+
+    reviews = expand(specs["Quarterly review"], dt(2026, 1, 1), dt(2028, 1, 1))
+    assert [e.start.date().isoformat() for e in reviews] == ["2026-10-01", "2027-01-01", "2027-04-01", "2027-07-01"]
+
+    trip = expand(specs["Trip"], dt(2026, 10, 25), dt(2026, 10, 26))
+    assert trip == [Event(dt(2026, 10, 24), dt(2026, 10, 26), "Trip")]
+
+
+def test_rrule_until_and_interval():
+    rule = parse_rrule("FREQ=DAILY;INTERVAL=2;UNTIL=20261025")
+    spec = schedule.EventSpec("Gym", dt(2026, 10, 19, 7), datetime.timedelta(hours=1), rule)
+    assert [e.start.day for e in expand(spec, dt(2026, 10, 1), dt(2026, 12, 1))] == [19, 21, 23, 25]
+
+
+def test_monthly_skips_short_months():
+    spec = schedule.EventSpec("Rent", dt(2026, 1, 31, 9), datetime.timedelta(), parse_rrule("FREQ=MONTHLY"))
+    months = [e.start.month for e in expand(spec, dt(2026, 1, 1), dt(2026, 8, 1))]
+    assert months == [1, 3, 5, 7]
+
+
+def test_interval_index_matches_a_scan():
+    import random
+    rng = random.Random(7)
+    base = dt(2026, 1, 1)
+    events = []
+    for i in range(2000):
+        start = base + datetime.timedelta(minutes=rng.randrange(0, 60 * 24 * 60))
+        events.append(Event(start, start + datetime.timedelta(minutes=rng.randrange(1, 600)), f"e{i}"))
+    index = IntervalIndex(events)
+    for _ in range(200):
+        start = base + datetime.timedelta(minutes=rng.randrange(0, 60 * 24 * 60))
+        end = start + datetime.timedelta(minutes=rng.randrange(1, 300))
+        expected = sorted(e for e in events if e.start < end and e.end > start)
+        assert index.overlapping(start, end) == expected
+
+
+def test_reload_only_reexpands_changed_events(weekly_file):
+    calendar = Schedule(str(weekly_file), clock=lambda: NOW)
+    calendar.refresh()
+    assert calendar.reexpanded == 3
+    calendar.refresh()
+    assert calendar.reloads == 1  # unchanged file is not parsed again
+
+    data = json.loads(weekly_file.read_text())
+    data["events"][2]["start"] = "2026-10-21T15:30"
+    weekly_file.write_text(json.dumps(data))
+    os.utime(weekly_file, (time.time() + 5, time.time() + 5))
+    assert calendar.stale()
+    calendar.refresh()
+    assert calendar.reloads == 2
+    assert calendar.reexpanded == 4
+    assert calendar.on(datetime.date(2026, 10, 21))[0].start == dt(2026, 10, 21, 15, 30)
+
+
+def test_large_calendar_queries_are_fast(tmp_path):
+    path = tmp_path / "big.json"
+    base = dt(2026, 10, 1)
+    path.write_text(json.dumps({"events": [
+        {"title": f"Meeting {i}", "start": (base + datetime.timedelta(hours=i)).isoformat(),
+         "end": (base + datetime.timedelta(hours=i, minutes=30)).isoformat()}
+        for i in range(5000)
+    ]}))
+    calendar = Schedule(str(path), clock=lambda: NOW)
+    calendar.refresh()
+    start = time.perf_counter()
+    for _ in range(1000):
+        calendar.at(NOW)
+        calendar.next_event()
+        calendar.on(NOW.date())
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+
+def test_parse_day_and_time():
+    today = NOW.date()
+    assert parse_day(None, today) == today
+    assert parse_day("tomorrow", today) == datetime.date(2026, 10, 20)
+    assert parse_day("Monday", today) == today
+    assert parse_day("sunday", today) == datetime.date(2026, 10, 25)
+    assert parse_day("2026-12-01", today) == datetime.date(2026, 12, 1)
+    assert parse_day("someday", today) is None
+    assert parse_time("3 PM") == datetime.time(15)
+    assert parse_time("3:30p.m.") == datetime.time(15, 30)
+    assert parse_time("12 am") == datetime.time(0)
+    assert parse_time("15:00") == datetime.time(15)
+    assert parse_time("noon") == datetime.time(12)
+    assert parse_time("25:00") is None
+
+
+def test_tools_use_the_schedule(weekly_file, monkeypatch):
+    monkeypatch.setattr(schedule, "_schedule", Schedule(str(weekly_file), clock=lambda: NOW))
+
+    result = asyncio.run(tools.get_schedule(None, "tuesday"))
+    assert result == "Your schedule for Tuesday: From 2:00 PM to 4:50 PM you have DSA Lab."
+    assert asyncio.run(tools.get_schedule(None, "sunday")) == "You have nothing scheduled for Sunday, Boss."
+    assert "don't have schedule information" in asyncio.run(tools.get_schedule(None, "someday"))
+
+    result = asyncio.run(tools.get_next_event(None))
+    assert result.startswith("You're in Algorithm class until 9:50 AM.")
+    assert "DSA Lab, Tuesday from 2:00 PM" in result
+
+    assert asyncio.run(tools.check_availability(None, "3 PM", "tuesday")).startswith("At 3:00 PM on Tuesday you have DSA Lab")
+    assert asyncio.run(tools.check_availability(None, "3 PM")) == "You're free at 3:00 PM on Monday, Boss."
+
+
+def test_shipped_schedule_loads():
+    calendar = Schedule(clock=lambda: NOW)
+    calendar.refresh()
+    assert [e.title for e in calendar.on(NOW.date())] == ["Algorithm class", "DSA class"]
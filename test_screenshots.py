@@ -0,0 +1,79 @@
+"""
+Tests for the screenshot pipeline, using a synthetic frame instead of the display.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from screenshots import ScreenshotPipeline, encode_options
+
+
+def synthetic_frame(width=1920, height=1080):
+    return Image.radial_gradient("L").resize((width, height)).convert("RGB")
+
+
+class SlowFrame:
+    """Wraps a frame so encoding takes a noticeable time."""
+
+    def __init__(self, image):
+        self.image = image
+        self.width, self.height, self.mode = image.width, image.height, image.mode
+
+    def save(self, fp, **options):
+        time.sleep(0.3)
+        self.image.save(fp, **options)
+
+
+@pytest.mark.parametrize("fmt,pil_format", [("png", "PNG"), ("webp", "WEBP"), ("jpeg", "JPEG")])
+def test_formats_written_to_disk(tmp_path, fmt, pil_format):
+    pipeline = ScreenshotPipeline(capture_fn=synthetic_frame, directory=str(tmp_path), fmt=fmt)
+
+    async def run():
+        filepath, _ = await pipeline.capture("shot")
+        await pipeline.close()
+        return filepath
+
+    filepath = asyncio.run(run())
+    assert filepath.endswith({"png": ".png", "webp": ".webp", "jpeg": ".jpg"}[fmt])
+    with Image.open(filepath) as saved:
+        assert saved.format == pil_format
+        assert saved.size == (1920, 1080)
+    assert not os.path.exists(filepath + ".part")
+    assert pipeline.stats() == {"saved": 1, "failed": 0, "pending": 0}
+
+
+def test_downscale_keeps_aspect_ratio(tmp_path):
+    pipeline = ScreenshotPipeline(capture_fn=synthetic_frame, directory=str(tmp_path), max_width=960)
+
+    async def run():
+        _, future = await pipeline.capture("small")
+        return await asyncio.wrap_future(future)
+
+    with Image.open(asyncio.run(run())) as saved:
+        assert saved.size == (960, 540)
+
+
+def test_capture_returns_before_encoding_finishes(tmp_path):
+    frame = SlowFrame(synthetic_frame())
+    pipeline = ScreenshotPipeline(capture_fn=lambda: frame, directory=str(tmp_path))
+
+    async def run():
+        start = time.perf_counter()
+        filepath, future = await pipeline.capture("later")
+        returned_after = time.perf_counter() - start
+        written_early = os.path.exists(filepath)
+        await pipeline.flush()
+        return returned_after, written_early, os.path.exists(filepath)
+
+    returned_after, written_early, written_late = asyncio.run(run())
+    assert returned_after < 0.2
+    assert not written_early
+    assert written_late
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError):
+        encode_options("bmp")
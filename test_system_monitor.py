@@ -0,0 +1,75 @@
+"""
+Tests for the background system metrics sampler.
+Uses a fake reader, so results don't depend on the host machine.
+"""
+import asyncio
+import time
+
+from system_monitor import MetricsSampler, Sample, _read_system
+
+
+def fake_reader(cpu_values):
+    calls = []
+
+    def read(with_processes):
+        calls.append(with_processes)
+        cpu = cpu_values[min(len(calls) - 1, len(cpu_values) - 1)]
+        top = (("python", cpu, 1.0),) if with_processes else ()
+        return Sample(time.monotonic(), cpu, 50.0, 70.0, None, None, top)
+
+    return read, calls
+
+
+def test_latest_and_average():
+    read, calls = fake_reader([10.0, 20.0, 30.0, 40.0])
+    sampler = MetricsSampler(interval=0.01, history=10, process_every=2, read_fn=read)
+
+    async def run():
+        await sampler.wait_ready()
+        while len(sampler._samples) < 4:
+            await asyncio.sleep(0.001)
+        await sampler.stop()
+
+    asyncio.run(run())
+    assert sampler.latest().cpu_percent == 40.0
+    assert sampler.average("cpu_percent", 60) == 25.0
+    # Per-process readings only on every second sample
+    assert calls[:4] == [True, False, True, False]
+    assert sampler.top_processes() == (("python", 30.0, 1.0),)
+
+
+def test_ring_buffer_is_bounded():
+    read, calls = fake_reader([1.0])
+    sampler = MetricsSampler(interval=0.001, history=3, read_fn=read)
+
+    async def run():
+        sampler.start()
+        while len(calls) < 10:
+            await asyncio.sleep(0.005)
+        await sampler.stop()
+
+    asyncio.run(run())
+    assert len(sampler._samples) == 3
+
+
+def test_reading_latest_does_not_block():
+    read, _ = fake_reader([5.0])
+    sampler = MetricsSampler(interval=0.01, read_fn=read)
+
+    async def run():
+        await sampler.wait_ready()
+        start = time.perf_counter()
+        for _ in range(1000):
+            sampler.latest()
+        elapsed = time.perf_counter() - start
+        await sampler.stop()
+        return elapsed
+
+    assert asyncio.run(run()) < 0.01
+
+
+def test_real_reader_returns_sane_values():
+    sample = _read_system(with_processes=True)
+    assert 0.0 <= sample.cpu_percent <= 100.0
+    assert 0.0 < sample.memory_percent <= 100.0
+    assert len(sample.top_processes) > 0
@@ -0,0 +1,183 @@
+"""
+Tests for the tool latency instrumentation.
+"""
+import asyncio
+import json
+import time
+
+import aiohttp
+
+import tool_metrics
+from tool_metrics import Histogram, MetricsServer, instrumented_tool
+
+
+@instrumented_tool()
+async def metrics_probe(mode: str, detail: str = None) -> str:
+    """
+    Test tool.
+
+    Args:
+        mode: What to do
+        detail: Ignored
+    """
+    if mode == "block":
+        time.sleep(0.05)
+    elif mode == "wait":
+        await asyncio.sleep(0.05)
+    elif mode == "raise":
+        raise RuntimeError("boom")
+    elif mode == "fail":
+        return "Could not do it."
+    return "Done, Boss."
+
+
+def test_histogram_percentiles_within_precision():
+    hist = Histogram()
+    for value in range(1, 10001):
+        hist.record(value)
+    assert hist.count == 10000
+    assert hist.max == 10000
+    for pct in (50, 90, 99):
+        expected = 10000 * pct / 100
+        assert abs(hist.percentile(pct) - expected) / expected < 1 / 32
+    assert hist.count_at_or_below(63) == 63
+
+
+def test_tool_schema_is_preserved():
+    assert metrics_probe.info.name == "metrics_probe"
+    assert metrics_probe.info.description.startswith("Test tool.")
+
+
+def test_blocking_time_is_separated_from_waiting():
+    tool_metrics.reset()
+
+    async def run():
+        await metrics_probe("block")
+        await metrics_probe("wait", detail="x")
+
+    asyncio.run(run())
+    stats = tool_metrics.get_stats("metrics_probe")
+    assert stats.wall.count == 2
+    # One call blocked the loop for ~50 ms, the other only awaited
+    assert stats.blocking.max >= 45_000
+    assert stats.blocking.percentile(50) < 5_000
+    assert stats.wall.percentile(50) >= 45_000
+    assert stats.arguments.max == 2
+
+
+def test_outcomes_are_classified():
+    tool_metrics.reset()
+
+    async def run():
+        await metrics_probe("ok")
+        await metrics_probe("fail")
+        try:
+            await metrics_probe("raise")
+        except RuntimeError:
+            pass
+
+    asyncio.run(run())
+    assert tool_metrics.get_stats("metrics_probe").outcomes == {"ok": 1, "error": 1, "exception": 1}
+
+
+def test_endpoint_serves_prometheus_and_json():
+    tool_metrics.reset()
+
+    async def run():
+        await metrics_probe("ok")
+        server = MetricsServer(port=0)
+        port = await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    text = await response.text()
+                async with session.get(f"http://127.0.0.1:{port}/metrics.json") as response:
+                    data = json.loads(await response.text())
+        finally:
+            await server.stop()
+        return text, data
+
+    text, data = asyncio.run(run())
+    assert 'nevira_tool_calls_total{tool="metrics_probe",outcome="ok"} 1' in text
+    assert 'nevira_tool_duration_seconds_bucket{tool="metrics_probe",le="+Inf"} 1' in text
+    assert "# TYPE nevira_tool_loop_blocking_seconds histogram" in text
+    assert data["tools"]["metrics_probe"]["calls"] == 1
+
+
+def test_search_cache_and_weather_metrics_are_exported(monkeypatch):
+    import tools
+    import weather
+
+    tools.SEARCH_CACHE.set("python", ([], "complete"))
+    monkeypatch.setattr(weather, "_service", None)
+    monkeypatch.setattr(weather, "build_provider", weather.LocalProvider)
+    store = weather.ForecastStore
+    monkeypatch.setattr(weather, "ForecastStore", lambda: store(":memory:"))
+    weather.get_service()
+    text = tool_metrics.render_prometheus()
+    assert 'nevira_cache_entries{cache="search"}' in text
+    assert 'nevira_search_workers ' in text
+    assert 'nevira_weather_reports_total{source="provider"} 0' in text
+    data = json.loads(tool_metrics.render_json())
+    assert {"caches", "search_pool", "weather"} <= set(data)
+    assert data["caches"]["search"]["size"] >= 1
+    asyncio.run(weather.close())
+
+
+def job_snapshot(pid, calls, at=None):
+    """A snapshot as a job process with `calls` ok calls of metrics_probe would write it."""
+    tool_metrics.reset()
+    stats = tool_metrics.get_stats("metrics_probe")
+    for _ in range(calls):
+        stats.wall.record(1000)
+    stats.outcomes["ok"] = calls
+    snapshot = tool_metrics.local_snapshot()
+    tool_metrics.reset()
+    return dict(snapshot, pid=pid, at=at if at is not None else time.time())
+
+
+def test_worker_serves_every_job_process(tmp_path):
+    for pid, calls in ((101, 2), (102, 3)):
+        (tmp_path / f"{pid}.json").write_text(json.dumps(job_snapshot(pid, calls)))
+    # A process that exited long ago is dropped (and its file removed)
+    (tmp_path / "103.json").write_text(json.dumps(job_snapshot(103, 1, at=time.time() - 7200)))
+
+    async def run():
+        server = MetricsServer(port=0, state_dir=str(tmp_path))
+        port = await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    text = await response.text()
+                async with session.get(f"http://127.0.0.1:{port}/metrics.json") as response:
+                    data = json.loads(await response.text())
+        finally:
+            await server.stop()
+        return text, data
+
+    text, data = asyncio.run(run())
+    assert 'nevira_tool_calls_total{pid="101",tool="metrics_probe",outcome="ok"} 2' in text
+    assert 'nevira_tool_calls_total{pid="102",tool="metrics_probe",outcome="ok"} 3' in text
+    assert 'nevira_tool_duration_seconds_count{pid="102",tool="metrics_probe"} 3' in text
+    assert 'pid="103"' not in text and not (tmp_path / "103.json").exists()
+    # Each family is declared once, with all its samples under it
+    assert text.count("# TYPE nevira_tool_calls_total counter") == 1
+    calls = text.index("# TYPE nevira_tool_calls_total")
+    assert calls < text.index('{pid="101",tool') < text.index('{pid="102",tool') < text.index("# HELP nevira_tool_duration")
+    assert {"101", "102"} <= set(data["processes"])
+    assert data["processes"]["102"]["tools"]["metrics_probe"]["calls"] == 3
+
+
+def test_job_metrics_outlive_the_job(tmp_path):
+    tool_metrics.reset()
+
+    async def run():
+        writer = tool_metrics.SnapshotWriter(str(tmp_path), interval=60)
+        writer.start()
+        await metrics_probe("ok")
+        await writer.close()
+
+    asyncio.run(run())
+    snapshots = tool_metrics.read_snapshots(str(tmp_path))
+    assert len(snapshots) == 1
+    assert 'outcome="ok"} 1' in snapshots[0]["prometheus"]
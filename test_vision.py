@@ -0,0 +1,88 @@
+"""
+Tests for the screen-share frame sampler, using synthetic frames.
+"""
+import asyncio
+
+from PIL import Image, ImageDraw
+
+from vision import ByteBudget, FrameSampler, difference_hash
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def desktop(label: str, width=1920, height=1080):
+    frame = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(frame)
+    # A window whose position depends on the label, like a moved or new window
+    x = (sum(map(ord, label)) * 37) % (width - 800)
+    draw.rectangle((x, 200, x + 800, 800), fill=(240, 240, 240))
+    draw.text((x + 20, 220), label, fill=(0, 0, 0))
+    return frame
+
+
+def test_hash_ignores_tiny_changes_and_sees_big_ones():
+    base = desktop("editor")
+    noisy = base.copy()
+    noisy.putpixel((5, 5), (255, 0, 0))
+    assert bin(difference_hash(base) ^ difference_hash(noisy)).count("1") < 6
+    assert bin(difference_hash(base) ^ difference_hash(desktop("browser window"))).count("1") >= 6
+
+
+def test_unchanged_frames_are_skipped_and_sent_frames_downsized():
+    clock = FakeClock()
+    sampler = FrameSampler(max_width=640, max_bitrate=10_000_000, refresh_seconds=0, clock=clock)
+    frames = []
+    for label in ("editor", "editor", "editor", "browser window"):
+        clock.now += 1
+        frames.append(sampler.sample(desktop(label)))
+    assert [f is not None for f in frames] == [True, False, False, True]
+    assert (frames[0].width, frames[0].height) == (640, 360)
+    assert sampler.stats()["unchanged"] == 2
+
+
+def test_unchanged_screen_is_refreshed_periodically():
+    clock = FakeClock()
+    sampler = FrameSampler(max_bitrate=10_000_000, refresh_seconds=30, clock=clock)
+    assert sampler.sample(desktop("editor")) is not None
+    clock.now = 10
+    assert sampler.sample(desktop("editor")) is None
+    clock.now = 31
+    assert sampler.sample(desktop("editor")) is not None
+
+
+def test_byte_budget_holds_average_rate():
+    clock = FakeClock()
+    budget = ByteBudget(80_000, clock)  # 10 kB/s
+    assert budget.allow(30_000)  # a big frame goes through on a positive balance...
+    clock.now = 1
+    assert not budget.allow(1_000)  # ...and holds off the next ones
+    clock.now = 3.1
+    assert budget.allow(1_000)
+
+
+def test_run_loop_delivers_to_sinks():
+    labels = iter(["editor", "browser window", "browser window", "terminal"] + ["terminal"] * 50)
+    received = []
+    sampler = FrameSampler(
+        capture_fn=lambda: desktop(next(labels)),
+        max_width=640,
+        sinks=[received.append],
+        fps=50,
+        max_bitrate=10_000_000,
+        refresh_seconds=0,
+    )
+
+    async def run():
+        sampler.start()
+        await asyncio.sleep(0.3)
+        await sampler.stop()
+
+    asyncio.run(run())
+    assert len(received) == 3
+    assert sampler.captured > len(received)
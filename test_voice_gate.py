@@ -0,0 +1,91 @@
+"""
+Tests for the voice gate in front of the realtime model.
+"""
+import asyncio
+
+import numpy as np
+from livekit import rtc
+
+import voice_gate
+from bench_voice_gate import ReplayInput, pair, replay, synthesize, to_frames
+
+
+def frame(level: int, ms: int = 10, rate: int = 16000, channels: int = 1) -> rtc.AudioFrame:
+    samples = rate * ms // 1000
+    return rtc.AudioFrame(np.full(samples * channels, level, dtype=np.int16).tobytes(), rate, channels, samples)
+
+
+def test_silence_is_dropped_except_the_padding():
+    gate = voice_gate.SilenceGate(padding_ms=50, hangover_ms=30, tail_ms=100)
+    quiet = [frame(0) for _ in range(100)]
+    assert all(gate.push(f, speech=False) == [] for f in quiet)
+    released = gate.push(frame(5000), speech=True)
+    # Five frames of padding, then the speech itself
+    assert len(released) == 6 and released[:5] == quiet[-5:]
+    assert gate.frames_dropped == 95
+
+
+def test_hangover_then_a_burst_of_silence_closes_the_turn():
+    gate = voice_gate.SilenceGate(padding_ms=0, hangover_ms=30, tail_ms=100)
+    gate.push(frame(5000), speech=True)
+    assert len(gate.push(frame(10), speech=False)) == 1
+    assert len(gate.push(frame(10), speech=False)) == 1
+    closing = gate.push(frame(10), speech=False)
+    assert len(closing) == 11 and not gate.speaking
+    assert all(not any(np.frombuffer(f.data, dtype=np.int16)) for f in closing[1:])
+    assert gate.push(frame(10), speech=False) == []
+    stats = gate.stats()
+    assert stats["tail_frames"] == 10 and stats["frames_sent"] == 14
+
+
+def test_short_pause_inside_speech_is_kept():
+    gate = voice_gate.SilenceGate(padding_ms=0, hangover_ms=100, tail_ms=100)
+    sent = []
+    for speech in [True] * 5 + [False] * 5 + [True] * 5:
+        sent += gate.push(frame(5000 if speech else 10), speech)
+    assert len(sent) == 15 and gate.tail_frames == 0
+
+
+def test_activity_resamples_other_rates_and_channels():
+    async def run():
+        activity = voice_gate.VoiceActivity(voice_gate.EnergyDetector())
+        quiet = [await activity.update(frame(0, rate=48000, channels=2)) for _ in range(10)]
+        loud = [await activity.update(frame(3000, rate=48000, channels=2)) for _ in range(10)]
+        activity.close()
+        return quiet, loud
+
+    quiet, loud = asyncio.run(run())
+    assert not any(quiet) and loud[-1]
+
+
+def test_gated_input_yields_only_speech_and_ends():
+    async def run():
+        frames = [frame(0)] * 50 + [frame(3000)] * 50 + [frame(0)] * 200
+        gated = voice_gate.GatedAudioInput(
+            ReplayInput(frames), voice_gate.VoiceActivity(voice_gate.EnergyDetector()),
+            voice_gate.SilenceGate(padding_ms=100, hangover_ms=100, tail_ms=200))
+        out = [f async for f in gated]
+        gated.close()
+        return out, gated.gate.stats()
+
+    out, stats = asyncio.run(run())
+    assert stats["frames_in"] == 300
+    assert len(out) == stats["frames_sent"] < 150
+    assert stats["saved_percent"] > 50
+
+
+def test_synthetic_conversation_saves_bandwidth_and_ends_turns_sooner():
+    frames = to_frames(synthesize(seconds=60))
+
+    plain, _, _ = asyncio.run(replay(frames, False, voice_gate.EnergyDetector(), 0.8, 200))
+    gated, stats, _ = asyncio.run(replay(frames, True, voice_gate.EnergyDetector(), 0.8, 200))
+    gains = pair(plain, gated)
+    assert len(gated) == len(plain) == len(gains) > 0
+    assert all(gain > 0.3 for gain in gains)
+    assert stats["saved_percent"] > 30
+
+
+def test_silero_hears_no_speech_in_noise():
+    detector = voice_gate.SileroDetector()
+    noise = np.random.default_rng(0).normal(0, 200, 512 * 20).astype(np.int16)
+    assert max(detector.probability(noise[i:i + 512]) for i in range(0, len(noise), 512)) < 0.5
@@ -0,0 +1,175 @@
+"""
+Tests for wake-word gated activation, using the tone stand-in for the wake
+word and synthesized audio from the benchmark.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+import wake
+from bench_wake import run_listener, score, synthesize
+
+
+def frames(audio, size=wake.FRAME_LENGTH):
+    return [audio[i:i + size] for i in range(0, len(audio) - size + 1, size)]
+
+
+def test_gate_stays_closed_in_a_quiet_room():
+    gate = wake.EnergyGate()
+    quiet = np.random.default_rng(0).normal(0, 40, 10 * wake.SAMPLE_RATE).astype(np.int16)
+    assert sum(len(gate.push(frame)) for frame in frames(quiet)) == 0
+
+
+def test_gate_releases_the_frames_before_speech():
+    gate = wake.EnergyGate(preroll=5, hangover=2)
+    quiet = np.full(wake.FRAME_LENGTH, 20, dtype=np.int16)
+    loud = np.full(wake.FRAME_LENGTH, 4000, dtype=np.int16)
+    for _ in range(20):
+        assert gate.push(quiet) == []
+    released = gate.push(loud)
+    assert len(released) == 6 and released[-1] is loud
+    assert len(gate.push(quiet)) == 1 and len(gate.push(quiet)) == 1
+    assert gate.push(quiet) == []
+
+
+def test_tone_is_detected_once_each_and_speech_is_not():
+    wake_at = (5.0, 17.0)
+    audio = synthesize(seconds=25, wake_at=wake_at)
+    listener, _, detections = run_listener(audio, wake.ToneDetector(), gated=True)
+    latencies, missed, false = score(detections, wake_at)
+    assert (missed, false) == (0, 0)
+    assert all(latency < 0.5 for latency in latencies)
+    # Most of a quiet room never reaches the detector
+    assert listener.detected_frames < 0.5 * listener.frames
+
+
+def test_listener_thread_calls_back_on_the_loop():
+    async def run():
+        loop = asyncio.get_running_loop()
+        heard = asyncio.Queue()
+        listener = wake.WakeListener(wake.ToneDetector(), lambda keyword: heard.put_nowait((keyword, asyncio.get_running_loop())),
+                                     wake.EnergyGate())
+        listener.start()
+        audio = synthesize(seconds=6, wake_at=(3.0,))
+        # Arbitrary chunk sizes, as the room stream delivers them (faster than real time)
+        for i in range(0, len(audio), 700):
+            listener.feed(audio[i:i + 700].tobytes())
+            await asyncio.sleep(0.002)
+        keyword, called_on = await asyncio.wait_for(heard.get(), 2)
+        await asyncio.to_thread(listener.stop)
+        return keyword, called_on is loop, listener.stats()
+
+    keyword, on_loop, stats = asyncio.run(run())
+    assert keyword == "tone" and on_loop
+    assert stats["detections"] == 1 and stats["dropped"] == 0
+
+
+def test_paused_listener_ignores_the_wake_word():
+    listener = wake.WakeListener(wake.ToneDetector(), on_wake=lambda keyword: None)
+    listener.paused = True
+    audio = synthesize(seconds=6, wake_at=(3.0,))
+    assert all(listener.process(frame) is None for frame in frames(audio))
+    assert listener.detected_frames == 0
+
+
+class FakeSessions:
+    def __init__(self, connect=0.0):
+        self.connect = connect
+        self.started = 0
+        self.stopped = 0
+
+    async def start(self):
+        await asyncio.sleep(self.connect)
+        self.started += 1
+        return f"session-{self.started}"
+
+    async def stop(self, session):
+        await asyncio.sleep(0.01)
+        self.stopped += 1
+
+
+def test_controller_starts_once_and_stops_when_idle():
+    async def run():
+        sessions = FakeSessions(connect=0.02)
+        listener = wake.WakeListener(wake.ToneDetector(), on_wake=lambda keyword: None)
+        controller = wake.ActivationController(sessions.start, sessions.stop, idle_timeout=0.15)
+        controller.listeners.append(listener)
+        controller.trigger("tone")
+        controller.trigger("hotkey")
+        assert listener.paused
+        await asyncio.sleep(0.05)
+        assert controller.state == "active" and sessions.started == 1
+        # Activity keeps it up past the timeout
+        for _ in range(4):
+            await asyncio.sleep(0.05)
+            controller.touch()
+        assert controller.state == "active"
+        await asyncio.sleep(0.3)
+        return controller, sessions, listener
+
+    controller, sessions, listener = asyncio.run(run())
+    assert controller.state == "idle" and sessions.stopped == 1
+    assert not listener.paused
+    assert controller.stats()["activations"] == 1
+
+
+def test_trigger_while_stopping_starts_again():
+    async def run():
+        sessions = FakeSessions()
+        controller = wake.ActivationController(sessions.start, sessions.stop, idle_timeout=0.05)
+        controller.trigger("tone")
+        while controller.state != "stopping":
+            await asyncio.sleep(0.001)
+        controller.trigger("tone")
+        await asyncio.sleep(0.03)
+        state = controller.state
+        await controller.close()
+        return state, sessions
+
+    state, sessions = asyncio.run(run())
+    assert state == "active" and sessions.started == 2
+
+
+def test_failed_start_goes_back_to_listening():
+    async def run():
+        async def broken():
+            raise ConnectionError("no network")
+
+        controller = wake.ActivationController(broken, FakeSessions().stop, idle_timeout=1)
+        controller.trigger("tone")
+        await asyncio.sleep(0.01)
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.state == "idle" and controller.activations == 0
+
+
+def test_activation_waits_only_for_the_connect():
+    async def run():
+        sessions = FakeSessions(connect=0.1)
+        controller = wake.ActivationController(sessions.start, sessions.stop, idle_timeout=1)
+        start = time.perf_counter()
+        controller.trigger("tone")
+        while controller.state != "active":
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        await controller.close()
+        return elapsed
+
+    assert asyncio.run(run()) < 0.15
+
+
+def test_session_closing_itself_goes_back_to_listening():
+    async def run():
+        sessions = FakeSessions()
+        controller = wake.ActivationController(sessions.start, sessions.stop, idle_timeout=60)
+        controller.trigger("tone")
+        while controller.state != "active":
+            await asyncio.sleep(0.001)
+        controller.end()
+        await asyncio.sleep(0.05)
+        return controller.state, sessions
+
+    state, sessions = asyncio.run(run())
+    assert state == "idle" and sessions.stopped == 1
@@ -0,0 +1,134 @@
+"""
+Tests for the weather service and its forecast store.
+Uses the local stand-in provider, so no network access is needed.
+"""
+import asyncio
+
+import pytest
+
+import tools
+import weather
+from weather import ForecastStore, LocalProvider, Report, WeatherService, describe
+
+
+class FakeClock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FailingProvider:
+    name = "flaky"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch(self, city):
+        self.calls += 1
+        raise OSError("network unreachable")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ForecastStore(str(tmp_path / "weather.sqlite3"))
+    yield store
+
+
+def test_fresh_reports_come_from_the_store(store):
+    clock = FakeClock()
+    provider = LocalProvider({"London": "London: ⛅️ +12°C"})
+    service = WeatherService(provider, store, max_age=600, clock=clock)
+
+    first = asyncio.run(service.lookup("london"))
+    assert first.text == "London: ⛅️ +12°C" and not first.stored
+    clock.now += 300
+    second = asyncio.run(service.lookup("London "))
+    assert second.stored and second.fetched_at == first.fetched_at
+    assert provider.calls == 1
+
+    clock.now += 400
+    asyncio.run(service.lookup("London"))
+    assert provider.calls == 2
+
+
+def test_store_survives_restart(tmp_path):
+    path = str(tmp_path / "weather.sqlite3")
+    clock = FakeClock()
+    service = WeatherService(LocalProvider({"Paris": "Paris: ☀️ +20°C"}), ForecastStore(path), clock=clock)
+    asyncio.run(service.lookup("Paris"))
+    asyncio.run(service.close())
+
+    offline = WeatherService(FailingProvider(), ForecastStore(path), clock=clock)
+    report = asyncio.run(offline.lookup("paris"))
+    assert report.text == "Paris: ☀️ +20°C" and report.stored
+
+
+def test_stale_report_used_when_provider_fails(store):
+    clock = FakeClock()
+    store.put(Report("Tokyo", "Tokyo: 🌧 +18°C", "wttr.in", clock.now - 7200))
+    provider = FailingProvider()
+    service = WeatherService(provider, store, max_age=1800, max_stale=3 * 3600, clock=clock)
+
+    report = asyncio.run(service.lookup("Tokyo"))
+    assert provider.calls == 1
+    assert report.stored and report.source == "wttr.in"
+    assert service.stats()["stale_fallbacks"] == 1
+
+    clock.now += 2 * 3600
+    assert asyncio.run(service.lookup("Tokyo")) is None
+
+
+def test_slow_provider_times_out(store):
+    service = WeatherService(LocalProvider({"Oslo": "Oslo: ❄️ -3°C"}, delay=1.0), store, timeout=0.05)
+    assert asyncio.run(service.lookup("Oslo")) is None
+    assert service.stats()["failures"] == 1
+
+
+def test_reports_are_keyed_by_hour(store):
+    clock = FakeClock(3600 * 500_000)
+    store.put(Report("Rome", "old", "local", clock.now - 3600))
+    store.put(Report("Rome", "new", "local", clock.now))
+    store.put(Report("Rome", "newer", "local", clock.now + 60))
+    assert store.latest("rome").text == "newer"
+    assert store.prune(clock.now) == 1
+
+
+def test_refresher_prefetches_frequent_cities(store):
+    clock = FakeClock()
+    provider = LocalProvider({"Berlin": "Berlin: +9°C", "Madrid": "Madrid: +25°C", "Lima": "Lima: +19°C"})
+    service = WeatherService(provider, store, max_age=1800, clock=clock)
+
+    async def run():
+        for city in ["Berlin"] * 3 + ["Madrid"] * 2 + ["Lima"]:
+            await service.lookup(city)
+        calls = provider.calls
+        # Nothing is due yet
+        assert await service.refresh_frequent(limit=2) == 0
+        clock.now += 1200
+        assert await service.refresh_frequent(limit=2) == 2
+        return provider.calls - calls
+
+    assert asyncio.run(run()) == 2
+    assert store.frequent(2, 0) == ["Berlin", "Madrid"]
+    assert store.latest("berlin").fetched_at == clock.now
+
+
+def test_describe_names_source_and_age():
+    now = 1_800_000_000.0
+    assert describe(Report("X", "X: +1°C", "wttr.in", now), now) == "X: +1°C (live from wttr.in, just now)"
+    stored = Report("X", "X: +1°C", "wttr.in", now - 125, stored=True)
+    assert describe(stored, now) == "X: +1°C (saved wttr.in report, 2 minutes old)"
+    assert describe(stored._replace(fetched_at=now - 3 * 3600), now).endswith("3 hours old)")
+
+
+def test_get_weather_tool(monkeypatch, store):
+    service = WeatherService(LocalProvider({"Cairo": "Cairo: ☀️ +31°C"}), store)
+    monkeypatch.setattr(weather, "_service", service)
+    assert asyncio.run(tools.get_weather(None, "Cairo")) == "Cairo: ☀️ +31°C (live from local, just now)"
+    # Repeats are answered from the store, described as such, and each one counts toward prefetching
+    assert asyncio.run(tools.get_weather(None, "Cairo")).startswith("Cairo: ☀️ +31°C (saved local report")
+    assert service._asked["Cairo"] == 2
+    assert asyncio.run(tools.get_weather(None, "Atlantis")) == "Could not retrieve weather for Atlantis."
+    asyncio.run(weather.close())
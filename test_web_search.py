@@ -0,0 +1,178 @@
+"""
+Tests for the bounded search worker pool.
+Uses a fake blocking search function in place of DDGS.
+"""
+import asyncio
+import threading
+import time
+
+import web_search
+from web_search import SearchPool
+
+
+def fake_search(delays: dict):
+    """Blocking search stand-in: each backend sleeps, then returns two results."""
+    def search(query, backend, max_results, timeout):
+        time.sleep(delays[backend])
+        return [
+            {"title": f"{backend} {i}", "body": query, "href": f"https://{backend}.example/{i}"}
+            for i in range(2)
+        ]
+    return search
+
+
+def test_results_from_all_backends_are_merged():
+    pool = SearchPool(max_workers=3, backends=["a", "b", "c"], search_fn=fake_search({"a": 0, "b": 0, "c": 0}))
+    results, timed_out = asyncio.run(pool.search("python", max_results=5))
+    assert not timed_out
+    assert len(results) == 5
+    assert len({r["href"] for r in results}) == 5
+    assert pool.stats()["completed"] == 1
+
+
+def test_deadline_returns_partial_results():
+    pool = SearchPool(max_workers=2, backends=["fast", "slow"], search_fn=fake_search({"fast": 0.01, "slow": 1.0}))
+    start = time.perf_counter()
+    results, timed_out = asyncio.run(pool.search("python", max_results=5, deadline=0.2))
+    elapsed = time.perf_counter() - start
+    assert timed_out
+    assert [r["title"] for r in results] == ["fast 0", "fast 1"]
+    assert elapsed < 0.5
+    assert pool.timeouts == 1
+    pool.shutdown()
+
+
+def test_search_does_not_block_event_loop():
+    pool = SearchPool(max_workers=2, backends=["a"], search_fn=fake_search({"a": 0.3}))
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await pool.search("python")
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 15
+
+
+def test_cancellation_drops_queued_jobs():
+    release = threading.Event()
+    calls = []
+
+    def blocking_search(query, backend, max_results, timeout):
+        calls.append(backend)
+        release.wait(1)
+        return []
+
+    # One worker, three backends: two jobs sit in the queue behind the first
+    pool = SearchPool(max_workers=1, backends=["a", "b", "c"], search_fn=blocking_search)
+
+    async def run():
+        task = asyncio.create_task(pool.search("python", deadline=5))
+        await asyncio.sleep(0.05)
+        depth_before = pool.queue_depth
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return depth_before
+
+    depth_before = asyncio.run(run())
+    release.set()
+    pool.shutdown()
+    time.sleep(0.05)
+    assert depth_before == 2
+    assert pool.queue_depth == 0
+    assert pool.cancelled == 1
+    assert calls == ["a"]
+
+
+def test_stream_delivers_first_backend_before_the_rest():
+    pool = SearchPool(max_workers=3, backends=["fast", "medium", "slow"],
+                      search_fn=fake_search({"fast": 0.01, "medium": 0.1, "slow": 0.3}))
+
+    async def run():
+        stream = pool.stream("python", max_results=6)
+        first = await stream.first_batch()
+        first_at = stream.first_result_after
+        done_after_first = stream.done
+        await stream.drain()
+        return first, first_at, done_after_first, stream
+
+    first, first_at, done_after_first, stream = asyncio.run(run())
+    assert [r["title"] for r in first] == ["fast 0", "fast 1"]
+    assert first_at < 0.1
+    assert not done_after_first
+    assert stream.done and not stream.timed_out
+    assert len(stream.results) == 6
+    assert pool.stats()["first_result_p50_ms"] < 100
+
+
+def test_stream_waits_for_enough_results():
+    pool = SearchPool(max_workers=3, backends=["fast", "medium", "slow"],
+                      search_fn=fake_search({"fast": 0.01, "medium": 0.1, "slow": 0.5}))
+
+    async def run():
+        stream = pool.stream("python", max_results=6)
+        start = time.perf_counter()
+        early = await stream.at_least(3)
+        waited = time.perf_counter() - start
+        done_early = stream.done
+        await stream.drain()
+        return early, waited, done_early
+
+    early, waited, done_early = asyncio.run(run())
+    # The fast backend alone has 2: the medium one is waited for, the slow one is not
+    assert [r["title"] for r in early] == ["fast 0", "fast 1", "medium 0", "medium 1"]
+    assert 0.1 <= waited < 0.4
+    assert not done_early
+
+
+def test_pool_has_a_thread_per_backend_per_concurrent_search():
+    pool = SearchPool(backends=["a", "b", "c"], search_fn=fake_search({"a": 0, "b": 0, "c": 0}))
+    assert pool.max_workers == 3 * web_search.SEARCH_CONCURRENCY
+    pool.shutdown()
+    assert web_search.default_workers(["duckduckgo"], concurrency=4, configured=0) == 4
+    # SEARCH_WORKERS can raise the size, never shrink it below what the fan-out needs
+    assert web_search.default_workers(["a", "b"], concurrency=4, configured=2) == 8
+    assert web_search.default_workers(["a", "b"], concurrency=4, configured=12) == 12
+
+
+def test_empty_and_concurrent_searches(monkeypatch):
+    import tools
+    from cache import TTLCache
+
+    answers = [[], [{"title": "Python", "body": "", "href": "https://python.example"}]]
+    calls = []
+
+    def search(query, backend, max_results, timeout):
+        calls.append(query)
+        time.sleep(0.05)
+        return answers[min(len(calls), len(answers)) - 1]
+
+    pool = SearchPool(max_workers=2, backends=["a"], search_fn=search)
+    monkeypatch.setattr(tools, "SEARCH_POOL", pool)
+    monkeypatch.setattr(tools, "SEARCH_CACHE", TTLCache("test-search"))
+    monkeypatch.setattr(tools, "SEARCH_STREAMING", False)
+
+    async def run():
+        # An empty answer is not cached, so asking again searches again
+        empty = await tools.search_web(None, "python")
+        # Two identical questions at once share one search
+        found = await asyncio.gather(tools.search_web(None, "python"), tools.search_web(None, "Python "))
+        return empty, found
+
+    empty, found = asyncio.run(run())
+    pool.shutdown()
+    assert empty.startswith("No search results")
+    assert all("1. Python" in result for result in found)
+    assert len(calls) == 2
+    assert tools.SEARCH_CACHE.coalesced == 1
@@ -0,0 +1,501 @@
+"""
+Latency instrumentation for the function tools.
+
+instrumented_tool() is a drop-in replacement for @function_tool() that
+records, for every call, the wall time, the time the tool's own code spent
+running on the event loop (i.e. blocking every other coroutine), the
+outcome and the number of arguments passed. Timings go into HDR-style
+log-linear histograms kept in memory; MetricsServer exports them as
+Prometheus text on /metrics and as JSON on /metrics.json.
+
+Tools run in the job processes, but only one process can own the port.
+Each job process therefore writes a snapshot of its metrics to
+METRICS_STATE_DIR every few seconds (and once more when it closes), and
+the worker process serves them all from one endpoint, each series labelled
+with the pid of the process it came from. Snapshots of processes that have
+exited stay on the endpoint for METRICS_RETENTION_SECONDS.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from aiohttp import web
+from livekit.agents import RunContext, function_tool
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Set to 0 to disable the endpoint
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+METRICS_STATE_DIR = os.getenv("METRICS_STATE_DIR", os.path.join(tempfile.gettempdir(), "nevira-metrics"))
+METRICS_SNAPSHOT_SECONDS = float(os.getenv("METRICS_SNAPSHOT_SECONDS", "5"))
+METRICS_RETENTION_SECONDS = float(os.getenv("METRICS_RETENTION_SECONDS", "3600"))
+
+# Tools report most failures as a returned sentence rather than an exception
+ERROR_PREFIXES = ("Could not", "An error occurred", "Email sending failed")
+
+# Prometheus bucket boundaries derived from the histograms, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARGUMENT_BUCKETS = (0, 1, 2, 3, 5, 8)
+
+
+class Histogram:
+    """
+    Log-linear histogram over non-negative integers (HdrHistogram layout).
+
+    Each power-of-two range is split into 2**sub_bucket_bits linear
+    buckets, so every recorded value is kept to within 1/2**sub_bucket_bits
+    relative error in constant memory, whatever its magnitude.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 5) -> None:
+        self._sub_bits = sub_bucket_bits
+        self._sub_count = 1 << sub_bucket_bits
+        self._counts: dict = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < 2 * self._sub_count:
+            return value
+        shift = value.bit_length() - self._sub_bits - 1
+        return self._sub_count * shift + (value >> shift)
+
+    def _upper_bound(self, index: int) -> int:
+        if index < 2 * self._sub_count:
+            return index
+        shift = index // self._sub_count - 1
+        top = index - self._sub_count * shift
+        return ((top + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        value = max(0, int(value))
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct: float) -> int:
+        """Smallest bucket bound with at least pct% of recorded values at or below it."""
+        if not self.count:
+            return 0
+        threshold = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= threshold:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def count_at_or_below(self, value: int) -> int:
+        return sum(n for index, n in self._counts.items() if self._upper_bound(index) <= value)
+
+
+class ToolStats:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # Microseconds
+        self.wall = Histogram()
+        self.blocking = Histogram()
+        self.arguments = Histogram()
+        self.outcomes = {"ok": 0, "error": 0, "exception": 0}
+
+    def to_dict(self) -> dict:
+        def summary(hist: Histogram) -> dict:
+            return {
+                "count": hist.count,
+                "mean_ms": round(hist.total / hist.count / 1000, 3) if hist.count else 0.0,
+                "p50_ms": hist.percentile(50) / 1000,
+                "p90_ms": hist.percentile(90) / 1000,
+                "p99_ms": hist.percentile(99) / 1000,
+                "max_ms": hist.max / 1000,
+            }
+
+        return {
+            "calls": self.wall.count,
+            "outcomes": dict(self.outcomes),
+            "wall": summary(self.wall),
+            "loop_blocking": summary(self.blocking),
+            "arguments_max": self.arguments.max,
+            "arguments_mean": round(self.arguments.total / self.arguments.count, 2) if self.arguments.count else 0.0,
+        }
+
+
+_stats: dict = {}
+# Name of the tool whose code is executing on the event loop right now
+_running_tool: Optional[str] = None
+# Extra metric sources: name -> (snapshot fn, prometheus lines fn)
+_collectors: dict = {}
+# Calls currently running, per tool
+_in_flight: Counter = Counter()
+
+
+def get_stats(name: str) -> ToolStats:
+    if name not in _stats:
+        _stats[name] = ToolStats(name)
+    return _stats[name]
+
+
+def in_flight() -> dict:
+    """Tool name -> calls currently running."""
+    return {name: count for name, count in _in_flight.items() if count}
+
+
+def running_tool() -> Optional[str]:
+    """
+    The tool currently holding the event loop, if any. Safe to read from
+    another thread, which is how the loop watchdog attributes stalls.
+    """
+    return _running_tool
+
+
+def register_collector(name: str, snapshot_fn: Callable[[], dict], prometheus_fn: Callable[[], list]) -> None:
+    """Export another component's metrics on the same endpoint."""
+    _collectors[name] = (snapshot_fn, prometheus_fn)
+
+
+def reset() -> None:
+    """Drop everything recorded so far."""
+    _stats.clear()
+
+
+class _TimedCoroutine:
+    """
+    Drive a coroutine step by step and add up the time each step runs.
+
+    Time spent suspended (awaiting I/O, a thread, a sleep) is not counted,
+    so `busy` is exactly how long the coroutine held the event loop.
+    """
+
+    def __init__(self, coro, name: str) -> None:
+        self._coro = coro
+        self._name = name
+        self.busy = 0.0
+
+    def __await__(self):
+        global _running_tool
+        coro = self._coro
+        send_value, error = None, None
+        while True:
+            start = time.perf_counter()
+            outer, _running_tool = _running_tool, self._name
+            try:
+                if error is not None:
+                    yielded = coro.throw(error)
+                else:
+                    yielded = coro.send(send_value)
+            except StopIteration as stop:
+                self.busy += time.perf_counter() - start
+                return stop.value
+            except BaseException:
+                self.busy += time.perf_counter() - start
+                raise
+            finally:
+                _running_tool = outer
+            self.busy += time.perf_counter() - start
+            send_value, error = None, None
+            try:
+                send_value = yield yielded
+            except BaseException as e:
+                error = e
+
+
+def _count_arguments(args: tuple, kwargs: dict) -> int:
+    """Arguments the model actually supplied (the RunContext and Nones don't count)."""
+    return sum(1 for value in kwargs.values() if value is not None) + sum(
+        1 for value in args if value is not None and not isinstance(value, RunContext)
+    )
+
+
+def instrument(func):
+    """Wrap an async tool function so every call is recorded under its name."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        stats = get_stats(name)
+        stats.arguments.record(_count_arguments(args, kwargs))
+        timed = _TimedCoroutine(func(*args, **kwargs), name)
+        start = time.perf_counter()
+        outcome = "exception"
+        _in_flight[name] += 1
+        try:
+            result = await timed
+            outcome = "error" if isinstance(result, str) and result.startswith(ERROR_PREFIXES) else "ok"
+            return result
+        finally:
+            _in_flight[name] -= 1
+            stats.wall.record((time.perf_counter() - start) * 1_000_000)
+            stats.blocking.record(timed.busy * 1_000_000)
+            stats.outcomes[outcome] += 1
+
+    return wrapper
+
+
+def instrumented_tool(**kwargs):
+    """@function_tool() with latency instrumentation; takes the same arguments."""
+
+    def decorator(func):
+        return function_tool(**kwargs)(instrument(func))
+
+    return decorator
+
+
+def snapshot() -> dict:
+    """Per-tool statistics as plain data."""
+    return {name: stats.to_dict() for name, stats in sorted(_stats.items())}
+
+
+def render_json() -> str:
+    data = {"tools": snapshot()}
+    for name, (snapshot_fn, _) in sorted(_collectors.items()):
+        data[name] = snapshot_fn()
+    return json.dumps(data, indent=2)
+
+
+def histogram_lines(metric: str, labels: str, hist: Histogram, bounds: tuple, scale: float) -> list:
+    """Prometheus bucket/sum/count lines for one histogram series."""
+    prefix = f"{labels}," if labels else ""
+    lines = []
+    for bound in bounds:
+        le = f"{bound:g}"
+        lines.append(f'{metric}_bucket{{{prefix}le="{le}"}} {hist.count_at_or_below(int(bound * scale))}')
+    lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {hist.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {hist.total / scale:g}")
+    lines.append(f"{metric}_count{suffix} {hist.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        "# HELP nevira_tool_calls_total Tool calls by outcome.",
+        "# TYPE nevira_tool_calls_total counter",
+    ]
+    for name, stats in sorted(_stats.items()):
+        for outcome, count in stats.outcomes.items():
+            lines.append(f'nevira_tool_calls_total{{tool="{name}",outcome="{outcome}"}} {count}')
+
+    families = (
+        ("nevira_tool_duration_seconds", "Wall time per tool call.", "wall", LATENCY_BUCKETS, 1_000_000),
+        ("nevira_tool_loop_blocking_seconds", "Time a tool call spent running on the event loop.", "blocking", LATENCY_BUCKETS, 1_000_000),
+        ("nevira_tool_arguments", "Arguments supplied per tool call.", "arguments", ARGUMENT_BUCKETS, 1),
+    )
+    for metric, help_text, attr, bounds, scale in families:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, stats in sorted(_stats.items()):
+            lines.extend(histogram_lines(metric, f'tool="{name}"', getattr(stats, attr), bounds, scale))
+    for _, (_, prometheus_fn) in sorted(_collectors.items()):
+        lines.extend(prometheus_fn())
+    return "\n".join(lines) + "\n"
+
+
+def local_snapshot() -> dict:
+    """This process's metrics, as written for the worker."""
+    return {"pid": os.getpid(), "at": time.time(), "prometheus": render_prometheus(), "json": json.loads(render_json())}
+
+
+class SnapshotWriter:
+    """Writes this process's metrics to the shared directory for the worker to serve."""
+
+    def __init__(self, state_dir: str = METRICS_STATE_DIR, interval: float = METRICS_SNAPSHOT_SECONDS) -> None:
+        """
+        Args:
+            state_dir: Directory shared with the worker
+            interval: Seconds between snapshots
+        """
+        self.path = os.path.join(state_dir, f"{os.getpid()}.json")
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(state_dir, exist_ok=True)
+
+    def write(self) -> None:
+        """Blocking; replaces the snapshot atomically."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(local_snapshot(), f)
+        os.replace(tmp, self.path)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError as e:
+                logging.warning(f"Could not write the metrics snapshot: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        """Stop, leaving a final snapshot behind so the process's metrics outlive it."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.write)
+        except OSError as e:
+            logging.warning(f"Could not write the final metrics snapshot: {e}")
+
+
+def read_snapshots(
+    state_dir: str = METRICS_STATE_DIR,
+    retention: float = METRICS_RETENTION_SECONDS,
+    now: Optional[float] = None,
+) -> list:
+    """Snapshots written within the retention period, oldest process first. Blocking; deletes expired ones."""
+    now = now if now is not None else time.time()
+    snapshots = []
+    try:
+        names = os.listdir(state_dir)
+    except OSError:
+        return snapshots
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(state_dir, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - snapshot.get("at", 0) > retention:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        snapshots.append(snapshot)
+    return sorted(snapshots, key=lambda s: s["pid"])
+
+
+def _with_label(sample: str, label: str) -> str:
+    name, brace, rest = sample.partition("{")
+    if brace:
+        return f"{name}{{{label},{rest}"
+    name, _, value = sample.partition(" ")
+    return f"{name}{{{label}}} {value}"
+
+
+def merge_prometheus(snapshots: list) -> str:
+    """One exposition for several processes: families merged, each sample labelled with its pid."""
+    families: dict = {}
+    for snapshot in snapshots:
+        family = None
+        for line in snapshot["prometheus"].splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                family = line.split(" ", 3)[2]
+                entry = families.setdefault(family, {"meta": [], "samples": []})
+                if len(entry["meta"]) < 2 and line not in entry["meta"]:
+                    entry["meta"].append(line)
+            elif line and family is not None:
+                families[family]["samples"].append(_with_label(line, f'pid="{snapshot["pid"]}"'))
+    lines = []
+    for entry in families.values():
+        lines.extend(entry["meta"])
+        lines.extend(entry["samples"])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, host: str = METRICS_HOST, port: int = METRICS_PORT, state_dir: Optional[str] = None) -> None:
+        """
+        Args:
+            host: Interface to bind (local only by default)
+            port: TCP port; 0 picks a free one
+            state_dir: Also serve the job processes' snapshots from this directory
+                (None serves this process alone)
+        """
+        self.host = host
+        self.port = port
+        self.state_dir = state_dir
+        self._runner: Optional[web.AppRunner] = None
+
+    def _snapshots(self) -> list:
+        """Blocking. This process plus every job process that has written a snapshot."""
+        others = [s for s in read_snapshots(self.state_dir) if s["pid"] != os.getpid()]
+        return [local_snapshot()] + others
+
+    async def _prometheus(self, request: web.Request) -> web.Response:
+        if self.state_dir is None:
+            text = render_prometheus()
+        else:
+            text = merge_prometheus(await asyncio.to_thread(self._snapshots))
+        return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+    async def _json(self, request: web.Request) -> web.Response:
+        if self.state_dir is None:
+            text = render_json()
+        else:
+            snapshots = await asyncio.to_thread(self._snapshots)
+            text = json.dumps({"processes": {str(s["pid"]): s["json"] for s in snapshots}}, indent=2)
+        return web.Response(text=text, content_type="application/json")
+
+    async def start(self) -> int:
+        """Start serving; returns the bound port."""
+        app = web.Application()
+        app.router.add_get("/metrics", self._prometheus)
+        app.router.add_get("/metrics.json", self._json)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logging.info(f"Tool metrics served on http://{self.host}:{self.port}/metrics")
+        return self.port
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+_server: Optional[MetricsServer] = None
+_writer: Optional[SnapshotWriter] = None
+
+
+def get_writer() -> SnapshotWriter:
+    """Return this job process's snapshot writer, starting it on first use."""
+    global _writer
+    if _writer is None:
+        _writer = SnapshotWriter(METRICS_STATE_DIR)
+    _writer.start()
+    return _writer
+
+
+async def start_server() -> Optional[MetricsServer]:
+    """Start the endpoint for every job's metrics; call once, in the worker process (unless METRICS_PORT=0)."""
+    global _server
+    if _server is None and METRICS_PORT > 0:
+        server = MetricsServer(state_dir=METRICS_STATE_DIR)
+        try:
+            await server.start()
+        except OSError as e:
+            logging.warning(f"Could not start tool metrics endpoint: {e}")
+            return None
+        _server = server
+    return _server
+
+
+async def close() -> None:
+    """Write a final snapshot and stop the metrics endpoint, if either was started."""
+    global _server, _writer
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
+    if _server is not None:
+        await _server.stop()
+        _server = None
@@ -1,20 +1,129 @@
 import logging
-from livekit.agents import function_tool, RunContext
-import requests
-from ddgs import DDGS
+from livekit.agents import RunContext
 import os
-import smtplib
-from email.mime.multipart import MIMEMultipart  
-from email.mime.text import MIMEText
 from typing import Optional
 import datetime
 import webbrowser
-import pyautogui
-import psutil
 import subprocess
 import platform
+import asyncio
+import contextvars
+import cache
+from cache import TTLCache, normalize_key
+from web_search import SearchPool
+import mailer
+import system_monitor
+import processes
+import registry
+import schedule
+import screenshots
+import weather
+import tool_metrics
+from tool_metrics import instrumented_tool
+from intent_router import fast_path
+from lazy import lazy_import
+
+# Heavy dependencies are imported on first use, not when the worker loads the tools
+pyautogui = lazy_import("pyautogui")
+psutil = lazy_import("psutil")
+smtplib = lazy_import("smtplib")
+
+# Search results for repeat questions within a session. Weather needs no
+# cache here: the forecast store in weather.py is its cache.
+SEARCH_CACHE = TTLCache(
+    "search",
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE", "128")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "1800")),
+    stale_while_revalidate=True,
+    max_stale=float(os.getenv("SEARCH_CACHE_MAX_STALE", "86400")),
+)
+
+# Bounded worker pool for the blocking DDGS client
+SEARCH_POOL = SearchPool()
+
+tool_metrics.register_collector(
+    "caches",
+    lambda: {SEARCH_CACHE.name: SEARCH_CACHE.stats()},
+    lambda: cache.prometheus_lines([SEARCH_CACHE]),
+)
+tool_metrics.register_collector("search_pool", SEARCH_POOL.stats, SEARCH_POOL.prometheus_lines)
+
+# Answer as soon as SEARCH_STREAM_MIN_RESULTS results have arrived and finish
+# the rest in the background (the full set is cached for follow-up questions).
+# Off by default: it only helps when several SEARCH_BACKENDS are fanned out to.
+SEARCH_STREAMING = os.getenv("SEARCH_STREAMING", "false").lower() in ("1", "true", "yes")
+SEARCH_STREAM_MIN_RESULTS = int(os.getenv("SEARCH_STREAM_MIN_RESULTS", "3"))
+
+# Return "queued" from send_email immediately instead of waiting for delivery
+EMAIL_QUEUE = os.getenv("EMAIL_QUEUE", "true").lower() in ("1", "true", "yes")
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+_background_tasks: set = set()
+# The background tasks of the session whose code is running. Set once per
+# session before it starts; every task the session spawns inherits it.
+_session_tasks: contextvars.ContextVar = contextvars.ContextVar("session_tasks", default=None)
+
+
+def bind_session_tasks() -> set:
+    """Give the calling task (and the session it is about to start) its own background task set."""
+    tasks: set = set()
+    _session_tasks.set(tasks)
+    return tasks
+
+
+def _run_in_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    owned = _session_tasks.get()
+    if owned is not None:
+        owned.add(task)
+        task.add_done_callback(owned.discard)
+
+
+def cancel_session_tasks() -> int:
+    """
+    Cancel the current session's background tasks, leaving other sessions' alone.
+
+    Returns:
+        How many were cancelled
+    """
+    current = asyncio.current_task()
+    pending = [task for task in _session_tasks.get() or () if task is not current and not task.done()]
+    for task in pending:
+        task.cancel()
+    return len(pending)
+
+
+async def _finish_search(stream, cache_key: str) -> None:
+    """Collect the remaining results of a streamed search and cache the full set."""
+    await stream.drain()
+    if not stream.timed_out and stream.results:
+        SEARCH_CACHE.set(cache_key, (stream.results, "complete"))
+    logging.info(f"Background search for '{stream.query}' finished with {len(stream.results)} results")
+
+
+async def _fetch_search_results(query: str) -> tuple[list, str]:
+    """
+    Run a web search off the event loop.
+
+    Returns:
+        (results, status) - status is "complete", "timed_out", or "streaming"
+        when only the first results are returned and the rest is still arriving
+    """
+    if not SEARCH_STREAMING:
+        results, timed_out = await SEARCH_POOL.search(query, max_results=5)
+        return results, "timed_out" if timed_out else "complete"
+
+    stream = SEARCH_POOL.stream(query, max_results=5)
+    results = await stream.at_least(SEARCH_STREAM_MIN_RESULTS)
+    if stream.done:
+        return stream.results, "timed_out" if stream.timed_out else "complete"
+    _run_in_background(_finish_search(stream, normalize_key(query)))
+    return results, "streaming"
 
-@function_tool()
+
+@instrumented_tool()
 async def get_weather(
     context: RunContext,  # type: ignore
     city: str) -> str:
@@ -22,19 +131,17 @@ async def get_weather(
     Get the current weather for a given city.
     """
     try:
-        response = requests.get(
-            f"https://wttr.in/{city}?format=3")
-        if response.status_code == 200:
-            logging.info(f"Weather for {city}: {response.text.strip()}")
-            return response.text.strip()   
+        report = await weather.get_service().lookup(city)
+        if report is not None:
+            logging.info(f"Weather for {city}: {report.text} ({report.source}, stored={report.stored})")
+            return weather.describe(report)
         else:
-            logging.error(f"Failed to get weather for {city}: {response.status_code}")
             return f"Could not retrieve weather for {city}."
     except Exception as e:
         logging.error(f"Error retrieving weather for {city}: {e}")
         return f"An error occurred while retrieving weather for {city}." 
 
-@function_tool()
+@instrumented_tool()
 async def search_web(
     context: RunContext,  # type: ignore
     query: str) -> str:
@@ -42,28 +149,38 @@ async def search_web(
     Search the web using DuckDuckGo.
     """
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=5))
-            
-            if not results:
-                return f"No search results found for '{query}'."
-            
-            # Format the results into a readable string
-            formatted_results = []
-            for i, result in enumerate(results, 1):
-                title = result.get('title', 'No title')
-                body = result.get('body', 'No description')
-                url = result.get('href', '')
-                formatted_results.append(f"{i}. {title}\n   {body}\n   {url}")
-            
-            output = "\n\n".join(formatted_results)
-            logging.info(f"Search results for '{query}': Found {len(results)} results")
-            return output
+        # Only complete, non-empty result sets are cached; an empty one may just be a transient failure
+        results, status = await SEARCH_CACHE.get_or_fetch(
+            normalize_key(query),
+            lambda: _fetch_search_results(query),
+            should_cache=lambda outcome: outcome[1] == "complete" and bool(outcome[0]),
+        )
+        
+        if not results:
+            if status == "timed_out":
+                return f"The search for '{query}' timed out before any results arrived."
+            return f"No search results found for '{query}'."
+        
+        # Format the results into a readable string
+        formatted_results = []
+        for i, result in enumerate(results, 1):
+            title = result.get('title', 'No title')
+            body = result.get('body', 'No description')
+            url = result.get('href', '')
+            formatted_results.append(f"{i}. {title}\n   {body}\n   {url}")
+        
+        output = "\n\n".join(formatted_results)
+        if status == "timed_out":
+            output += "\n\n(The search timed out, so these results may be incomplete.)"
+        elif status == "streaming":
+            output += "\n\n(These are the first results to come in.)"
+        logging.info(f"Search results for '{query}': Found {len(results)} results")
+        return output
     except Exception as e:
         logging.error(f"Error searching the web for '{query}': {e}")
         return f"An error occurred while searching the web for '{query}'."    
 
-@function_tool()    
+@instrumented_tool()
 async def send_email(
     context: RunContext,  # type: ignore
     to_email: str,
@@ -81,10 +198,6 @@ async def send_email(
         cc_email: Optional CC email address
     """
     try:
-        # Gmail SMTP configuration
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        
         # Get credentials from environment variables
         gmail_user = os.getenv("GMAIL_USER")
         gmail_password = os.getenv("GMAIL_APP_PASSWORD")  # Use App Password, not regular password
@@ -93,6 +206,9 @@ async def send_email(
             logging.error("Gmail credentials not found in environment variables")
             return "Email sending failed: Gmail credentials not configured."
         
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        
         # Create message
         msg = MIMEMultipart()
         msg['From'] = gmail_user
@@ -108,15 +224,17 @@ async def send_email(
         # Attach message body
         msg.attach(MIMEText(message, 'plain'))
         
-        # Connect to Gmail SMTP server
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Enable TLS encryption
-        server.login(gmail_user, gmail_password)
-        
-        # Send email
+        # Send through the shared, already-authenticated SMTP session
+        outbox = mailer.get_mailer(gmail_user, gmail_password)
         text = msg.as_string()
-        server.sendmail(gmail_user, recipients, text)
-        server.quit()
+        if EMAIL_QUEUE:
+            # A wrong app password would otherwise only show up in the log after "queued"
+            await outbox.verify()
+            outbox.enqueue(gmail_user, recipients, text)
+            logging.info(f"Email to {to_email} queued for delivery")
+            return f"Email to {to_email} queued for delivery"
+        
+        await outbox.send(gmail_user, recipients, text)
         
         logging.info(f"Email sent successfully to {to_email}")
         return f"Email sent successfully to {to_email}"
@@ -136,7 +254,8 @@ async def send_email(
 # DESKTOP AUTOMATION TOOLS (from Nevira)
 # ========================================
 
-@function_tool()
+@instrumented_tool()
+@fast_path
 async def control_volume(
     context: RunContext,  # type: ignore
     action: str
@@ -174,13 +293,13 @@ async def control_volume(
         return f"Could not control volume: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def open_application(
     context: RunContext,  # type: ignore
     app_name: str
 ) -> str:
     """
-    Open Windows applications like Calculator, Notepad, Paint, etc.
+    Open applications like Calculator, Notepad, Paint, VS Code, etc.
     
     Args:
         app_name: Name of the application (calculator, notepad, paint, cmd, explorer)
@@ -188,42 +307,27 @@ async def open_application(
     try:
         app_name = app_name.lower().strip()
         
-        apps = {
-            "calculator": "calc.exe",
-            "notepad": "notepad.exe",
-            "paint": "mspaint.exe",
-            "cmd": "cmd.exe",
-            "command prompt": "cmd.exe",
-            "explorer": "explorer.exe",
-            "file explorer": "explorer.exe",
-            "task manager": "taskmgr.exe",
-            "settings": "ms-settings:",
-        }
-        
-        if app_name in apps:
-            if apps[app_name].startswith("ms-"):
-                # For Windows 10/11 URI schemes
-                webbrowser.open(apps[app_name])
-            else:
-                os.startfile(apps[app_name])
-            logging.info(f"Opened {app_name}")
-            return f"Opening {app_name} now, Boss."
-        else:
-            available = ", ".join(apps.keys())
+        app = registry.get_registry().find_app(app_name)
+        if app is None:
+            available = ", ".join(registry.get_registry().launchable())
             return f"I don't know how to open '{app_name}'. Available apps: {available}"
+        
+        registry.get_registry().launch(app)
+        logging.info(f"Opened {app.key}")
+        return f"Opening {app.key} now, Boss."
             
     except Exception as e:
         logging.error(f"Error opening application '{app_name}': {e}")
         return f"Could not open {app_name}: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def close_application(
     context: RunContext,  # type: ignore
     app_name: str
 ) -> str:
     """
-    Close Windows applications.
+    Close applications.
     
     Args:
         app_name: Name of the application to close (calculator, notepad, paint)
@@ -231,23 +335,18 @@ async def close_application(
     try:
         app_name = app_name.lower().strip()
         
-        # Map app names to their process names
-        app_processes = {
-            "calculator": ["Calculator.exe", "ApplicationFrameHost.exe"],
-            "notepad": ["notepad.exe"],
-            "paint": ["mspaint.exe"],
-            "chrome": ["chrome.exe"],
-            "edge": ["msedge.exe"],
-        }
-        
-        if app_name not in app_processes:
-            available = ", ".join(app_processes.keys())
+        app = registry.get_registry().find_app(app_name)
+        if app is None or not app.processes:
+            available = ", ".join(a.key for a in registry.get_registry().apps.values() if a.processes)
             return f"I don't know how to close '{app_name}'. Available: {available}"
+        app_name = app.key
         
-        # Kill the processes
-        for process_name in app_processes[app_name]:
-            if platform.system() == "Windows":
-                os.system(f'taskkill /f /im {process_name} 2>nul')
+        # Close every matching process in one batch
+        outcomes = await processes.get_engine().close(list(app.processes))
+        if not outcomes:
+            return f"{app_name} isn't running, Boss."
+        if not processes.closed_any(outcomes):
+            return f"Could not close {app_name}: {', '.join(sorted(set(outcomes.values())))}."
         
         logging.info(f"Closed {app_name}")
         return f"Closed {app_name}, Boss."
@@ -257,7 +356,7 @@ async def close_application(
         return f"Could not close {app_name}: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def open_website(
     context: RunContext,  # type: ignore
     site_name: str
@@ -271,25 +370,11 @@ async def open_website(
     try:
         site_name = site_name.lower().strip()
         
-        sites = {
-            'youtube': 'https://youtube.com',
-            'facebook': 'https://facebook.com',
-            'instagram': 'https://instagram.com',
-            'whatsapp': 'https://web.whatsapp.com',
-            'discord': 'https://discord.com',
-            'twitter': 'https://twitter.com',
-            'x': 'https://x.com',
-            'github': 'https://github.com',
-            'google': 'https://google.com',
-            'gmail': 'https://gmail.com',
-            'reddit': 'https://reddit.com',
-            'linkedin': 'https://linkedin.com',
-        }
-        
-        if site_name in sites:
-            webbrowser.open(sites[site_name])
-            logging.info(f"Opened {site_name}")
-            return f"Opening {site_name}, Boss."
+        site = registry.get_registry().find_site(site_name)
+        if site is not None:
+            webbrowser.open(site.url)
+            logging.info(f"Opened {site.key}")
+            return f"Opening {site.key}, Boss."
         else:
             # Try to open as URL if it contains a domain
             if '.' in site_name or site_name.startswith('http'):
@@ -297,7 +382,7 @@ async def open_website(
                 webbrowser.open(url)
                 return f"Opening {url}, Boss."
             else:
-                available = ", ".join(sites.keys())
+                available = ", ".join(registry.get_registry().sites)
                 return f"Unknown site '{site_name}'. Popular sites: {available}"
             
     except Exception as e:
@@ -305,7 +390,7 @@ async def open_website(
         return f"Could not open website: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def search_google(
     context: RunContext,  # type: ignore
     query: str
@@ -327,7 +412,7 @@ async def search_google(
         return f"Could not perform Google search: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def get_system_status(
     context: RunContext  # type: ignore
 ) -> str:
@@ -335,33 +420,38 @@ async def get_system_status(
     Get current system information including CPU usage, battery status, and memory.
     """
     try:
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=1)
-        
-        # Memory info
-        memory = psutil.virtual_memory()
-        memory_percent = memory.percent
+        # Readings come from the background sampler's ring buffer, no blocking calls here
+        sampler = system_monitor.get_sampler()
+        await sampler.wait_ready()
+        sample = sampler.latest()
         
         # Battery info
-        battery = psutil.sensors_battery()
-        if battery:
-            battery_percent = battery.percent
-            plugged = "plugged in" if battery.power_plugged else "on battery"
-            battery_info = f"Battery: {battery_percent}% ({plugged})"
+        if sample.battery_percent is not None:
+            plugged = "plugged in" if sample.power_plugged else "on battery"
+            battery_info = f"Battery: {sample.battery_percent}% ({plugged})"
         else:
             battery_info = "Battery: Not available (desktop system)"
         
-        # Disk usage
-        disk = psutil.disk_usage('/')
-        disk_percent = disk.percent
-        
         status = f"System Status:\n"
-        status += f"- CPU Usage: {cpu_percent}%\n"
-        status += f"- Memory Usage: {memory_percent}%\n"
-        status += f"- Disk Usage: {disk_percent}%\n"
+        status += f"- CPU Usage: {sample.cpu_percent}%\n"
+        status += f"- Memory Usage: {sample.memory_percent}%\n"
+        status += f"- Disk Usage: {sample.disk_percent}%\n"
         status += f"- {battery_info}"
         
-        logging.info(f"System status retrieved: CPU {cpu_percent}%, Memory {memory_percent}%")
+        # Short trends once the buffer covers some history
+        if sampler.window_seconds() >= 30:
+            window = min(60, sampler.window_seconds())
+            label = "minute" if window >= 60 else f"{int(window)} seconds"
+            cpu_avg = sampler.average("cpu_percent", window)
+            memory_avg = sampler.average("memory_percent", window)
+            status += f"\n- CPU averaged {cpu_avg:.0f}% and memory {memory_avg:.0f}% over the last {label}"
+        
+        top = sampler.top_processes()
+        if top:
+            busiest = ", ".join(f"{name} ({cpu:.0f}% CPU)" for name, cpu, _ in top[:3])
+            status += f"\n- Busiest processes: {busiest}"
+        
+        logging.info(f"System status retrieved: CPU {sample.cpu_percent}%, Memory {sample.memory_percent}%")
         return status
         
     except Exception as e:
@@ -369,7 +459,21 @@ async def get_system_status(
         return f"Could not retrieve system status: {str(e)}"
 
 
-@function_tool()
+async def _current_schedule() -> "schedule.Schedule":
+    """The shared schedule, re-read off the event loop if its file changed."""
+    calendar = schedule.get_schedule()
+    if calendar.stale() or not calendar.reloads:
+        await asyncio.to_thread(calendar.refresh)
+    return calendar
+
+
+def _describe_events(events: list) -> str:
+    parts = [f"from {schedule.format_time(e.start)} to {schedule.format_time(e.end)} you have {e.title}" for e in events]
+    text = ", ".join(parts)
+    return text[0].upper() + text[1:] + "."
+
+
+@instrumented_tool()
 async def get_schedule(
     context: RunContext,  # type: ignore
     day: Optional[str] = None
@@ -378,40 +482,88 @@ async def get_schedule(
     Get the user's schedule for a specific day. If no day is provided, returns today's schedule.
     
     Args:
-        day: Day of the week (monday, tuesday, etc.) or "today"
+        day: Day of the week (monday, tuesday, etc.), "today", "tomorrow" or a date (YYYY-MM-DD)
     """
     try:
-        # Determine which day to show
-        if not day or day.lower() == "today":
-            current_day = datetime.datetime.today().weekday()
-            day_names = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-            day = day_names[current_day]
-        else:
-            day = day.lower().strip()
-        
-        # Schedule data (customize this for the user)
-        schedule = {
-            "monday": "From 9:00 AM to 9:50 AM you have Algorithm class, from 10:00 AM to 11:50 AM you have DSA class.",
-            "tuesday": "From 9:00 AM to 9:50 AM you have Database Management class, from 10:00 AM to 11:50 AM you have Computer Networks class, from 2:00 PM to 4:50 PM you have DSA Lab.",
-            "wednesday": "From 9:00 AM to 9:50 AM you have Operating Systems class, from 10:00 AM to 11:50 AM you have Software Engineering class, from 2:00 PM to 4:50 PM you have CN Lab.",
-            "thursday": "From 9:00 AM to 9:50 AM you have Database Management class, from 10:00 AM to 11:50 AM you have Algorithm class, from 2:00 PM to 4:50 PM you have DBMS Lab.",
-            "friday": "From 9:00 AM to 9:50 AM you have Operating Systems class, from 10:00 AM to 11:50 AM you have Computer Networks class.",
-            "saturday": "From 9:00 AM to 9:50 AM you have Software Engineering class, from 10:00 AM to 11:50 AM you have Open Elective or Extra class.",
-            "sunday": "You are free today, Boss. Time to relax or revise!"
-        }
-        
-        if day in schedule:
-            logging.info(f"Retrieved schedule for {day}")
-            return f"Your schedule for {day.title()}: {schedule[day]}"
-        else:
+        calendar = await _current_schedule()
+        date = schedule.parse_day(day, calendar.clock().date())
+        if date is None:
             return f"I don't have schedule information for '{day}'."
+        
+        label = date.strftime("%A") if (date - calendar.clock().date()).days < 7 else date.strftime("%A, %B %d")
+        events = calendar.on(date)
+        logging.info(f"Retrieved schedule for {date}: {len(events)} events")
+        if not events:
+            return f"You have nothing scheduled for {label}, Boss."
+        return f"Your schedule for {label}: {_describe_events(events)}"
             
     except Exception as e:
         logging.error(f"Error getting schedule: {e}")
         return f"Could not retrieve schedule: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
+async def get_next_event(
+    context: RunContext  # type: ignore
+) -> str:
+    """
+    Get the user's next scheduled event (next class, meeting, etc.).
+    """
+    try:
+        calendar = await _current_schedule()
+        now = calendar.clock()
+        current = calendar.at(now)
+        upcoming = calendar.next_event(now)
+        if upcoming is None:
+            return "You have nothing coming up, Boss."
+        
+        when = "today" if upcoming.start.date() == now.date() else upcoming.start.strftime("%A")
+        result = f"Your next event is {upcoming.title}, {when} from {schedule.format_time(upcoming.start)} to {schedule.format_time(upcoming.end)}, Boss."
+        if current:
+            result = f"You're in {current[0].title} until {schedule.format_time(current[0].end)}. " + result
+        return result
+        
+    except Exception as e:
+        logging.error(f"Error getting next event: {e}")
+        return f"Could not retrieve your next event: {str(e)}"
+
+
+@instrumented_tool()
+async def check_availability(
+    context: RunContext,  # type: ignore
+    time: str,
+    day: Optional[str] = None
+) -> str:
+    """
+    Check whether the user is free at a given time.
+    
+    Args:
+        time: Time of day, e.g. "3 PM", "15:30" or "noon"
+        day: Day of the week, "today", "tomorrow" or a date (YYYY-MM-DD). Defaults to today.
+    """
+    try:
+        calendar = await _current_schedule()
+        date = schedule.parse_day(day, calendar.clock().date())
+        clock_time = schedule.parse_time(time)
+        if date is None or clock_time is None:
+            return f"I couldn't understand the time '{time}'" + (f" on '{day}'" if day else "") + ", Boss."
+        
+        moment = datetime.datetime.combine(date, clock_time)
+        label = f"{schedule.format_time(moment)} on {date.strftime('%A')}"
+        busy = calendar.at(moment)
+        if not busy:
+            return f"You're free at {label}, Boss."
+        events = ", ".join(
+            f"{e.title} ({schedule.format_time(e.start)} to {schedule.format_time(e.end)})" for e in busy)
+        return f"At {label} you have {events}, Boss."
+        
+    except Exception as e:
+        logging.error(f"Error checking availability: {e}")
+        return f"Could not check your availability: {str(e)}"
+
+
+@instrumented_tool()
+@fast_path
 async def get_time_and_date(
     context: RunContext  # type: ignore
 ) -> str:
@@ -434,7 +586,7 @@ async def get_time_and_date(
         return f"Could not retrieve time and date: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def take_screenshot(
     context: RunContext,  # type: ignore
     filename: Optional[str] = None
@@ -446,22 +598,16 @@ async def take_screenshot(
         filename: Optional custom filename (without extension)
     """
     try:
-        # Create screenshots directory
-        pictures_dir = os.path.join(os.path.expanduser("~"), "Pictures", "Screenshots")
-        os.makedirs(pictures_dir, exist_ok=True)
-        
         # Generate filename
         if not filename:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"screenshot_{timestamp}"
         
-        filepath = os.path.join(pictures_dir, f"{filename}.png")
+        # Capture happens off the event loop; encoding and writing the file
+        # finish in the background after we answer
+        filepath, _ = await screenshots.get_pipeline().capture(filename)
         
-        # Take screenshot
-        screenshot = pyautogui.screenshot()
-        screenshot.save(filepath)
-        
-        logging.info(f"Screenshot saved to {filepath}")
+        logging.info(f"Screenshot captured, saving to {filepath}")
         return f"Screenshot saved to {filepath}, Boss."
         
     except Exception as e:
@@ -473,7 +619,7 @@ async def take_screenshot(
 # MUSIC & MEDIA CONTROL TOOLS
 # ========================================
 
-@function_tool()
+@instrumented_tool()
 async def play_music(
     context: RunContext,  # type: ignore
     query: str,
@@ -515,7 +661,8 @@ async def play_music(
         return f"Could not play music: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
+@fast_path
 async def control_media(
     context: RunContext,  # type: ignore
     action: str
@@ -558,7 +705,7 @@ async def control_media(
         return f"Could not control media: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def close_assistant(
     context: RunContext  # type: ignore
 ) -> str:
@@ -567,33 +714,21 @@ async def close_assistant(
     Use this when user says goodbye, exit, close, or disconnect.
     """
     try:
-        logging.info("User requested to close assistant - initiating shutdown")
-        
-        # Set flag for graceful shutdown
-        context.agent.close_requested = True  # type: ignore
-        
-        # Schedule immediate termination after response is sent
-        import asyncio
-        import sys
-        
-        async def delayed_shutdown():
-            await asyncio.sleep(2)  # Give time for response to be sent
-            logging.info("Terminating Nevira assistant process...")
-            sys.exit(0)
-        
-        # Start shutdown task
-        asyncio.create_task(delayed_shutdown())
-        
+        logging.info("User requested to close assistant - ending this session")
+        # Only this session's work stops; the worker and its other sessions carry on
+        cancelled = cancel_session_tasks()
+        if cancelled:
+            logging.info(f"Cancelled {cancelled} background tasks of the closing session")
+        # Drain lets the goodbye finish playing before the session closes
+        context.session.shutdown(drain=True)
         return "Goodbye, Boss. Closing assistant now."
-        
+
     except Exception as e:
         logging.error(f"Error closing assistant: {e}")
-        # Force exit as backup
-        import sys
-        sys.exit(0)
+        return f"Could not close the assistant cleanly: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def force_close_application(
     context: RunContext,  # type: ignore
     app_name: str
@@ -607,30 +742,36 @@ async def force_close_application(
     """
     try:
         app_name = app_name.lower().strip()
-        closed_count = 0
         
-        # Find and terminate matching processes
-        for proc in psutil.process_iter(['pid', 'name']):
+        # Resolve targets from the background process index instead of scanning every process
+        targets = await processes.get_index().lookup(app_name)
+        if not targets:
+            return f"No running application found matching '{app_name}', Boss."
+        
+        names = {}
+        for proc in targets:
             try:
-                process_name = proc.info['name'].lower()
-                if app_name in process_name:
-                    proc.terminate()
-                    closed_count += 1
-                    logging.info(f"Terminated process: {proc.info['name']}")
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        
-        if closed_count > 0:
-            return f"Closed {closed_count} instance(s) of {app_name}, Boss."
+                names[proc.pid] = proc.name()
+            except psutil.Error:
+                names[proc.pid] = app_name
+        outcomes = await processes.terminate(targets)
+        
+        for pid, outcome in outcomes.items():
+            logging.info(f"Process {names[pid]} (PID {pid}): {outcome}")
+        closed_count = sum(1 for outcome in outcomes.values() if outcome in ("terminated", "killed", "already exited"))
+        details = "; ".join(f"{names[pid]} (PID {pid}) {outcome}" for pid, outcome in sorted(outcomes.items()))
+        
+        if closed_count == len(outcomes):
+            return f"Closed {closed_count} instance(s) of {app_name}, Boss. {details}."
         else:
-            return f"No running application found matching '{app_name}', Boss."
+            return f"Closed {closed_count} of {len(outcomes)} instance(s) of {app_name}, Boss. {details}."
             
     except Exception as e:
         logging.error(f"Error force closing application: {e}")
         return f"Could not close {app_name}: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def open_youtube_music(
     context: RunContext,  # type: ignore
     query: Optional[str] = None
@@ -659,7 +800,7 @@ async def open_youtube_music(
         return f"Could not open YouTube Music: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def open_spotify(
     context: RunContext,  # type: ignore
     query: Optional[str] = None
@@ -711,7 +852,7 @@ async def open_spotify(
         return f"Could not open Spotify: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def close_browser(
     context: RunContext,  # type: ignore
     browser: Optional[str] = None
@@ -723,23 +864,26 @@ async def close_browser(
         browser: Optional browser name ("chrome", "edge", "firefox") or "all" for all browsers
     """
     try:
-        browser_processes = {
-            "chrome": ["chrome.exe"],
-            "edge": ["msedge.exe"],
-            "firefox": ["firefox.exe"],
-        }
+        browsers = registry.get_registry().browsers()
+        app = registry.get_registry().find_app(browser) if browser and browser.lower() != "all" else None
         
-        if browser and browser.lower() in browser_processes:
+        if app is not None and app.browser:
             # Close specific browser
-            for proc_name in browser_processes[browser.lower()]:
-                os.system(f'taskkill /f /im {proc_name} 2>nul')
+            outcomes = await processes.get_engine().close(list(app.processes))
+            if not outcomes:
+                return f"{browser} isn't running, Boss."
+            if not processes.closed_any(outcomes):
+                return f"Could not close {browser}: {', '.join(sorted(set(outcomes.values())))}."
             logging.info(f"Closed {browser}")
             return f"Closed {browser}, Boss."
         else:
-            # Close all browsers
-            for browser_name, processes in browser_processes.items():
-                for proc_name in processes:
-                    os.system(f'taskkill /f /im {proc_name} 2>nul')
+            # Close all browsers in one batch
+            all_processes = [name for b in browsers for name in b.processes]
+            outcomes = await processes.get_engine().close(all_processes)
+            if not outcomes:
+                return "No browsers are running, Boss."
+            if not processes.closed_any(outcomes):
+                return f"Could not close the browsers: {', '.join(sorted(set(outcomes.values())))}."
             logging.info("Closed all browsers")
             return "Closed all browsers, Boss."
             
@@ -748,7 +892,7 @@ async def close_browser(
         return f"Could not close browser: {str(e)}"
 
 
-@function_tool()
+@instrumented_tool()
 async def close_youtube(
     context: RunContext  # type: ignore
 ) -> str:
@@ -757,36 +901,13 @@ async def close_youtube(
     Since YouTube runs in browser, this closes the active browser window.
     """
     try:
-        # Try to close the most common browsers
-        closed_any = False
-        
-        # Try Chrome first (most common)
-        result = os.system('taskkill /fi "WINDOWTITLE eq *YouTube*" /im chrome.exe /f 2>nul')
-        if result == 0:
-            closed_any = True
-        else:
-            # If specific YouTube window not found, close Chrome entirely
-            result = os.system('taskkill /im chrome.exe /f 2>nul')
-            if result == 0:
-                closed_any = True
-        
-        # Try Edge
-        result = os.system('taskkill /fi "WINDOWTITLE eq *YouTube*" /im msedge.exe /f 2>nul')
-        if result == 0:
-            closed_any = True
-        else:
-            result = os.system('taskkill /im msedge.exe /f 2>nul')
-            if result == 0:
-                closed_any = True
-        
-        # Try Firefox
-        result = os.system('taskkill /fi "WINDOWTITLE eq *YouTube*" /im firefox.exe /f 2>nul')
-        if result == 0:
-            closed_any = True
-        else:
-            result = os.system('taskkill /im firefox.exe /f 2>nul')
-            if result == 0:
-                closed_any = True
+        # For each common browser, close the processes showing a YouTube window;
+        # if a browser has no such window, close that browser entirely.
+        # Everything is resolved first and terminated in one batch.
+        outcomes = await processes.get_engine().close_many([
+            (list(b.processes), "youtube", True) for b in registry.get_registry().browsers()
+        ])
+        closed_any = processes.closed_any(outcomes)
         
         if closed_any:
             logging.info("Closed YouTube/browser")
@@ -0,0 +1,255 @@
+"""
+Screen-share sampler that lets the realtime model see the desktop.
+
+FrameSampler captures the screen a few times per second at most, drops
+frames that look the same as the last one sent (a 256-bit difference hash),
+downsizes what is left and hands it to its sinks only while a byte budget
+allows. Two sinks are provided: the agent's realtime session (so the model
+sees the frame) and a screen-share video track published to the room.
+Capture, hashing and sizing all run in a worker thread.
+"""
+import asyncio
+import io
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from livekit import rtc
+
+import screenshots
+
+VISION_ENABLED = os.getenv("VISION_ENABLED", "false").lower() in ("1", "true", "yes")
+# Frames per second captured at most
+VISION_FPS = float(os.getenv("VISION_FPS", "1"))
+VISION_MAX_WIDTH = int(os.getenv("VISION_MAX_WIDTH", "1280"))
+# Bits per second of JPEG-sized frames allowed through (also caps the published track)
+VISION_MAX_BITRATE = int(os.getenv("VISION_MAX_BITRATE", "400000"))
+# Hash bits (out of 256) that must differ for a frame to count as changed
+VISION_CHANGE_BITS = int(os.getenv("VISION_CHANGE_BITS", "6"))
+# Resend an unchanged screen this often so the model's view doesn't go stale (0 = never)
+VISION_REFRESH_SECONDS = float(os.getenv("VISION_REFRESH_SECONDS", "30"))
+
+HASH_SIZE = 16
+
+
+def difference_hash(image) -> int:
+    """Perceptual dHash: 16x16 brightness gradients packed into a 256-bit int."""
+    from PIL import Image
+
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return bits
+
+
+class ByteBudget:
+    """
+    Token bucket over bytes that may go into debt: a frame is allowed
+    whenever the balance is positive, and a large frame then holds off the
+    next ones until the average rate is back under budget. (A plain bucket
+    would never pass a frame bigger than its capacity.)
+    """
+
+    def __init__(self, bits_per_second: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = bits_per_second / 8
+        self.clock = clock
+        self._tokens = self.rate
+        self._last = clock()
+
+    def allow(self, size: int) -> bool:
+        now = self.clock()
+        # At most one second's worth of unused budget carries over
+        self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens <= 0:
+            return False
+        self._tokens -= size
+        return True
+
+
+class FrameSampler:
+    def __init__(
+        self,
+        capture_fn: Callable = screenshots.grab_screen,
+        sinks: Optional[list] = None,
+        fps: float = VISION_FPS,
+        max_width: int = VISION_MAX_WIDTH,
+        max_bitrate: int = VISION_MAX_BITRATE,
+        change_bits: int = VISION_CHANGE_BITS,
+        refresh_seconds: float = VISION_REFRESH_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            capture_fn: Blocking function returning a PIL image of the screen
+            sinks: Callables taking an rtc.VideoFrame
+            fps: Maximum capture rate
+            max_width: Downsize wider frames to this width
+            max_bitrate: Bits per second of (JPEG-sized) frames allowed through
+            change_bits: Hash bits that must differ for a frame to count as new
+            refresh_seconds: Resend an unchanged screen after this long (0 = never)
+            clock: Time source, injectable for tests
+        """
+        self.capture_fn = capture_fn
+        self.sinks = list(sinks or [])
+        self.interval = 1.0 / fps
+        self.max_width = max_width
+        self.change_bits = change_bits
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.budget = ByteBudget(max_bitrate, clock)
+        self._last_hash: Optional[int] = None
+        self._last_sent = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.captured = 0
+        self.unchanged = 0
+        self.over_budget = 0
+        self.sent = 0
+        self.bytes_sent = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _changed(self, frame_hash: int) -> bool:
+        if self._last_hash is None:
+            return True
+        if bin(frame_hash ^ self._last_hash).count("1") >= self.change_bits:
+            return True
+        return bool(self.refresh_seconds) and self.clock() - self._last_sent >= self.refresh_seconds
+
+    def sample(self, image=None) -> Optional[rtc.VideoFrame]:
+        """
+        Capture (unless an image is given) and filter one frame. Blocking.
+
+        Returns:
+            The frame to send, or None if it was unchanged or over budget
+        """
+        if image is None:
+            image = self.capture_fn()
+        self.captured += 1
+        frame_hash = difference_hash(image)
+        if not self._changed(frame_hash):
+            self.unchanged += 1
+            return None
+
+        image = screenshots.downscale(image, self.max_width).convert("RGBA")
+        # What the frame costs on the wire: the model receives it as JPEG
+        encoded = io.BytesIO()
+        image.convert("RGB").save(encoded, format="JPEG", quality=75)
+        size = encoded.tell()
+        if not self.budget.allow(size):
+            self.over_budget += 1
+            return None
+
+        self._last_hash = frame_hash
+        self._last_sent = self.clock()
+        self.sent += 1
+        self.bytes_sent += size
+        return rtc.VideoFrame(image.width, image.height, rtc.VideoBufferType.RGBA, image.tobytes())
+
+    def _deliver(self, frame: rtc.VideoFrame) -> None:
+        for sink in self.sinks:
+            try:
+                sink(frame)
+            except Exception as e:
+                logging.warning(f"Vision frame sink failed: {e}")
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = self.clock()
+            try:
+                frame = await asyncio.to_thread(self.sample)
+                if frame is not None:
+                    self._deliver(frame)
+            except Exception as e:
+                logging.warning(f"Screen capture failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (self.clock() - started)))
+
+    def stats(self) -> dict:
+        return {
+            "captured": self.captured,
+            "unchanged": self.unchanged,
+            "over_budget": self.over_budget,
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+def session_sink(session) -> Callable:
+    """Sink that pushes frames straight into the current agent's realtime session."""
+
+    def push(frame: rtc.VideoFrame) -> None:
+        session.current_agent.realtime_llm_session.push_video(frame)
+
+    return push
+
+
+class ScreenShareTrack:
+    """Publishes sampled frames to the room as a screen-share track."""
+
+    def __init__(self, width: int, height: int, fps: float = VISION_FPS, max_bitrate: int = VISION_MAX_BITRATE) -> None:
+        self.source = rtc.VideoSource(width, height, is_screencast=True)
+        self.track = rtc.LocalVideoTrack.create_video_track("agent-screen", self.source)
+        self.options = rtc.TrackPublishOptions(
+            source=rtc.TrackSource.SOURCE_SCREENSHARE,
+            video_encoding=rtc.VideoEncoding(max_framerate=fps, max_bitrate=max_bitrate),
+        )
+
+    async def publish(self, room: rtc.Room) -> None:
+        await room.local_participant.publish_track(self.track, self.options)
+
+    def __call__(self, frame: rtc.VideoFrame) -> None:
+        self.source.capture_frame(frame)
+
+
+_sampler: Optional[FrameSampler] = None
+
+
+async def start(room: rtc.Room, session) -> Optional[FrameSampler]:
+    """
+    Share the screen with the model and the room, if VISION_ENABLED is set.
+    The track is sized from one probe capture.
+    """
+    global _sampler
+    if not VISION_ENABLED:
+        return None
+    if _sampler is None:
+        try:
+            probe = screenshots.downscale(await asyncio.to_thread(screenshots.grab_screen), VISION_MAX_WIDTH)
+        except Exception as e:
+            logging.warning(f"Screen sharing unavailable: {e}")
+            return None
+        track = ScreenShareTrack(probe.width, probe.height)
+        await track.publish(room)
+        _sampler = FrameSampler(sinks=[session_sink(session), track])
+        logging.info(f"Sharing screen at up to {VISION_FPS:g} fps, {VISION_MAX_BITRATE // 1000} kbps")
+    _sampler.start()
+    return _sampler
+
+
+async def close() -> None:
+    """Stop sharing the screen."""
+    global _sampler
+    if _sampler is not None:
+        await _sampler.stop()
+        _sampler = None
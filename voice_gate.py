@@ -0,0 +1,257 @@
+"""
+Local voice-activity gate in front of the realtime model.
+
+Without it, every room audio frame goes upstream, silence included. The
+gate wraps the session's audio input and only forwards speech. For each
+stretch of speech it sends:
+- VAD_PADDING_MS of audio from before the speech started, so onsets aren't
+  clipped
+- the speech itself, plus VAD_HANGOVER_MS after it to cover short pauses
+- VAD_TAIL_MS of digital silence, sent at once rather than in real time
+
+The model's own turn detection needs some silence to see that Boss
+stopped talking. The tail gives it that silence immediately, which ends
+the turn sooner than waiting for the room to stay quiet. Everything else
+is dropped and counted.
+
+Speech is detected with Silero (livekit-plugins-silero) on 16 kHz copies
+of the frames, on a worker thread. If Silero can't be loaded, an energy
+threshold is used instead. VAD_SUPPRESSION=false passes everything through.
+"""
+import asyncio
+import logging
+import math
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents.voice import io
+
+import tool_metrics
+
+VAD_SUPPRESSION = os.getenv("VAD_SUPPRESSION", "true").lower() in ("1", "true", "yes")
+# Silero speech probability above which a window counts as speech
+VAD_THRESHOLD = float(os.getenv("VAD_THRESHOLD", "0.5"))
+VAD_PADDING_MS = float(os.getenv("VAD_PADDING_MS", "300"))
+VAD_HANGOVER_MS = float(os.getenv("VAD_HANGOVER_MS", "300"))
+VAD_TAIL_MS = float(os.getenv("VAD_TAIL_MS", "1000"))
+
+DETECT_RATE = 16000
+
+
+class SileroDetector:
+    """Speech probability per 32 ms window at 16 kHz, from Silero's ONNX model."""
+
+    window = 512
+
+    def __init__(self) -> None:
+        from livekit.plugins.silero import onnx_model
+
+        self._model = onnx_model.OnnxModel(
+            onnx_session=onnx_model.new_inference_session(force_cpu=True), sample_rate=DETECT_RATE)
+
+    def probability(self, samples: np.ndarray) -> float:
+        return self._model(samples.astype(np.float32) / 32768.0)
+
+
+class EnergyDetector:
+    """Fallback detector: 1.0 for windows louder than `min_rms`, else 0.0."""
+
+    window = 512
+
+    def __init__(self, min_rms: float = 300.0) -> None:
+        self.min_rms = min_rms
+
+    def probability(self, samples: np.ndarray) -> float:
+        rms = math.sqrt(float(np.dot(samples, samples.astype(np.float64))) / len(samples))
+        return 1.0 if rms >= self.min_rms else 0.0
+
+
+def create_detector():
+    try:
+        return SileroDetector()
+    except Exception as e:
+        logging.warning(f"Silero VAD unavailable ({e}); gating on audio energy instead")
+        return EnergyDetector()
+
+
+class SilenceGate:
+    """
+    Decides which frames go upstream, given whether each one holds speech.
+    Pure bookkeeping: no audio analysis, no I/O.
+    """
+
+    def __init__(self, padding_ms: float = VAD_PADDING_MS, hangover_ms: float = VAD_HANGOVER_MS,
+                 tail_ms: float = VAD_TAIL_MS) -> None:
+        self.padding_ms = padding_ms
+        self.hangover_ms = hangover_ms
+        self.tail_ms = tail_ms
+        self._held: deque = deque()
+        self._held_ms = 0.0
+        self._hangover_left = 0.0
+        self.speaking = False
+        self.frames_in = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.tail_frames = 0
+        self.bytes_in = 0
+        self.bytes_sent = 0
+
+    def push(self, frame: rtc.AudioFrame, speech: bool) -> list:
+        """Frames to send upstream for this input frame, in order (possibly none)."""
+        self.frames_in += 1
+        self.bytes_in += len(frame.data) * 2
+        duration_ms = frame.duration * 1000
+        if speech:
+            self._hangover_left = self.hangover_ms
+            if not self.speaking:
+                self.speaking = True
+                out = list(self._held) + [frame]
+                self._held.clear()
+                self._held_ms = 0.0
+                return self._sent(out)
+            return self._sent([frame])
+        if self.speaking:
+            self._hangover_left -= duration_ms
+            if self._hangover_left > 0:
+                return self._sent([frame])
+            # Speech is over: close the turn with a burst of silence, then go quiet
+            self.speaking = False
+            out = [frame] + self._tail_like(frame)
+            self.tail_frames += len(out) - 1
+            return self._sent(out)
+        self._held.append(frame)
+        self._held_ms += duration_ms
+        while self._held and self._held_ms - self._held[0].duration * 1000 >= self.padding_ms:
+            self._held_ms -= self._held.popleft().duration * 1000
+            self.frames_dropped += 1
+        return []
+
+    def _tail_like(self, frame: rtc.AudioFrame) -> list:
+        if self.tail_ms <= 0:
+            return []
+        count = max(1, round(self.tail_ms / (frame.duration * 1000)))
+        silence = rtc.AudioFrame(bytes(len(frame.data) * 2), frame.sample_rate, frame.num_channels,
+                                 frame.samples_per_channel)
+        return [silence] * count
+
+    def _sent(self, frames: list) -> list:
+        self.frames_sent += len(frames)
+        self.bytes_sent += sum(len(f.data) * 2 for f in frames)
+        return frames
+
+    def stats(self) -> dict:
+        return {
+            "frames_in": self.frames_in,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "tail_frames": self.tail_frames,
+            "bytes_saved": self.bytes_in - self.bytes_sent,
+            "saved_percent": round(100 * (1 - self.bytes_sent / self.bytes_in), 1) if self.bytes_in else 0.0,
+        }
+
+    def prometheus_lines(self) -> list:
+        return [
+            "# HELP nevira_vad_frames_total Input audio frames by what the voice gate did with them.",
+            "# TYPE nevira_vad_frames_total counter",
+            f'nevira_vad_frames_total{{outcome="sent"}} {self.frames_sent - self.tail_frames}',
+            f'nevira_vad_frames_total{{outcome="dropped"}} {self.frames_dropped}',
+            "# HELP nevira_vad_tail_frames_total Silence frames sent to close a turn.",
+            "# TYPE nevira_vad_tail_frames_total counter",
+            f"nevira_vad_tail_frames_total {self.tail_frames}",
+            "# HELP nevira_vad_bytes_saved_total Audio bytes not sent to the model.",
+            "# TYPE nevira_vad_bytes_saved_total counter",
+            f"nevira_vad_bytes_saved_total {self.bytes_in - self.bytes_sent}",
+        ]
+
+
+class VoiceActivity:
+    """
+    Running speech/no-speech state for a stream of frames. Frames are
+    resampled to 16 kHz mono and windowed; each full window is classified
+    on a worker thread.
+    """
+
+    def __init__(self, detector=None, threshold: float = VAD_THRESHOLD) -> None:
+        self.detector = detector or create_detector()
+        self.threshold = threshold
+        self.speech = False
+        self._resampler: Optional[rtc.AudioResampler] = None
+        self._rate: Optional[int] = None
+        self._pending = np.zeros(0, dtype=np.int16)
+        # One thread keeps Silero's recurrent state in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vad")
+
+    def _to_detect_rate(self, frame: rtc.AudioFrame) -> np.ndarray:
+        samples = np.frombuffer(frame.data, dtype=np.int16)
+        if frame.num_channels > 1:
+            samples = samples.reshape(-1, frame.num_channels).mean(axis=1).astype(np.int16)
+        if frame.sample_rate == DETECT_RATE:
+            return samples
+        if self._rate != frame.sample_rate:
+            self._resampler = rtc.AudioResampler(frame.sample_rate, DETECT_RATE)
+            self._rate = frame.sample_rate
+        mono = rtc.AudioFrame(samples.tobytes(), frame.sample_rate, 1, len(samples))
+        out = [np.frombuffer(f.data, dtype=np.int16) for f in self._resampler.push(mono)]
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.int16)
+
+    def _classify(self, windows: list) -> bool:
+        return max(self.detector.probability(w) for w in windows) >= self.threshold
+
+    async def update(self, frame: rtc.AudioFrame) -> bool:
+        """Feed a frame; returns whether the latest full window held speech."""
+        self._pending = np.concatenate((self._pending, self._to_detect_rate(frame)))
+        size = self.detector.window
+        if len(self._pending) >= size:
+            count = len(self._pending) // size
+            windows = [self._pending[i * size:(i + 1) * size] for i in range(count)]
+            self._pending = self._pending[count * size:]
+            self.speech = await asyncio.get_running_loop().run_in_executor(self._executor, self._classify, windows)
+        return self.speech
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class GatedAudioInput(io.AudioInput):
+    """Session audio input that only yields what the SilenceGate lets through."""
+
+    def __init__(self, source: io.AudioInput, activity: Optional[VoiceActivity] = None,
+                 gate: Optional[SilenceGate] = None) -> None:
+        super().__init__(label="VoiceGate", source=source)
+        self.activity = activity or VoiceActivity()
+        self.gate = gate or SilenceGate()
+        self._ready: deque = deque()
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        while not self._ready:
+            frame = await self.source.__anext__()
+            self._ready.extend(self.gate.push(frame, await self.activity.update(frame)))
+        return self._ready.popleft()
+
+    def close(self) -> None:
+        self.activity.close()
+
+
+def install(session, detector=None) -> Optional[GatedAudioInput]:
+    """
+    Put the gate in front of a started session's audio input and export its
+    counters on /metrics.
+
+    Args:
+        session: The started AgentSession
+        detector: Speech detector from create_detector(), built ahead of time
+            (prewarm) since loading Silero blocks; built here if None
+
+    Returns:
+        The gated input, or None if suppression is off or there's no audio input
+    """
+    if not VAD_SUPPRESSION or session.input.audio is None:
+        return None
+    gated = GatedAudioInput(session.input.audio, VoiceActivity(detector))
+    session.input.audio = gated
+    tool_metrics.register_collector("voice_gate", gated.gate.stats, gated.gate.prometheus_lines)
+    return gated
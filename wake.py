@@ -0,0 +1,490 @@
+"""
+Wake-word gated activation.
+
+With WAKE_MODE on, a job no longer opens the realtime session as soon as it
+starts. Instead a local listener runs on Boss's microphone track (or the
+local microphone) and only starts an AgentSession when the wake word is
+heard or the hotkey is pressed. Until then no audio leaves the process. The
+session is torn down again after AGENT_TIMEOUT_SECONDS without speech from
+either side, and the listener goes back to waiting.
+
+The listener is built to cost a few percent of one core:
+- Audio is taken at 16 kHz mono in 32 ms frames (Porcupine's native format).
+- An adaptive energy gate skips the detector entirely while the room is
+  quiet. When speech starts, the last few frames are replayed so the start
+  of the wake word isn't lost.
+- Detection runs on its own thread, never on the event loop.
+- Detection pauses while a session is active.
+
+On a trigger the session is started immediately. The realtime connection
+is opened while the acknowledgement is being prepared, rather than after
+it.
+
+Porcupine (pvporcupine) needs PICOVOICE_ACCESS_KEY. WAKE_WORDS takes
+built-in keyword names or paths to custom .ppn files, comma separated.
+The hotkey uses pynput. ToneDetector is a dependency-free stand-in that
+fires on a sustained tone, used by the tests and the benchmark.
+"""
+import asyncio
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+import numpy as np
+
+WAKE_MODE = os.getenv("WAKE_MODE", "false").lower() in ("1", "true", "yes")
+PICOVOICE_ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY", "")
+WAKE_WORDS = [w.strip() for w in os.getenv("WAKE_WORDS", "jarvis").split(",") if w.strip()]
+WAKE_WORD_SENSITIVITY = float(os.getenv("WAKE_WORD_SENSITIVITY", "0.5"))
+# pynput hotkey syntax; empty disables the hotkey
+WAKE_HOTKEY = os.getenv("WAKE_HOTKEY", "<ctrl>+<alt>+n")
+# "room" listens to the participant's microphone track, "microphone" to this machine's
+WAKE_SOURCE = os.getenv("WAKE_SOURCE", "room")
+AGENT_TIMEOUT_SECONDS = float(os.getenv("AGENT_TIMEOUT_SECONDS", "60"))
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512
+
+
+class ToneDetector:
+    """
+    Stand-in wake word: fires after `frames_needed` consecutive frames whose
+    energy is mostly at `frequency` (Goertzel filter). For tests and benchmarks.
+    """
+
+    def __init__(self, frequency: float = 1000.0, threshold: float = 0.6, frames_needed: int = 8) -> None:
+        self.sample_rate = SAMPLE_RATE
+        self.frame_length = FRAME_LENGTH
+        self.keywords = ["tone"]
+        self.threshold = threshold
+        self.frames_needed = frames_needed
+        # Every other sample is plenty below 4 kHz, so the filter runs at half rate
+        self._coeff = 2 * math.cos(2 * math.pi * frequency / (SAMPLE_RATE / 2))
+        self._run = 0
+
+    def process(self, frame: np.ndarray) -> int:
+        """Keyword index, or -1 (Porcupine's interface)."""
+        samples = frame[::2].astype(np.float64)
+        s_prev = s_prev2 = 0.0
+        coeff = self._coeff
+        for x in samples.tolist():
+            s_prev, s_prev2 = x + coeff * s_prev - s_prev2, s_prev
+        power = s_prev2 ** 2 + s_prev ** 2 - coeff * s_prev * s_prev2
+        # Power a pure tone with this frame's energy would give
+        total = float(np.dot(samples, samples)) * len(samples) / 2
+        ratio = power / total if total else 0.0
+        if ratio < self.threshold:
+            self._run = 0
+            return -1
+        # Fires once per tone, however long it is held
+        self._run += 1
+        return 0 if self._run == self.frames_needed else -1
+
+    def delete(self) -> None:
+        pass
+
+
+def create_porcupine(access_key: str = PICOVOICE_ACCESS_KEY, words: list = WAKE_WORDS,
+                     sensitivity: float = WAKE_WORD_SENSITIVITY):
+    """
+    Porcupine for the configured words. Built-in names and .ppn paths can be
+    mixed; unknown names are skipped with a warning.
+
+    Raises:
+        ValueError: if no key is set or none of the words can be used
+    """
+    import pvporcupine
+
+    if not access_key:
+        raise ValueError("PICOVOICE_ACCESS_KEY is not set")
+    paths, names = [], []
+    for word in words:
+        if word.endswith(".ppn") and os.path.exists(word):
+            paths.append(word)
+            names.append(os.path.splitext(os.path.basename(word))[0])
+        elif word.lower() in pvporcupine.KEYWORDS:
+            paths.append(pvporcupine.KEYWORD_PATHS[word.lower()])
+            names.append(word.lower())
+        else:
+            logging.warning(f"Wake word '{word}' is not built in and has no .ppn file; skipping it")
+    if not paths:
+        raise ValueError(f"None of the wake words {words} can be used")
+    detector = pvporcupine.create(access_key=access_key, keyword_paths=paths, sensitivities=[sensitivity] * len(paths))
+    detector.keywords = names
+    return detector
+
+
+class EnergyGate:
+    """
+    Lets frames through only around speech, judged against an adaptive
+    noise floor. When it opens, the frames just before are released too.
+    """
+
+    def __init__(self, ratio: float = 3.0, min_rms: float = 150.0, preroll: int = 12, hangover: int = 15) -> None:
+        """
+        Args:
+            ratio: How far above the noise floor (RMS) counts as speech (3 is about +10 dB)
+            min_rms: RMS below which a frame is never speech (int16 scale)
+            preroll: Frames released from before the opening
+            hangover: Frames the gate stays open after the last loud frame
+        """
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.hangover = hangover
+        self.floor: Optional[float] = None
+        self._recent: deque = deque(maxlen=preroll)
+        self._open_for = 0
+
+    def push(self, frame: np.ndarray) -> list:
+        """Frames to run the detector on (possibly none)."""
+        rms = math.sqrt(float(np.dot(frame, frame.astype(np.float64))) / len(frame))
+        if self.floor is None:
+            self.floor = rms
+        loud = rms >= self.min_rms and rms >= self.floor * self.ratio
+        # The floor follows quiet stretches quickly and loud ones very slowly
+        self.floor += (rms - self.floor) * (0.05 if rms < self.floor or not loud else 0.001)
+        if loud:
+            released = list(self._recent) if self._open_for == 0 else []
+            self._recent.clear()
+            self._open_for = self.hangover
+            return released + [frame]
+        if self._open_for > 0:
+            self._open_for -= 1
+            return [frame]
+        self._recent.append(frame)
+        return []
+
+
+class WakeListener:
+    """Runs the gate and detector on a worker thread over frames fed from anywhere."""
+
+    def __init__(
+        self,
+        detector,
+        on_wake: Callable[[str], None],
+        gate: Optional[EnergyGate] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        max_queue: int = 64,
+    ) -> None:
+        """
+        Args:
+            detector: Porcupine-like object (process(frame) -> index, keywords, frame_length)
+            on_wake: Called on the event loop with the keyword that fired
+            gate: Energy gate in front of the detector (None runs it on every frame)
+            loop: Loop to call on_wake on (the running loop by default)
+            max_queue: Frames buffered before the oldest are dropped
+        """
+        self.detector = detector
+        self.on_wake = on_wake
+        self.gate = gate
+        self.loop = loop
+        self.paused = False
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._thread: Optional[threading.Thread] = None
+        self.frames = 0
+        self.detected_frames = 0
+        self.detections = 0
+        self.dropped = 0
+        self.cpu_seconds = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.loop = self.loop or asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._run, name="wake-listener", daemon=True)
+        self._thread.start()
+
+    def feed(self, pcm) -> None:
+        """Queue 16 kHz mono int16 audio of any length. Thread-safe, never blocks."""
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        self._pending = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        size = self.detector.frame_length
+        while len(self._pending) >= size:
+            frame, self._pending = self._pending[:size], self._pending[size:]
+            try:
+                self._queue.put_nowait(frame)
+            except queue.Full:
+                self.dropped += 1
+
+    def process(self, frame: np.ndarray) -> Optional[str]:
+        """Gate and detect one frame. Blocking; the listener thread calls this."""
+        self.frames += 1
+        if self.paused:
+            return None
+        keyword = None
+        for candidate in (self.gate.push(frame) if self.gate is not None else [frame]):
+            self.detected_frames += 1
+            index = self.detector.process(candidate)
+            if index >= 0 and keyword is None:
+                keyword = self.detector.keywords[index]
+        if keyword is not None:
+            self.detections += 1
+        return keyword
+
+    def _run(self) -> None:
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            start = time.thread_time()
+            keyword = self.process(frame)
+            self.cpu_seconds += time.thread_time() - start
+            if keyword is not None:
+                logging.info(f"Wake word '{keyword}' detected")
+                try:
+                    self.loop.call_soon_threadsafe(self.on_wake, keyword)
+                except RuntimeError:
+                    return  # the loop is gone
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.detector.delete()
+
+    def stats(self) -> dict:
+        audio_seconds = self.frames * self.detector.frame_length / self.detector.sample_rate
+        return {
+            "frames": self.frames,
+            "detected_frames": self.detected_frames,
+            "detections": self.detections,
+            "dropped": self.dropped,
+            "cpu_percent": round(100 * self.cpu_seconds / audio_seconds, 2) if audio_seconds else 0.0,
+        }
+
+
+class ActivationController:
+    """
+    Starts the session on a trigger and stops it after a stretch of idleness.
+    Triggers while a session is up only count as activity.
+    """
+
+    def __init__(
+        self,
+        start_fn: Callable[[], Awaitable[Any]],
+        stop_fn: Callable[[Any], Awaitable[None]],
+        idle_timeout: float = AGENT_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            start_fn: Starts a session and returns it
+            stop_fn: Tears a session down
+            idle_timeout: Seconds without activity before the session is stopped
+            clock: Time source
+        """
+        self.start_fn = start_fn
+        self.stop_fn = stop_fn
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.state = "idle"
+        self.session: Any = None
+        self._last_activity = clock()
+        self._task: Optional[asyncio.Task] = None
+        self._retrigger: Optional[str] = None
+        self._ended = asyncio.Event()
+        self.listeners: list = []
+        self.activations = 0
+        self.activation_seconds: deque = deque(maxlen=50)
+
+    @property
+    def active(self) -> bool:
+        return self.state != "idle"
+
+    def touch(self) -> None:
+        """Record activity, pushing the idle teardown back."""
+        self._last_activity = self.clock()
+
+    def end(self) -> None:
+        """The session closed by itself (Boss said goodbye): go back to listening now."""
+        if self.state in ("starting", "active"):
+            self._ended.set()
+
+    def trigger(self, source: str) -> None:
+        """Wake word or hotkey fired. Call on the event loop."""
+        self.touch()
+        if self.state == "idle":
+            self.state = "starting"
+            self._ended.clear()
+            self._set_paused(True)
+            self._task = asyncio.create_task(self._lifecycle(source))
+        elif self.state == "stopping":
+            self._retrigger = source
+
+    def _set_paused(self, paused: bool) -> None:
+        for listener in self.listeners:
+            listener.paused = paused
+
+    async def _lifecycle(self, source: str) -> None:
+        started = self.clock()
+        try:
+            self.session = await self.start_fn()
+        except Exception as e:
+            logging.error(f"Could not start the session after '{source}': {e}")
+            self.state = "idle"
+            self._set_paused(False)
+            return
+        self.activations += 1
+        self.activation_seconds.append(self.clock() - started)
+        logging.info(f"Session started by '{source}' in {(self.clock() - started) * 1000:.0f} ms")
+        self.state = "active"
+        self.touch()
+        try:
+            while not self._ended.is_set():
+                remaining = self.idle_timeout - (self.clock() - self._last_activity)
+                if remaining <= 0:
+                    logging.info(f"No activity for {self.idle_timeout:.0f} s; going back to listening")
+                    break
+                try:
+                    await asyncio.wait_for(self._ended.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._teardown()
+        if self._retrigger is not None:
+            source, self._retrigger = self._retrigger, None
+            self.trigger(source)
+
+    async def _teardown(self) -> None:
+        self.state = "stopping"
+        try:
+            await self.stop_fn(self.session)
+        except Exception as e:
+            logging.warning(f"Stopping the session failed: {e}")
+        self.session = None
+        self.state = "idle"
+        self._set_paused(False)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        times = sorted(self.activation_seconds)
+        return {
+            "state": self.state,
+            "activations": self.activations,
+            "activation_ms_p50": round(times[len(times) // 2] * 1000, 1) if times else None,
+        }
+
+
+async def feed_room_audio(room, listener: WakeListener) -> None:
+    """Feed the first remote microphone track into the listener, resampled to 16 kHz mono."""
+    from livekit import rtc
+
+    while True:
+        participant = next((p for p in room.remote_participants.values()
+                            if any(pub.source == rtc.TrackSource.SOURCE_MICROPHONE for pub in p.track_publications.values())),
+                           None)
+        if participant is None:
+            await asyncio.sleep(0.5)
+            continue
+        stream = rtc.AudioStream.from_participant(
+            participant=participant, track_source=rtc.TrackSource.SOURCE_MICROPHONE,
+            sample_rate=SAMPLE_RATE, num_channels=1, frame_size_ms=32,
+        )
+        try:
+            async for event in stream:
+                listener.feed(event.frame.data)
+        finally:
+            await stream.aclose()
+
+
+def open_microphone(listener: WakeListener):
+    """Feed this machine's default microphone into the listener (sounddevice)."""
+    import sounddevice as sd
+
+    stream = sd.RawInputStream(
+        samplerate=SAMPLE_RATE, channels=1, dtype="int16", blocksize=FRAME_LENGTH,
+        callback=lambda data, frames, time_info, status: listener.feed(bytes(data)),
+    )
+    stream.start()
+    return stream
+
+
+def start_hotkey(combo: str, fire: Callable[[], None]):
+    """Global hotkey (pynput). Returns the running listener."""
+    from pynput import keyboard
+
+    hotkeys = keyboard.GlobalHotKeys({combo: fire})
+    hotkeys.start()
+    return hotkeys
+
+
+class WakeService:
+    """Everything wake mode runs for one job: the controller, the listener, its audio feed and the hotkey."""
+
+    def __init__(self, controller: ActivationController) -> None:
+        self.controller = controller
+        self.listener: Optional[WakeListener] = None
+        self._feed: Optional[asyncio.Task] = None
+        self._microphone = None
+        self._hotkey = None
+
+    async def start(self, room, detector=None) -> None:
+        loop = asyncio.get_running_loop()
+        if detector is None:
+            try:
+                detector = create_porcupine()
+            except Exception as e:
+                logging.warning(f"Wake word detection unavailable ({e}); only the hotkey will wake the assistant")
+        if detector is not None:
+            self.listener = WakeListener(detector, self.controller.trigger, EnergyGate(), loop)
+            self.controller.listeners.append(self.listener)
+            self.listener.start()
+            if WAKE_SOURCE == "microphone":
+                self._microphone = open_microphone(self.listener)
+            else:
+                self._feed = asyncio.create_task(feed_room_audio(room, self.listener))
+        if WAKE_HOTKEY:
+            try:
+                self._hotkey = start_hotkey(WAKE_HOTKEY, lambda: loop.call_soon_threadsafe(self.controller.trigger, "hotkey"))
+            except Exception as e:
+                logging.warning(f"Wake hotkey unavailable: {e}")
+        if self.listener is None and self._hotkey is None:
+            logging.error("Wake mode has neither a wake word nor a hotkey; starting the session right away")
+            self.controller.trigger("startup")
+
+    async def close(self) -> None:
+        if self._feed is not None:
+            self._feed.cancel()
+            try:
+                await self._feed
+            except asyncio.CancelledError:
+                pass
+        if self._microphone is not None:
+            self._microphone.close()
+        if self._hotkey is not None:
+            self._hotkey.stop()
+        if self.listener is not None:
+            await asyncio.to_thread(self.listener.stop)
+        await self.controller.close()
+
+    def stats(self) -> dict:
+        return {**self.controller.stats(), **(self.listener.stats() if self.listener else {})}
+
+    def prometheus_lines(self) -> list:
+        stats = self.stats()
+        return [
+            "# HELP nevira_wake_activations_total Sessions started by the wake word or hotkey.",
+            "# TYPE nevira_wake_activations_total counter",
+            f"nevira_wake_activations_total {stats['activations']}",
+            "# HELP nevira_wake_listener_cpu_percent Wake listener CPU time as a percentage of audio time.",
+            "# TYPE nevira_wake_listener_cpu_percent gauge",
+            f"nevira_wake_listener_cpu_percent {stats.get('cpu_percent', 0.0)}",
+            "# HELP nevira_wake_session_active Whether a session is currently up.",
+            "# TYPE nevira_wake_session_active gauge",
+            f"nevira_wake_session_active {int(self.controller.active)}",
+        ]
@@ -0,0 +1,337 @@
+"""
+Weather lookups behind get_weather, with a local forecast store.
+
+A provider answers "what's the weather in <city>" with one line of text.
+WttrProvider asks wttr.in (WEATHER_URL) through the shared HTTP client;
+LocalProvider answers from a dict or JSON file and stands in for it in
+tests and offline setups (WEATHER_PROVIDER=local, WEATHER_LOCAL_PATH).
+
+Every report is saved in an SQLite store keyed by normalized city and
+hour. A lookup is answered from the store while its newest report is
+fresher than WEATHER_MAX_AGE; otherwise the provider is asked, and if it
+fails or times out an older stored report (up to WEATHER_MAX_STALE) is
+used instead. The store also counts which cities are asked about, and a
+background refresher keeps the most frequent ones fresh so they are
+answered without waiting on the network.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import quote
+
+import http_client
+import tool_metrics
+from cache import normalize_key
+
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "wttr")
+# Base URL for wttr.in lookups (override to point at a local stand-in)
+WEATHER_URL = os.getenv("WEATHER_URL", "https://wttr.in")
+WEATHER_LOCAL_PATH = os.getenv("WEATHER_LOCAL_PATH", "")
+WEATHER_DB = os.getenv("WEATHER_DB", os.path.join(os.path.expanduser("~"), ".nevira", "weather.sqlite3"))
+# Stored reports younger than this are answered without asking the provider
+WEATHER_MAX_AGE = float(os.getenv("WEATHER_MAX_AGE", "1800"))
+# Stored reports up to this old are used when the provider can't answer
+WEATHER_MAX_STALE = float(os.getenv("WEATHER_MAX_STALE", "21600"))
+WEATHER_PROVIDER_TIMEOUT = float(os.getenv("WEATHER_PROVIDER_TIMEOUT", "4"))
+# Background prefetch of the most asked-about cities (0 disables)
+WEATHER_REFRESH_SECONDS = float(os.getenv("WEATHER_REFRESH_SECONDS", "900"))
+WEATHER_PREFETCH_CITIES = int(os.getenv("WEATHER_PREFETCH_CITIES", "5"))
+
+
+class Report(NamedTuple):
+    city: str
+    text: str
+    # Which provider produced the report
+    source: str
+    fetched_at: float
+    # True if answered from the store rather than a live provider call
+    stored: bool = False
+
+
+class WttrProvider:
+    """One-line reports from wttr.in (format=3)."""
+
+    name = "wttr.in"
+
+    def __init__(self, base_url: str = WEATHER_URL) -> None:
+        self.base_url = base_url
+
+    async def fetch(self, city: str) -> Optional[str]:
+        status, text = await http_client.fetch_text(f"{self.base_url}/{quote(city)}", params={"format": "3"})
+        if status != 200:
+            logging.error(f"Failed to get weather for {city}: {status}")
+            return None
+        return text.strip()
+
+
+class LocalProvider:
+    """Answers from fixed reports (city -> text). For tests and offline use."""
+
+    name = "local"
+
+    def __init__(self, reports: Optional[dict] = None, delay: float = 0.0) -> None:
+        self.reports = {normalize_key(city): text for city, text in (reports or {}).items()}
+        self.delay = delay
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "LocalProvider":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    async def fetch(self, city: str) -> Optional[str]:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.reports.get(normalize_key(city))
+
+
+class ForecastStore:
+    """SQLite store of reports keyed by (city, hour), plus per-city request counts."""
+
+    def __init__(self, path: str = WEATHER_DB) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Used from worker threads; the lock serializes access
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS forecasts ("
+                " city TEXT NOT NULL, hour INTEGER NOT NULL, report TEXT NOT NULL,"
+                " source TEXT NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (city, hour))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS requests ("
+                " city TEXT PRIMARY KEY, name TEXT NOT NULL, count INTEGER NOT NULL, last_asked REAL NOT NULL)"
+            )
+
+    def put(self, report: Report) -> None:
+        key = normalize_key(report.city)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?)",
+                (key, int(report.fetched_at // 3600), report.text, report.source, report.fetched_at),
+            )
+
+    def latest(self, city: str) -> Optional[Report]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT report, source, fetched_at FROM forecasts WHERE city = ? ORDER BY hour DESC LIMIT 1",
+                (normalize_key(city),),
+            ).fetchone()
+        return Report(city, row[0], row[1], row[2], stored=True) if row else None
+
+    def record_requests(self, counts: dict, now: float) -> None:
+        """Add request counts (display name -> times asked)."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO requests VALUES (?, ?, ?, ?) ON CONFLICT(city) DO UPDATE"
+                " SET count = count + excluded.count, last_asked = excluded.last_asked, name = excluded.name",
+                [(normalize_key(name), name, count, now) for name, count in counts.items()],
+            )
+
+    def frequent(self, limit: int, since: float) -> list:
+        """Names of the most asked-about cities asked about since `since`."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name FROM requests WHERE last_asked >= ? ORDER BY count DESC, last_asked DESC LIMIT ?",
+                (since, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self, before: float) -> int:
+        """Delete reports fetched before `before`. Returns how many went."""
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM forecasts WHERE fetched_at < ?", (before,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class WeatherService:
+    def __init__(
+        self,
+        provider=None,
+        store: Optional[ForecastStore] = None,
+        max_age: float = WEATHER_MAX_AGE,
+        max_stale: float = WEATHER_MAX_STALE,
+        timeout: float = WEATHER_PROVIDER_TIMEOUT,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            provider: Object with a `name` and `async fetch(city) -> Optional[str]`
+            store: Where reports and request counts are kept
+            max_age: Seconds a stored report is answered without asking the provider
+            max_stale: Seconds a stored report may be used when the provider fails
+            timeout: Seconds to wait for the provider
+            clock: Wall-clock time source (reports outlive the process)
+        """
+        self.provider = provider or WttrProvider()
+        self.store = store or ForecastStore()
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.clock = clock
+        self._asked: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self.fresh_hits = 0
+        self.fetched = 0
+        self.stale_fallbacks = 0
+        self.failures = 0
+        self.prefetched = 0
+
+    async def _fetch(self, city: str) -> Optional[Report]:
+        try:
+            text = await asyncio.wait_for(self.provider.fetch(city), self.timeout)
+        except Exception as e:
+            logging.warning(f"Weather provider {self.provider.name} failed for {city}: {e}")
+            return None
+        if not text:
+            return None
+        report = Report(city, text, self.provider.name, self.clock())
+        await asyncio.to_thread(self.store.put, report)
+        return report
+
+    async def lookup(self, city: str) -> Optional[Report]:
+        """The freshest report available for a city, or None if there is none."""
+        self._asked[city.strip()] += 1
+        stored = await asyncio.to_thread(self.store.latest, city)
+        if stored is not None and self.clock() - stored.fetched_at <= self.max_age:
+            self.fresh_hits += 1
+            return stored
+        report = await self._fetch(city)
+        if report is not None:
+            self.fetched += 1
+            return report
+        if stored is not None and self.clock() - stored.fetched_at <= self.max_stale:
+            self.stale_fallbacks += 1
+            return stored
+        self.failures += 1
+        return None
+
+    async def refresh_frequent(self, limit: int = WEATHER_PREFETCH_CITIES) -> int:
+        """
+        Persist request counts and refetch the most asked-about cities whose
+        stored report is past half its freshness window.
+
+        Returns:
+            How many cities were refreshed
+        """
+        now = self.clock()
+        counts, self._asked = dict(self._asked), Counter()
+        if counts:
+            await asyncio.to_thread(self.store.record_requests, counts, now)
+        cities = await asyncio.to_thread(self.store.frequent, limit, now - 7 * 86400)
+        refreshed = 0
+        for city in cities:
+            stored = await asyncio.to_thread(self.store.latest, city)
+            if stored is not None and now - stored.fetched_at < self.max_age / 2:
+                continue
+            if await self._fetch(city) is not None:
+                refreshed += 1
+        await asyncio.to_thread(self.store.prune, now - self.max_stale)
+        self.prefetched += refreshed
+        return refreshed
+
+    def start(self, interval: float = WEATHER_REFRESH_SECONDS) -> None:
+        if interval <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                refreshed = await self.refresh_frequent()
+                if refreshed:
+                    logging.info(f"Prefetched weather for {refreshed} cities")
+            except Exception as e:
+                logging.warning(f"Weather prefetch failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._asked:
+            await asyncio.to_thread(self.store.record_requests, dict(self._asked), self.clock())
+            self._asked.clear()
+        self.store.close()
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider.name,
+            "fresh_hits": self.fresh_hits,
+            "fetched": self.fetched,
+            "stale_fallbacks": self.stale_fallbacks,
+            "failures": self.failures,
+            "prefetched": self.prefetched,
+        }
+
+    def prometheus_lines(self) -> list:
+        return [
+            "# HELP nevira_weather_reports_total Weather reports by where they came from.",
+            "# TYPE nevira_weather_reports_total counter",
+            f'nevira_weather_reports_total{{source="store"}} {self.fresh_hits}',
+            f'nevira_weather_reports_total{{source="provider"}} {self.fetched}',
+            f'nevira_weather_reports_total{{source="stale"}} {self.stale_fallbacks}',
+            "# HELP nevira_weather_failures_total Requests with no live or stored report.",
+            "# TYPE nevira_weather_failures_total counter",
+            f"nevira_weather_failures_total {self.failures}",
+            "# HELP nevira_weather_prefetched_total Reports fetched ahead of a request.",
+            "# TYPE nevira_weather_prefetched_total counter",
+            f"nevira_weather_prefetched_total {self.prefetched}",
+        ]
+
+
+def describe(report: Report, now: Optional[float] = None) -> str:
+    """The report with where it came from and how old it is."""
+    age = max(0.0, (now if now is not None else time.time()) - report.fetched_at)
+    if age < 60:
+        age_text = "just now"
+    elif age < 3600:
+        minutes = int(age // 60)
+        age_text = f"{minutes} minute{'s' if minutes != 1 else ''} old"
+    else:
+        hours = int(age // 3600)
+        age_text = f"{hours} hour{'s' if hours != 1 else ''} old"
+    source = f"saved {report.source} report" if report.stored else f"live from {report.source}"
+    return f"{report.text} ({source}, {age_text})"
+
+
+def build_provider():
+    if WEATHER_PROVIDER == "local":
+        return LocalProvider.from_file(WEATHER_LOCAL_PATH) if WEATHER_LOCAL_PATH else LocalProvider()
+    return WttrProvider()
+
+
+_service: Optional[WeatherService] = None
+
+
+def get_service() -> WeatherService:
+    """Return the shared weather service, creating it on first use."""
+    global _service
+    if _service is None:
+        _service = WeatherService(build_provider())
+        tool_metrics.register_collector("weather", _service.stats, _service.prometheus_lines)
+    return _service
+
+
+async def close() -> None:
+    """Stop the prefetcher and close the forecast store."""
+    global _service
+    if _service is not None:
+        await _service.close()
+        _service = None
@@ -0,0 +1,299 @@
+"""
+Bounded worker pool for the synchronous DDGS search client.
+
+The DDGS client blocks, so search_web must never call it on the event loop.
+SearchPool runs a query as one job per search backend on a fixed-size
+thread pool, collects results as each backend finishes, and stops at a
+per-call deadline with whatever has arrived so far. Cancelling the calling
+task (e.g. the user interrupts the turn) drops queued jobs; a job that is
+already running finishes in its thread but its results are discarded.
+
+SearchPool.stream() exposes the same search progressively, so a caller can
+act on the first backends' results while the others are still running.
+
+Only the duckduckgo backend is queried by default. Listing more in
+SEARCH_BACKENDS fans every search out to all of them: results can arrive
+sooner, but each search costs one request and one worker thread per backend.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from typing import Callable, Optional
+
+# Searches expected to run at once; the pool gets a thread per backend for each
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+# Worker threads; 0 (the default) sizes the pool from the backends and SEARCH_CONCURRENCY
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "0"))
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "6"))
+# Comma-separated ddgs text backends, queried in parallel (e.g. duckduckgo,brave,mojeek,wikipedia)
+SEARCH_BACKENDS = [b.strip() for b in os.getenv("SEARCH_BACKENDS", "duckduckgo").split(",") if b.strip()]
+
+
+def default_workers(backends: list, concurrency: int = SEARCH_CONCURRENCY, configured: int = SEARCH_WORKERS) -> int:
+    """Threads for `concurrency` searches across every backend, or SEARCH_WORKERS if that is larger."""
+    return max(configured, len(backends) * concurrency, 1)
+
+
+def _ddgs_text(query: str, backend: str, max_results: int, timeout: float) -> list:
+    """Run one blocking DDGS text search against a single backend."""
+    from ddgs import DDGS
+    from ddgs.exceptions import DDGSException
+
+    try:
+        with DDGS(timeout=max(1, int(timeout))) as ddgs:
+            return list(ddgs.text(query, max_results=max_results, backend=backend))
+    except DDGSException as e:
+        # ddgs raises when a backend has nothing for the query
+        logging.info(f"Search backend '{backend}' returned no results: {e}")
+        return []
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SearchPool:
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        backends: Optional[list] = None,
+        search_fn: Optional[Callable[[str, str, int, float], list]] = None,
+        latency_window: int = 256,
+    ) -> None:
+        """
+        Args:
+            max_workers: Number of worker threads (default_workers(backends) if None)
+            backends: ddgs backends to query per search
+            search_fn: Blocking search function (query, backend, max_results, timeout) -> results
+            latency_window: Number of recent search latencies kept for percentiles
+        """
+        self.backends = backends or SEARCH_BACKENDS
+        self.max_workers = max_workers or default_workers(self.backends)
+        self._search_fn = search_fn or _ddgs_text
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search")
+        self._lock = threading.Lock()
+        self._job_ids = count()
+        self._queued: set = set()
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._first_result_latencies: deque = deque(maxlen=latency_window)
+        self.running = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Backend jobs submitted but not yet picked up by a worker."""
+        return len(self._queued)
+
+    def _run_job(self, job_id: int, query: str, backend: str, max_results: int, timeout: float) -> list:
+        with self._lock:
+            self._queued.discard(job_id)
+            self.running += 1
+        try:
+            return self._search_fn(query, backend, max_results, timeout)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _submit(self, query: str, backend: str, max_results: int, timeout: float) -> tuple[int, asyncio.Future]:
+        job_id = next(self._job_ids)
+        with self._lock:
+            self._queued.add(job_id)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._run_job, job_id, query, backend, max_results, timeout
+        )
+        return job_id, future
+
+    def _cancel(self, jobs: dict) -> None:
+        for future, job_id in jobs.items():
+            future.cancel()
+            with self._lock:
+                self._queued.discard(job_id)
+
+    def stream(
+        self,
+        query: str,
+        max_results: int = 5,
+        deadline: float = SEARCH_DEADLINE_SECONDS,
+    ) -> "SearchStream":
+        """Start a search whose results are delivered per backend as they finish."""
+        return SearchStream(self, query, max_results, deadline)
+
+    async def search(
+        self,
+        query: str,
+        max_results: int = 5,
+        deadline: float = SEARCH_DEADLINE_SECONDS,
+    ) -> tuple[list, bool]:
+        """
+        Search all backends in the pool and merge their results.
+
+        Returns:
+            (results, timed_out) - results are de-duplicated by URL and capped
+            at max_results; timed_out is True if the deadline cut the search short
+        """
+        stream = self.stream(query, max_results, deadline)
+        await stream.drain()
+        return stream.results, stream.timed_out
+
+    def stats(self) -> dict:
+        latencies = list(self._latencies)
+        first_result = list(self._first_result_latencies)
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "running": self.running,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "latency_p50_ms": _percentile(latencies, 0.50) * 1000,
+            "latency_p95_ms": _percentile(latencies, 0.95) * 1000,
+            "latency_max_ms": max(latencies, default=0.0) * 1000,
+            "first_result_p50_ms": _percentile(first_result, 0.50) * 1000,
+            "first_result_p95_ms": _percentile(first_result, 0.95) * 1000,
+        }
+
+    def prometheus_lines(self) -> list:
+        stats = self.stats()
+        lines = [
+            "# HELP nevira_search_workers Worker threads in the search pool.",
+            "# TYPE nevira_search_workers gauge",
+            f"nevira_search_workers {self.max_workers}",
+            "# HELP nevira_search_jobs Backend jobs in the search pool by state.",
+            "# TYPE nevira_search_jobs gauge",
+            f'nevira_search_jobs{{state="queued"}} {stats["queue_depth"]}',
+            f'nevira_search_jobs{{state="running"}} {stats["running"]}',
+            "# HELP nevira_searches_total Searches finished, by outcome.",
+            "# TYPE nevira_searches_total counter",
+            f'nevira_searches_total{{outcome="completed"}} {self.completed - self.timeouts}',
+            f'nevira_searches_total{{outcome="timeout"}} {self.timeouts}',
+            f'nevira_searches_total{{outcome="cancelled"}} {self.cancelled}',
+            "# HELP nevira_search_backend_errors_total Backend jobs that raised.",
+            "# TYPE nevira_search_backend_errors_total counter",
+            f"nevira_search_backend_errors_total {self.errors}",
+            "# HELP nevira_search_latency_seconds Recent search latency.",
+            "# TYPE nevira_search_latency_seconds gauge",
+        ]
+        for quantile, key in (("0.5", "latency_p50_ms"), ("0.95", "latency_p95_ms")):
+            lines.append(f'nevira_search_latency_seconds{{quantile="{quantile}"}} {stats[key] / 1000:g}')
+        return lines
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SearchStream:
+    """
+    One in-flight search. Iterate it (or call first_batch()/drain()) to get
+    lists of new, de-duplicated results as each backend finishes.
+    """
+
+    def __init__(self, pool: SearchPool, query: str, max_results: int, deadline: float) -> None:
+        self.pool = pool
+        self.query = query
+        self.max_results = max_results
+        self.deadline = deadline
+        self.results: list = []
+        self.timed_out = False
+        self.done = False
+        # Seconds from start until the first result arrived
+        self.first_result_after: Optional[float] = None
+        self._seen: set = set()
+        self._jobs: dict = {}
+        self._iterator = self._batches()
+
+    def __aiter__(self):
+        return self._iterator
+
+    async def first_batch(self) -> list:
+        """Wait for the first backend that returns results ([] if none do)."""
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            return []
+
+    async def at_least(self, count: int) -> list:
+        """Wait until `count` results have arrived or the search ends; returns what has arrived."""
+        while len(self.results) < count and not self.done:
+            try:
+                await self._iterator.__anext__()
+            except StopAsyncIteration:
+                break
+        return list(self.results)
+
+    async def drain(self) -> list:
+        """Wait for the rest of the search and return every result collected."""
+        async for _ in self._iterator:
+            pass
+        return self.results
+
+    def _accept(self, future: asyncio.Future) -> list:
+        try:
+            batch = future.result()
+        except Exception as e:
+            self.pool.errors += 1
+            logging.warning(f"Search backend failed for '{self.query}': {e}")
+            return []
+        fresh = []
+        for result in batch:
+            key = result.get('href') or result.get('title')
+            if key in self._seen or len(self.results) >= self.max_results:
+                continue
+            self._seen.add(key)
+            self.results.append(result)
+            fresh.append(result)
+        return fresh
+
+    async def _batches(self):
+        pool = self.pool
+        start = time.perf_counter()
+        for backend in pool.backends:
+            job_id, future = pool._submit(self.query, backend, self.max_results, self.deadline)
+            self._jobs[future] = job_id
+        pending = set(self._jobs)
+        try:
+            while pending and len(self.results) < self.max_results:
+                remaining = self.deadline - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self.timed_out = True
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    fresh = self._accept(future)
+                    if not fresh:
+                        continue
+                    if self.first_result_after is None:
+                        self.first_result_after = time.perf_counter() - start
+                        pool._first_result_latencies.append(self.first_result_after)
+                    yield fresh
+        except (asyncio.CancelledError, GeneratorExit):
+            pool.cancelled += 1
+            pool._cancel(self._jobs)
+            self.done = True
+            logging.info(f"Search for '{self.query}' cancelled")
+            raise
+
+        if pending:
+            pool._cancel({f: self._jobs[f] for f in pending})
+        self.done = True
+        elapsed = time.perf_counter() - start
+        pool._latencies.append(elapsed)
+        pool.completed += 1
+        if self.timed_out:
+            pool.timeouts += 1
+        logging.info(
+            f"Search for '{self.query}' took {elapsed * 1000:.0f} ms "
+            f"({len(self.results)} results, queue depth {pool.queue_depth}"
+            f"{', timed out' if self.timed_out else ''})"
+        )